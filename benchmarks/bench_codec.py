@@ -0,0 +1,66 @@
+from collections.abc import Iterable
+
+"""Compare the binary codec with the JSON path for common entities.
+
+Run from the repository root with ``python -m benchmarks.bench_codec``.
+"""
+
+import json
+import os
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from pydantic.json import pydantic_encoder
+
+from shikijin import codecs
+from shikijin.fields import BlobId, Bytes, TaskId, WorkerId
+from shikijin.types import Assignment, BaseTask, Blob
+
+
+class BenchTask(BaseTask):
+    inputs: tuple[BlobId, ...] = ()
+    retries: int = 0
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def to_json(value: Any) -> str:
+    return json.dumps(value, default=pydantic_encoder)
+
+
+def bench(label: str, fn: Callable[[], object], number: int) -> None:
+    seconds = min(timeit.repeat(fn, number=number, repeat=3))
+    print(f"{label:<40} {number / seconds:>12,.0f} ops/s")
+
+
+def compare(label: str, entity: Assignment | Blob | BenchTask, number: int) -> None:
+    cls = type(entity)
+    as_json = to_json(entity.dict())
+    as_bytes = entity.to_bytes()
+    print(f"{label}: json {len(as_json)} bytes, binary {len(as_bytes)} bytes")
+    bench("  json encode", lambda: to_json(entity.dict()), number)
+    bench("  binary encode", entity.to_bytes, number)
+    bench("  json decode", lambda: cls.parse_obj(json.loads(as_json)), number)
+    bench("  binary decode", lambda: cls.from_bytes(as_bytes), number)
+    bench("  binary decode, trusted", lambda: cls.from_bytes(as_bytes, trusted=True), number)
+
+
+def main() -> None:
+    compare("Assignment", Assignment(worker_id=WorkerId.generate(), task_id=TaskId.generate()), 20000)
+    compare("Task", BenchTask(inputs=tuple(BlobId.generate() for _ in range(8)), retries=2), 20000)
+    compare("Blob 1KiB", Blob(blob=Bytes(os.urandom(1 << 10))), 20000)
+    compare("Blob 1MiB", Blob(blob=Bytes(os.urandom(1 << 20))), 50)
+
+    tasks = [BenchTask(inputs=(BlobId.generate(),)) for _ in range(1000)]
+    print("1000 tasks")
+    bench("  json encode", lambda: to_json([t.dict() for t in tasks]), 20)
+    bench("  binary encode_many", lambda: codecs.encode_many(tasks), 20)
+    encoded = codecs.encode_many(tasks)
+    bench("  binary decode_many", lambda: codecs.decode_many(encoded, BenchTask), 20)
+    bench("  binary decode_many, trusted", lambda: codecs.decode_many(encoded, BenchTask, trusted=True), 20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from collections.abc import Iterable
+
+"""Compare validated construction of entities with ``construct_trusted``.
+
+Run from the repository root with ``python -m benchmarks.bench_construction``.
+"""
+
+import os
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from shikijin.fields import AssignmentId, BlobId, Bytes, TaskId, Timestamp, WorkerId
+from shikijin.types import Assignment, BaseTask, Blob
+
+
+class BenchTask(BaseTask):
+    inputs: tuple[BlobId, ...] = ()
+    retries: int = 0
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def bench(label: str, fn: Callable[[], object], number: int) -> None:
+    seconds = min(timeit.repeat(fn, number=number, repeat=3))
+    print(f"{label:<40} {number / seconds:>12,.0f} ops/s")
+
+
+def main() -> None:
+    now = Timestamp.now()
+    assignment: dict[str, Any] = dict(
+        id=AssignmentId.generate(),
+        created_at=now,
+        updated_at=now,
+        worker_id=WorkerId.generate(),
+        task_id=TaskId.generate(),
+    )
+    print("Assignment")
+    bench("  validated", lambda: Assignment(**assignment), 50000)
+    bench("  trusted", lambda: Assignment.construct_trusted(**assignment), 50000)
+
+    blob: dict[str, Any] = dict(id=BlobId.generate(), created_at=now, updated_at=now, blob=Bytes(os.urandom(1 << 10)))
+    print("Blob 1KiB")
+    bench("  validated", lambda: Blob(**blob), 50000)
+    bench("  trusted", lambda: Blob.construct_trusted(**blob), 50000)
+
+    task: dict[str, Any] = dict(
+        id=TaskId.generate(), created_at=now, updated_at=now, inputs=tuple(BlobId.generate() for _ in range(8))
+    )
+    print("Task with 8 inputs")
+    bench("  validated", lambda: BenchTask(**task), 50000)
+    bench("  trusted", lambda: BenchTask.construct_trusted(**task), 50000)
+
+    print("Task with defaults")
+    bench("  validated", lambda: BenchTask(), 50000)
+    bench("  trusted", lambda: BenchTask.construct_trusted(), 50000)
+
+
+if __name__ == "__main__":
+    main()
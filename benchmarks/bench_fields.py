@@ -0,0 +1,67 @@
+"""Microbenchmarks for the id hot paths in ``shikijin.fields``.
+
+``LegacyId`` reproduces the previous implementation, which converted every input to hex and
+re-encoded the base64 form on every call, to show the speedup.
+Run from the repository root with ``python -m benchmarks.bench_fields``.
+"""
+
+import timeit
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Callable
+from typing import Union
+from uuid import UUID
+
+from shikijin.fields import BlobId, ComponentId, Id, TaskId
+
+
+class LegacyId(UUID):
+    def __init__(self, value: Union[str, UUID, bytes, int]) -> None:
+        if isinstance(value, UUID):
+            super(LegacyId, self).__init__(value.hex)
+            return
+        if isinstance(value, int):
+            super(LegacyId, self).__init__(value.to_bytes(16, "big").hex())
+            return
+        if isinstance(value, bytes):
+            super(LegacyId, self).__init__(value.hex())
+            return
+        if len(value) == 22:
+            super(LegacyId, self).__init__(urlsafe_b64decode(value + "==").hex())
+            return
+        super(LegacyId, self).__init__(value)
+
+    @classmethod
+    def generate(cls) -> "LegacyId":
+        return cls(uuid.uuid4().hex)
+
+    def __str__(self) -> str:
+        return urlsafe_b64encode(self.bytes).rstrip(b"=").decode("utf-8")
+
+
+def compare(label: str, legacy: Callable[[], object], current: Callable[[], object], number: int = 100000) -> None:
+    before = min(timeit.repeat(legacy, number=number, repeat=3))
+    after = min(timeit.repeat(current, number=number, repeat=3))
+    print(f"{label:<36} {number / before:>12,.0f} -> {number / after:>12,.0f} ops/s ({before / after:.1f}x)")
+
+
+def main() -> None:
+    sample = TaskId.generate()
+    raw, value, text, u = sample.bytes, sample.int, str(sample), UUID(sample.hex)
+    compare("TaskId(bytes)", lambda: LegacyId(raw), lambda: TaskId(raw))
+    compare("TaskId(int)", lambda: LegacyId(value), lambda: TaskId(value))
+    compare("TaskId(UUID)", lambda: LegacyId(u), lambda: TaskId(u))
+    compare("TaskId(base64 str)", lambda: LegacyId(text), lambda: TaskId(text))
+    compare("ComponentId.generate()", LegacyId.generate, ComponentId.generate)
+    compare(
+        "BlobId.generate() x1000",
+        lambda: [LegacyId.generate() for _ in range(1000)],
+        lambda: BlobId.generate_many(1000),
+        100,
+    )
+    legacy, current = LegacyId(raw), Id(raw)
+    compare("str(id) repeated", lambda: str(legacy), lambda: str(current))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+from collections.abc import Iterable
+
+"""Measure priority and fair-share scheduling of ``InMemoryInterface`` with a large backlog.
+
+Run from the repository root with ``python -m benchmarks.bench_priority [number of tasks]``;
+the backlog defaults to two million tasks spread over ten priorities and two capability
+signatures. The fair-share run then gives most of the backlog to one owner and spreads the
+rest over a thousand others.
+"""
+
+import random
+import sys
+import time
+import timeit
+from collections import Counter
+
+from shikijin.fields import UserId, WorkerId
+from shikijin.interfaces.in_memory_interface.core import InMemoryInterface
+from shikijin.loggers.basic_logger.core import BasicLogger
+from shikijin.types import BaseCapability, BaseTask
+
+
+class GpuCapability(BaseCapability):
+    ...
+
+
+class CpuTask(BaseTask):
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+class GpuTask(BaseTask):
+    required_capabilities = (GpuCapability,)
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    rng = random.Random(0)
+    interface = InMemoryInterface(logger=BasicLogger("bench"), name=None)
+    tasks = [(GpuTask if i % 4 == 0 else CpuTask).construct_trusted(priority=rng.randrange(10)) for i in range(n)]
+
+    started = time.perf_counter()
+    for i in range(0, n, 10_000):
+        interface.add_tasks(tasks[i : i + 10_000])
+    seconds = time.perf_counter() - started
+    print(f"{'add_tasks':<40} {n / seconds:>12,.0f} tasks/s")
+
+    capabilities = [GpuCapability()]
+    number = 100_000
+    seconds = min(timeit.repeat(lambda: interface.pickup_task(capabilities), number=number, repeat=3))
+    print(f"{'pickup_task':<40} {number / seconds:>12,.0f} calls/s")
+    number = 10_000
+    seconds = min(timeit.repeat(lambda: interface.pickup_tasks(capabilities, 16), number=number, repeat=3))
+    print(f"{'pickup_tasks x16':<40} {number / seconds:>12,.0f} calls/s")
+
+    urgent = CpuTask.construct_trusted(priority=100)
+    started = time.perf_counter()
+    interface.add_task(urgent)
+    assert interface.pickup_task(capabilities) is urgent
+    print(f"{'urgent task ahead of the backlog':<40} {(time.perf_counter() - started) * 1e6:>12,.1f} us")
+
+    worker_id = WorkerId.generate()
+    claims = min(n, 200_000)
+    previous = urgent.priority
+    started = time.perf_counter()
+    for _ in range(claims):
+        t = interface.pickup_task(capabilities)
+        interface.create_assignment(worker_id, t)
+        assert t.priority <= previous
+        previous = t.priority
+    seconds = time.perf_counter() - started
+    print(f"{'pickup_task + create_assignment':<40} {claims / seconds:>12,.0f} claims/s")
+
+
+def fair_share(n: int) -> None:
+    interface = InMemoryInterface(logger=BasicLogger("bench"), name=None, owner_weights={"heavy": 10.0})
+    owners = [UserId("heavy" if i % 10 else f"user{i // 10 % 1000}") for i in range(n)]
+    tasks = [CpuTask.construct_trusted(owner=owner) for owner in owners]
+
+    started = time.perf_counter()
+    for i in range(0, n, 10_000):
+        interface.add_tasks(tasks[i : i + 10_000])
+    seconds = time.perf_counter() - started
+    print(f"{'add_tasks, 1001 owners':<40} {n / seconds:>12,.0f} tasks/s")
+
+    worker_id = WorkerId.generate()
+    # half of the light owners' backlog, so that every owner still has tasks ready throughout
+    claims = n // 10 // 2
+    served: Counter[str] = Counter()
+    started = time.perf_counter()
+    for _ in range(claims):
+        t = interface.pickup_task([])
+        interface.create_assignment(worker_id, t)
+        served["heavy" if t.owner == "heavy" else "others"] += 1
+    seconds = time.perf_counter() - started
+    print(f"{'fair pickup_task + create_assignment':<40} {claims / seconds:>12,.0f} claims/s")
+    print(f"{'share of the heavy owner (weight 10)':<40} {served['heavy'] / claims:>12.1%}")
+    print(f"{'expected share, 10 / (10 + 1000)':<40} {10 / 1010:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
+    fair_share(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,60 @@
+from collections.abc import Iterable
+
+"""Measure round trips to an ``InterfaceServer``, one call at a time and pipelined.
+
+Run from the repository root with ``python -m benchmarks.bench_remote_interface``.
+"""
+
+import os
+import tempfile
+import threading
+import timeit
+from collections.abc import Callable
+
+from shikijin.interfaces.in_memory_interface.core import InMemoryInterface
+from shikijin.interfaces.remote_interface.core import RemoteInterface
+from shikijin.interfaces.remote_interface.server import InterfaceServer
+from shikijin.loggers.basic_logger.core import BasicLogger
+from shikijin.types import BaseTask
+
+
+class BenchTask(BaseTask):
+    retries: int = 0
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def bench(label: str, fn: Callable[[], object], number: int, calls: int = 1) -> None:
+    seconds = min(timeit.repeat(fn, number=number, repeat=3))
+    print(f"{label:<40} {number * calls / seconds:>12,.0f} calls/s")
+
+
+def run(address: str) -> None:
+    logger = BasicLogger("bench")
+    server = InterfaceServer(InMemoryInterface(logger=logger, name=None), address=address, logger=logger)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        interface = RemoteInterface(address=server.address, logger=logger)
+        tasks = [BenchTask() for _ in range(100)]
+        interface.add_tasks(tasks)
+        print(server.address)
+        bench("  get_task", lambda: interface.get_task(tasks[0].id), 5000)
+        calls = [("get_task", (t.id,)) for t in tasks]
+        bench("  pipelined get_task x100", lambda: interface.pipeline(calls), 100, len(calls))
+        bench("  get_tasks x100", lambda: interface.get_tasks([t.id for t in tasks]), 100, len(tasks))
+        interface.close()
+    finally:
+        server.stop()
+        thread.join()
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        run(f"unix:{os.path.join(directory, 'bench.sock')}")
+    run("tcp:127.0.0.1:0")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+from collections.abc import Iterable
+
+"""Compare ``BaseType.dict``/``json`` with the pydantic path they used to wrap.
+
+Run from the repository root with ``python -m benchmarks.bench_serialization``.
+"""
+
+import json
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from pydantic import BaseModel
+from pydantic.json import pydantic_encoder
+
+from shikijin.fields import BlobId, Serializable, TaskId, WorkerId
+from shikijin.types import Assignment, BaseTask
+
+
+class BenchTask(BaseTask):
+    inputs: tuple[BlobId, ...] = ()
+    retries: int = 0
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def legacy_dict(entity: BaseModel) -> dict[str, Any]:
+    return {
+        k: v.serialize() if isinstance(v, Serializable) else v for k, v in BaseModel.dict(entity, by_alias=True).items()
+    }
+
+
+def legacy_json(entity: BaseModel) -> str:
+    return json.dumps(legacy_dict(entity), default=pydantic_encoder)
+
+
+def bench(label: str, fn: Callable[[], object], number: int) -> None:
+    seconds = min(timeit.repeat(fn, number=number, repeat=3))
+    print(f"{label:<40} {number / seconds:>12,.0f} ops/s")
+
+
+def compare(label: str, entity: BaseModel, number: int) -> None:
+    print(label)
+    bench("  pydantic dict", lambda: legacy_dict(entity), number)
+    bench("  planned dict", entity.dict, number)
+    bench("  pydantic json", lambda: legacy_json(entity), number)
+    bench("  planned json", entity.json, number)
+
+
+def main() -> None:
+    compare("Assignment", Assignment(worker_id=WorkerId.generate(), task_id=TaskId.generate()), 50000)
+    compare("Task", BenchTask(inputs=tuple(BlobId.generate() for _ in range(8)), retries=2), 50000)
+
+
+if __name__ == "__main__":
+    main()
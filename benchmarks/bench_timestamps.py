@@ -0,0 +1,40 @@
+"""Microbenchmarks for ``Timestamp.now`` and timestamp parsing.
+
+Run from the repository root with ``python -m benchmarks.bench_timestamps``.
+"""
+
+import timeit
+from collections.abc import Callable
+from datetime import datetime
+
+from dateutil.parser import parse as parse_datetime
+
+from shikijin.fields import Timestamp
+
+
+def compare(label: str, before: Callable[[], object], after: Callable[[], object], number: int) -> None:
+    t_before = min(timeit.repeat(before, number=number, repeat=3))
+    t_after = min(timeit.repeat(after, number=number, repeat=3))
+    print(f"{label:<36} {number / t_before:>14,.1f} -> {number / t_after:>14,.1f} ops/s ({t_before / t_after:.1f}x)")
+
+
+def main() -> None:
+    compare("Timestamp.now()", lambda: Timestamp(datetime.utcnow()), Timestamp.now, 200000)
+    value = "2023-01-22T14:29:24.422311Z"
+    compare(
+        "Timestamp(rfc3339 str)",
+        lambda: Timestamp(int(parse_datetime(value).timestamp() * 1000000)),
+        lambda: Timestamp(value),
+        50000,
+    )
+    values = [f"2023-01-22T14:{m:02d}:{s:02d}.{s * 1000:06d}+09:00" for m in range(60) for s in range(60)] * 10
+    compare(
+        f"parse {len(values)} strings",
+        lambda: [Timestamp(int(parse_datetime(v).timestamp() * 1000000)) for v in values],
+        lambda: Timestamp.parse_many(values),
+        1,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
+import importlib
+import signal
 from argparse import ArgumentParser
 
+from .compression import Codec
+from .interfaces.factory import InterfaceFactory
+from .interfaces.remote_interface.protocol import MAX_FRAME_SIZE
+from .interfaces.remote_interface.server import InterfaceServer
 from .loggers.factory import LoggerFactory
 from .settings import GlobalSettings
 from .workers.factory import WorkerFactory
@@ -11,6 +17,22 @@ def generate_argument_parser() -> ArgumentParser:
     subparsers = parser.add_subparsers(dest="command")
     worker_parser = subparsers.add_parser("worker")
     worker_parser.add_argument("--worker-name")
+    server_parser = subparsers.add_parser("interface-server")
+    server_parser.add_argument("--address", required=True, help="unix:<path> or tcp:<host>:<port>")
+    server_parser.add_argument(
+        "--compression", type=Codec, choices=list(Codec), default=Codec.NONE, help="codec of large responses"
+    )
+    server_parser.add_argument(
+        "--max-frame-size", type=int, default=MAX_FRAME_SIZE, help="largest request accepted, in bytes"
+    )
+    server_parser.add_argument(
+        "--import",
+        dest="imports",
+        action="append",
+        default=[],
+        metavar="MODULE",
+        help="module defining tasks or capabilities sent to the server; repeatable",
+    )
     return parser
 
 
@@ -28,4 +50,21 @@ def main() -> None:
     if args.command == "worker":
         if args.worker_name is not None:
             global_settings.worker_settings["name"] = args.worker_name
-        WorkerFactory(logger=logger).create(global_settings).main()
+        worker = WorkerFactory(logger=logger).create(global_settings)
+        signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+        worker.main()
+    elif args.command == "interface-server":
+        # entities are decoded only into classes already defined in this process
+        for module in args.imports:
+            importlib.import_module(module)
+        interface = InterfaceFactory(logger=logger).create(global_settings)
+        server = InterfaceServer(
+            interface=interface,
+            address=args.address,
+            logger=logger,
+            compression=args.compression,
+            max_frame_size=args.max_frame_size,
+        )
+        signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: server.stop())
+        server.serve_forever()
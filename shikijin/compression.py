@@ -0,0 +1,148 @@
+"""Compression of payloads with the codecs of the standard library.
+
+A payload is compressed only when it is at least ``min_size`` bytes long and compressing a
+sample of its first bytes with fast zlib shows it is worth it, so small and incompressible
+payloads, such as images or archives, cost neither the compression nor the decompression.
+
+>>> data = b'{"name": "shikijin", "values": [1, 2, 3]}\\n' * 100
+>>> codec, packed = compress(data, Codec.ZLIB)
+>>> codec, len(packed) < len(data) // 10
+(<Codec.ZLIB: 'zlib'>, True)
+>>> decompress(codec, packed) == data
+True
+>>> import os
+>>> compress(os.urandom(4096), Codec.LZMA)[0]
+<Codec.NONE: 'none'>
+>>> b"".join(decompress_stream(Codec.BZ2, compress_stream(Codec.BZ2, [data[:100], data[100:]]))) == data
+True
+"""
+
+import bz2
+import lzma
+import zlib
+from collections.abc import Iterable, Iterator
+from enum import Enum
+from typing import Any, Union
+
+DEFAULT_MIN_SIZE = 1024
+
+# compressing the first bytes of a payload must save at least a tenth of them
+_SAMPLE_SIZE = 4096
+_MAX_SAMPLE_RATIO = 0.9
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class Codec(str, Enum):
+    NONE = "none"
+    ZLIB = "zlib"
+    LZMA = "lzma"
+    BZ2 = "bz2"
+
+    @property
+    def code(self) -> int:
+        """Number of the codec in the binary formats."""
+        return _CODES[self]
+
+    @classmethod
+    def from_code(cls, code: int) -> "Codec":
+        try:
+            return _CODECS[code]
+        except IndexError:
+            raise ValueError(f"unknown codec {code}")
+
+
+_CODECS = (Codec.NONE, Codec.ZLIB, Codec.LZMA, Codec.BZ2)
+_CODES = {codec: code for code, codec in enumerate(_CODECS)}
+
+
+def compressible(data: Buffer) -> bool:
+    """Whether a sample of the first bytes of ``data`` compresses well."""
+    sample = bytes(data[:_SAMPLE_SIZE])
+    return len(zlib.compress(sample, 1)) < len(sample) * _MAX_SAMPLE_RATIO
+
+
+def _compressor(codec: Codec) -> Any:
+    if codec == Codec.ZLIB:
+        return zlib.compressobj()
+    if codec == Codec.LZMA:
+        return lzma.LZMACompressor()
+    if codec == Codec.BZ2:
+        return bz2.BZ2Compressor()
+    raise ValueError(f"cannot compress with {codec}")
+
+
+def _decompressor(codec: Codec) -> Any:
+    if codec == Codec.ZLIB:
+        return zlib.decompressobj()
+    if codec == Codec.LZMA:
+        return lzma.LZMADecompressor()
+    if codec == Codec.BZ2:
+        return bz2.BZ2Decompressor()
+    raise ValueError(f"cannot decompress with {codec}")
+
+
+def compress(data: Buffer, codec: Codec, min_size: int = DEFAULT_MIN_SIZE) -> tuple[Codec, Buffer]:
+    """Compress ``data`` with ``codec`` if it is worth it; return the codec used and the result."""
+    if codec == Codec.NONE or len(data) < min_size or not compressible(data):
+        return Codec.NONE, data
+    compressor = _compressor(codec)
+    packed = compressor.compress(data) + compressor.flush()
+    if len(packed) >= len(data):
+        return Codec.NONE, data
+    return codec, packed
+
+
+def decompress(codec: Codec, data: Buffer) -> Buffer:
+    if codec == Codec.NONE:
+        return data
+    if codec == Codec.ZLIB:
+        return zlib.decompress(data)
+    if codec == Codec.LZMA:
+        return lzma.decompress(data)
+    return bz2.decompress(data)
+
+
+def decompress_bounded(codec: Codec, data: Buffer, max_size: int) -> bytes:
+    """Decompress ``data``, which may come from a peer, refusing to produce more than ``max_size`` bytes.
+
+    >>> decompress_bounded(Codec.ZLIB, zlib.compress(bytes(1000)), 999)
+    Traceback (most recent call last):
+    ...
+    ValueError: zlib payload expands beyond 999 bytes
+    """
+    if codec == Codec.NONE:
+        if len(data) > max_size:
+            raise ValueError(f"payload of {len(data)} bytes exceeds {max_size} bytes")
+        return bytes(data)
+    decompressor = _decompressor(codec)
+    out = decompressor.decompress(data, max_size + 1)
+    if len(out) > max_size:
+        raise ValueError(f"{codec.value} payload expands beyond {max_size} bytes")
+    if not decompressor.eof:
+        raise ValueError(f"truncated {codec.value} payload")
+    return bytes(out)
+
+
+def compress_stream(codec: Codec, chunks: Iterable[Buffer]) -> Iterator[bytes]:
+    """Compress the concatenation of ``chunks`` with ``codec``, one chunk at a time."""
+    compressor = _compressor(codec)
+    for chunk in chunks:
+        packed = compressor.compress(chunk)
+        if packed:
+            yield packed
+    yield compressor.flush()
+
+
+def decompress_stream(codec: Codec, chunks: Iterable[Buffer]) -> Iterator[bytes]:
+    """Decompress the concatenation of ``chunks``, compressed with ``codec``, one chunk at a time."""
+    if codec == Codec.NONE:
+        yield from (bytes(chunk) for chunk in chunks)
+        return
+    decompressor = _decompressor(codec)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    if codec == Codec.ZLIB:
+        yield decompressor.flush()
@@ -1,3 +1,5 @@
+import os
+import re
 import uuid
 from abc import abstractmethod
 from base64 import (
@@ -7,11 +9,12 @@ from base64 import (
     urlsafe_b64decode,
     urlsafe_b64encode,
 )
-from collections.abc import Callable, Generator
+from collections.abc import Callable, Generator, Iterable
 from datetime import datetime as _datetime
 from datetime import timezone as _timezone
-from typing import Any, Generic, Type, TypeVar, Union, cast
-from uuid import UUID
+from time import time_ns as _time_ns
+from typing import Any, Generic, Optional, Type, TypeVar, Union, cast
+from uuid import UUID, SafeUUID
 
 from dateutil.parser import parse as parse_datetime
 
@@ -19,6 +22,13 @@ T = TypeVar("T")
 StrT = TypeVar("StrT", bound="NonEmptyString")
 IdT = TypeVar("IdT", bound="Id")
 
+_MAX_ID = 1 << 128
+# UUID forbids attribute assignment; its ``int`` slot is written through the slot descriptor instead
+_set_uuid_int = UUID.__dict__["int"].__set__
+# variant and version bits of a random (version 4) UUID, as set by uuid.UUID(version=4)
+_V4_CLEAR_MASK = ~((0xC000 << 48) | (0xF000 << 64))
+_V4_SET_MASK = (0x8000 << 48) | (4 << 76)
+
 
 class Serializable(Generic[T]):
     @abstractmethod
@@ -47,30 +57,64 @@ class Id(UUID, Serializable[str]):
     True
     >>> x == Id(275603287559914445491632874575877060712)
     True
+    >>> x == Id(x.bytes) == Id(UUID(x.hex))
+    True
+    >>> str(x)
+    'z1dDLoCeQ1OtvZ1cDXM4aA'
     """
 
+    # class-level default so that the fast construction paths only need to set ``int``
+    is_safe = SafeUUID.unknown  # type: ignore[misc]
+
     def __init__(self, value: Union[str, UUID, bytes, int]) -> None:
+        # UUID.__init__ only accepts strings, so ints, bytes and other UUIDs used to make a round trip
+        # through hex; set the slots directly instead
         if isinstance(value, UUID):
-            super(Id, self).__init__(value.hex)
-            return
-        if isinstance(value, int):
-            super(Id, self).__init__(value.to_bytes(16, "big").hex())
-            return
-        if isinstance(value, bytes):
-            super(Id, self).__init__(value.hex())
+            int_value = value.int
+        elif isinstance(value, int):
+            if not 0 <= value < _MAX_ID:
+                raise ValueError("int is out of range (need a 128-bit value)")
+            int_value = value
+        elif isinstance(value, bytes):
+            if len(value) != 16:
+                raise ValueError("bytes is not a 16-char string")
+            int_value = int.from_bytes(value, "big")
+        elif len(value) == 22:
+            decoded = urlsafe_b64decode(value + "==")
+            if len(decoded) != 16:
+                raise ValueError(f"badly formed base64 id: {value}")
+            int_value = int.from_bytes(decoded, "big")
+        else:
+            super(Id, self).__init__(value)
             return
-        if len(value) == 22:
-            super(Id, self).__init__(urlsafe_b64decode(value + "==").hex())
-            return
-        super(Id, self).__init__(value)
+        _set_uuid_int(self, int_value)
 
     @classmethod
     def generate(cls: Type[IdT]) -> IdT:
-        return cls(uuid.uuid4().hex)
+        return cls(uuid.uuid4())
+
+    @classmethod
+    def generate_many(cls: Type[IdT], n: int) -> list[IdT]:
+        """Generate ``n`` random (version 4) ids from a single call to the OS random source.
+
+        >>> ids = TaskId.generate_many(3)
+        >>> len(set(ids)), [i.version for i in ids], type(ids[0]).__name__
+        (3, [4, 4, 4], 'TaskId')
+        """
+        data = os.urandom(16 * n)
+        return [
+            cls((int.from_bytes(data[i : i + 16], "big") & _V4_CLEAR_MASK) | _V4_SET_MASK) for i in range(0, 16 * n, 16)
+        ]
 
     @property
     def b64encoded(self) -> str:
-        return urlsafe_b64encode(self.bytes).rstrip(b"=").decode("utf-8")
+        """URL-safe base64 form of the id, computed once per instance."""
+        try:
+            return cast(str, self.__dict__["_b64encoded"])
+        except KeyError:
+            encoded = urlsafe_b64encode(self.bytes).rstrip(b"=").decode("ascii")
+            self.__dict__["_b64encoded"] = encoded
+            return encoded
 
     def __str__(self) -> str:
         return self.b64encoded
@@ -163,6 +207,62 @@ class UserId(str):
     ...
 
 
+_RFC3339 = re.compile(
+    r"(\d{4}-\d{2}-\d{2})[Tt ](\d{2}):(\d{2}):(\d{2})(?:[.,](\d{1,9}))?(?:([Zz])|([+-])(\d{2}):?(\d{2}))\Z"
+)
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _days_from_civil(year: int, month: int, day: int) -> int:
+    """Days since 1970-01-01 of a proleptic Gregorian date, without building a ``date``.
+
+    >>> _days_from_civil(1970, 1, 1), _days_from_civil(2000, 3, 1), _days_from_civil(1969, 12, 31)
+    (0, 11017, -1)
+    """
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month - 3 if month > 2 else month + 9) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _parse_date(date: str) -> Optional[int]:
+    year, month, day = int(date[0:4]), int(date[5:7]), int(date[8:10])
+    if not 1 <= month <= 12:
+        return None
+    leap_day = month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if not 1 <= day <= _DAYS_IN_MONTH[month] + leap_day:
+        return None
+    return _days_from_civil(year, month, day)
+
+
+def _parse_rfc3339(value: str, days_cache: Optional[dict[str, int]] = None) -> Optional[int]:
+    """Microseconds since the epoch of an RFC 3339 string with an explicit offset, or None for other formats.
+
+    Strings without an offset are left to dateutil, which interprets them in local time.
+    """
+    m = _RFC3339.match(value)
+    if m is None:
+        return None
+    date, hour, minute, second, fraction, zulu, sign, offset_hour, offset_minute = m.groups()
+    days = days_cache.get(date) if days_cache is not None else None
+    if days is None:
+        days = _parse_date(date)
+        if days is None:
+            return None
+        if days_cache is not None:
+            days_cache[date] = days
+    h, mi, sec = int(hour), int(minute), int(second)
+    if h > 23 or mi > 59 or sec > 59:
+        return None
+    seconds = days * 86400 + h * 3600 + mi * 60 + sec
+    if zulu is None:
+        offset = int(offset_hour) * 3600 + int(offset_minute) * 60
+        seconds = seconds - offset if sign == "+" else seconds + offset
+    return seconds * 1000000 + (int(fraction[:6].ljust(6, "0")) if fraction else 0)
+
+
 class Timestamp(int):
     """
     Timestamp class
@@ -183,6 +283,8 @@ class Timestamp(int):
     Timestamp(1674397764479000)
     >>> Timestamp("2023-01-22T14:29:24.422Z")
     Timestamp(1674397764422000)
+    >>> Timestamp("2023-01-22T23:29:24.422+09:00")
+    Timestamp(1674397764422000)
     >>> Timestamp("2023/02/12 12:21:12")
     Timestamp(1676172072000000)
     >>> Timestamp("invalid")
@@ -196,7 +298,10 @@ class Timestamp(int):
         if isinstance(value, _datetime):
             return super(Timestamp, cls).__new__(cls, int(value.timestamp() * 1000000))
         if isinstance(value, str):
-            return super(Timestamp, cls).__new__(cls, int(parse_datetime(value).timestamp() * 1000000))
+            microseconds = _parse_rfc3339(value)
+            if microseconds is None:
+                microseconds = int(parse_datetime(value).timestamp() * 1000000)
+            return super(Timestamp, cls).__new__(cls, microseconds)
         if isinstance(value, float):
             return super(Timestamp, cls).__new__(cls, int(value * 1000000))
         return super(Timestamp, cls).__new__(cls, value)
@@ -249,7 +354,26 @@ class Timestamp(int):
         ...     Timestamp.now()
         Timestamp(1674397763123321)
         """
-        return cls(_datetime.utcnow())
+        return int.__new__(cls, _time_ns() // 1000)
+
+    @classmethod
+    def parse_many(cls, values: Iterable[str]) -> list["Timestamp"]:
+        """Parse many timestamp strings at once.
+
+        RFC 3339 strings are parsed without building ``datetime`` objects, and the day number of
+        each distinct date is only computed once, which pays off for bulk ingestion where most
+        timestamps share a few dates. Other formats fall back to ``dateutil``.
+
+        >>> Timestamp.parse_many(["2023-01-22T14:29:24.422Z", "2023-01-22T14:29:25Z", "2023-01-22 23:29:25.5+0900"])
+        [Timestamp(1674397764422000), Timestamp(1674397765000000), Timestamp(1674397765500000)]
+        """
+        days_cache: dict[str, int] = {}
+        new = int.__new__
+        result = []
+        for value in values:
+            microseconds = _parse_rfc3339(value, days_cache)
+            result.append(cls(value) if microseconds is None else new(cls, microseconds))
+        return result
 
     def __repr__(self) -> str:
         return f"Timestamp({super(Timestamp, self).__repr__()})"
@@ -263,6 +387,8 @@ class Bytes(bytes, Serializable[str]):
     Bytes(b'hello')
     >>> Bytes(123)
     Bytes(b'{')
+    >>> Bytes(memoryview(b"hello")[1:3])
+    Bytes(b'el')
     >>> Bytes(b"hello").hex()
     '68656c6c6f'
     >>> Bytes(b"hello").b64encoded
@@ -271,8 +397,8 @@ class Bytes(bytes, Serializable[str]):
     'aGVsbG8='
     """
 
-    def __new__(cls, value: Union[bytes, str, int]) -> "Bytes":
-        if isinstance(value, bytes):
+    def __new__(cls, value: Union[bytes, bytearray, memoryview, str, int]) -> "Bytes":
+        if isinstance(value, (bytes, bytearray, memoryview)):
             return super(Bytes, cls).__new__(cls, value)
         if isinstance(value, str):
             return super(Bytes, cls).__new__(cls, standard_b64decode(value))
@@ -0,0 +1,80 @@
+import asyncio
+from collections.abc import Callable, Sequence
+from typing import Optional, TypeVar
+
+from ...fields import BlobId, ComponentId, ComponentName, TaskId
+from ...types import Assignment, BaseCapability, BaseTask, Blob
+from ..base import AsyncBaseInterface, BaseInterface
+
+R = TypeVar("R")
+
+
+class AsyncInterfaceAdapter(AsyncBaseInterface):
+    """Expose a synchronous ``BaseInterface`` through the ``AsyncBaseInterface`` protocol.
+
+    Calls are run on the default executor so that a backend doing I/O does not block the
+    event loop. Backends whose calls never block, such as ``InMemoryInterface``, can be
+    called inline by passing ``offload=False``; ``wait_for_task`` is always offloaded.
+    """
+
+    def __init__(self, interface: BaseInterface, name: Optional[ComponentName] = None, offload: bool = True):
+        super(AsyncInterfaceAdapter, self).__init__(logger=interface.logger, name=name)
+        self._interface = interface
+        self._offload = offload
+
+    @property
+    def interface(self) -> BaseInterface:
+        return self._interface
+
+    async def _call(self, fn: Callable[..., R], *args: object) -> R:
+        if self._offload:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def get_blob(self, blob_id: BlobId) -> Blob:
+        return await self._call(self._interface.get_blob, blob_id)
+
+    async def get_blobs(self, blob_ids: Sequence[BlobId]) -> list[Blob]:
+        return await self._call(self._interface.get_blobs, blob_ids)
+
+    async def save_blob(self, blob: Blob) -> None:
+        await self._call(self._interface.save_blob, blob)
+
+    async def add_task(self, task: BaseTask) -> None:
+        await self._call(self._interface.add_task, task)
+
+    async def add_tasks(self, tasks: Sequence[BaseTask]) -> None:
+        await self._call(self._interface.add_tasks, tasks)
+
+    async def get_task(self, task_id: TaskId) -> BaseTask:
+        return await self._call(self._interface.get_task, task_id)
+
+    async def get_tasks(self, task_ids: Sequence[TaskId]) -> list[BaseTask]:
+        return await self._call(self._interface.get_tasks, task_ids)
+
+    async def pickup_task(self, capabilities: Sequence[BaseCapability]) -> BaseTask:
+        return await self._call(self._interface.pickup_task, capabilities)
+
+    async def pickup_tasks(self, capabilities: Sequence[BaseCapability], n: int) -> list[BaseTask]:
+        return await self._call(self._interface.pickup_tasks, capabilities, n)
+
+    async def wait_for_task(self, capabilities: Sequence[BaseCapability], timeout: float) -> BaseTask:
+        return await asyncio.to_thread(self._interface.wait_for_task, capabilities, timeout)
+
+    async def create_assignment(self, worker_id: ComponentId, task: BaseTask) -> Assignment:
+        return await self._call(self._interface.create_assignment, worker_id, task)
+
+    async def complete_assignment(self, assignment: Assignment) -> None:
+        await self._call(self._interface.complete_assignment, assignment)
+
+    async def abandon_assignment(self, assignment: Assignment) -> None:
+        await self._call(self._interface.abandon_assignment, assignment)
+
+    async def heartbeat(self, assignment: Assignment) -> Assignment:
+        return await self._call(self._interface.heartbeat, assignment)
+
+    async def fail_assignment(self, assignment: Assignment, error: str) -> None:
+        await self._call(self._interface.fail_assignment, assignment, error)
+
+    async def get_dead_tasks(self) -> list[BaseTask]:
+        return await self._call(self._interface.get_dead_tasks)
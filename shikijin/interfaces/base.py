@@ -1,9 +1,22 @@
+import asyncio
+import time
 from abc import ABCMeta, abstractmethod
-from collections.abc import Sequence
+from collections.abc import Iterator, Sequence
+from typing import Optional
 
 from ..components import BaseShikijinComponent
-from ..fields import BlobId, ComponentId, TaskId
+from ..fields import BlobId, Bytes, ComponentId, ComponentName, TaskId
+from ..loggers.base import BaseLogger
+from ..storages.base import (
+    DEFAULT_CHUNK_SIZE,
+    BaseStorage,
+    ChunkSource,
+    check_chunk_size,
+    iter_chunks,
+    resolve_range,
+)
 from ..types import Assignment, BaseCapability, BaseTask, Blob
+from .exceptions import NoCapableTaskError
 
 
 class BaseInterface(BaseShikijinComponent, metaclass=ABCMeta):
@@ -11,22 +24,106 @@ class BaseInterface(BaseShikijinComponent, metaclass=ABCMeta):
     def get_blob(self, blob_id: BlobId) -> Blob:
         ...
 
+    def get_blobs(self, blob_ids: Sequence[BlobId]) -> list[Blob]:
+        return [self.get_blob(blob_id) for blob_id in blob_ids]
+
+    def view_blob(self, blob_id: BlobId) -> memoryview:
+        """Read-only view of the payload of a blob, without copying it where the backend allows."""
+        return memoryview(self.get_blob(blob_id).blob)
+
     @abstractmethod
     def save_blob(self, blob: Blob) -> None:
         ...
 
+    def save_blob_stream(
+        self, source: ChunkSource, blob_id: Optional[BlobId] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> BlobId:
+        """Store a blob from an iterable of chunks or a binary file-like object and return its id.
+
+        This default assembles the payload in memory; backends storing blobs in chunks override
+        it so that memory use depends on the chunk size rather than on the blob size.
+        """
+        blob = Blob.construct_trusted(
+            id=blob_id if blob_id is not None else BlobId.generate(),
+            blob=Bytes(b"".join(iter_chunks(source, chunk_size))),
+        )
+        self.save_blob(blob)
+        return blob.id
+
+    def blob_size(self, blob_id: BlobId) -> int:
+        with self.view_blob(blob_id) as view:
+            return len(view)
+
+    def read_blob_range(self, blob_id: BlobId, offset: int, length: Optional[int] = None) -> bytes:
+        with self.view_blob(blob_id) as view:
+            start, end = resolve_range(len(view), offset, length)
+            return view[start:end].tobytes()
+
+    def open_blob_stream(
+        self, blob_id: BlobId, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0, length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Iterate over the payload of a blob, or a byte range of it, ``chunk_size`` bytes at a time."""
+        check_chunk_size(chunk_size)
+        view = self.view_blob(blob_id)
+        start, end = resolve_range(len(view), offset, length)
+        for position in range(start, end, chunk_size):
+            yield view[position : min(position + chunk_size, end)].tobytes()
+
     @abstractmethod
     def add_task(self, task: BaseTask) -> None:
         ...
 
+    def add_tasks(self, tasks: Sequence[BaseTask]) -> None:
+        for task in tasks:
+            self.add_task(task)
+
     @abstractmethod
     def get_task(self, task_id: TaskId) -> BaseTask:
         ...
 
+    def get_tasks(self, task_ids: Sequence[TaskId]) -> list[BaseTask]:
+        return [self.get_task(task_id) for task_id in task_ids]
+
     @abstractmethod
     def pickup_task(self, capabilities: Sequence[BaseCapability]) -> BaseTask:
+        """Return the best unassigned task that can be run with ``capabilities``, without assigning it.
+
+        The best task has the highest ``priority``, and is the oldest one among equals.
+        """
         ...
 
+    def pickup_tasks(self, capabilities: Sequence[BaseCapability], n: int) -> list[BaseTask]:
+        """Return up to ``n`` distinct unassigned tasks that can be run with ``capabilities``, best first.
+
+        An empty list is returned when no capable task is available. Backends that cannot
+        enumerate ready tasks cheaply may return fewer than ``n`` tasks; this default returns at most one.
+        """
+        if n <= 0:
+            return []
+        try:
+            return [self.pickup_task(capabilities)]
+        except NoCapableTaskError:
+            return []
+
+    def wait_for_task(self, capabilities: Sequence[BaseCapability], timeout: float) -> BaseTask:
+        """Pick up a capable task, waiting up to ``timeout`` seconds for one to be added.
+
+        Raises ``NoCapableTaskError`` when no capable task became available in time. This default
+        implementation polls ``pickup_task`` with an exponential backoff; backends that can be
+        notified of new tasks should override it.
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.001
+        while True:
+            try:
+                return self.pickup_task(capabilities)
+            except NoCapableTaskError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.5)
+
     @abstractmethod
     def create_assignment(self, worker_id: ComponentId, task: BaseTask) -> Assignment:
         ...
@@ -38,3 +135,141 @@ class BaseInterface(BaseShikijinComponent, metaclass=ABCMeta):
     @abstractmethod
     def abandon_assignment(self, assignment: Assignment) -> None:
         ...
+
+    def heartbeat(self, assignment: Assignment) -> Assignment:
+        """Renew the lease of ``assignment`` and return the assignment with its new expiry.
+
+        Workers call it while they run the task. It raises ``AssignmentNotFoundError`` once the
+        lease has expired and the task was handed to another worker. This default is for
+        backends whose assignments never expire.
+        """
+        return assignment
+
+    def fail_assignment(self, assignment: Assignment, error: str) -> None:
+        """End ``assignment`` after its task failed with ``error``.
+
+        The task is retried once the backoff of its ``retry_policy`` has passed, or moved to
+        the dead letters once it has used up its attempts. This default retries it at once,
+        for backends that cannot delay tasks.
+        """
+        self.abandon_assignment(assignment)
+
+    def get_dead_tasks(self) -> list[BaseTask]:
+        """Tasks given up after failing ``retry_policy.max_attempts`` times; adding one again revives it."""
+        return []
+
+
+class StorageBackedInterface(BaseInterface, metaclass=ABCMeta):
+    """Interface delegating every blob operation to a ``BaseStorage``."""
+
+    def __init__(self, logger: BaseLogger, name: Optional[ComponentName], storage: BaseStorage):
+        super(StorageBackedInterface, self).__init__(logger=logger, name=name)
+        self._storage = storage
+
+    @property
+    def storage(self) -> BaseStorage:
+        return self._storage
+
+    def get_blob(self, blob_id: BlobId) -> Blob:
+        return self._storage.get_blob(blob_id)
+
+    def get_blobs(self, blob_ids: Sequence[BlobId]) -> list[Blob]:
+        return self._storage.get_blobs(blob_ids)
+
+    def view_blob(self, blob_id: BlobId) -> memoryview:
+        return self._storage.view_blob(blob_id)
+
+    def save_blob(self, blob: Blob) -> None:
+        self._storage.save_blob(blob)
+
+    def save_blob_stream(
+        self, source: ChunkSource, blob_id: Optional[BlobId] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> BlobId:
+        return self._storage.save_blob_stream(iter_chunks(source, chunk_size), blob_id)
+
+    def blob_size(self, blob_id: BlobId) -> int:
+        return self._storage.blob_size(blob_id)
+
+    def read_blob_range(self, blob_id: BlobId, offset: int, length: Optional[int] = None) -> bytes:
+        return self._storage.read_blob_range(blob_id, offset, length)
+
+    def open_blob_stream(
+        self, blob_id: BlobId, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0, length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        return self._storage.open_blob_stream(blob_id, chunk_size, offset, length)
+
+
+class AsyncBaseInterface(BaseShikijinComponent, metaclass=ABCMeta):
+    """Coroutine counterpart of ``BaseInterface`` for workers running on an event loop."""
+
+    @abstractmethod
+    async def get_blob(self, blob_id: BlobId) -> Blob:
+        ...
+
+    async def get_blobs(self, blob_ids: Sequence[BlobId]) -> list[Blob]:
+        return [await self.get_blob(blob_id) for blob_id in blob_ids]
+
+    @abstractmethod
+    async def save_blob(self, blob: Blob) -> None:
+        ...
+
+    @abstractmethod
+    async def add_task(self, task: BaseTask) -> None:
+        ...
+
+    async def add_tasks(self, tasks: Sequence[BaseTask]) -> None:
+        for task in tasks:
+            await self.add_task(task)
+
+    @abstractmethod
+    async def get_task(self, task_id: TaskId) -> BaseTask:
+        ...
+
+    async def get_tasks(self, task_ids: Sequence[TaskId]) -> list[BaseTask]:
+        return [await self.get_task(task_id) for task_id in task_ids]
+
+    @abstractmethod
+    async def pickup_task(self, capabilities: Sequence[BaseCapability]) -> BaseTask:
+        ...
+
+    async def pickup_tasks(self, capabilities: Sequence[BaseCapability], n: int) -> list[BaseTask]:
+        if n <= 0:
+            return []
+        try:
+            return [await self.pickup_task(capabilities)]
+        except NoCapableTaskError:
+            return []
+
+    async def wait_for_task(self, capabilities: Sequence[BaseCapability], timeout: float) -> BaseTask:
+        deadline = time.monotonic() + timeout
+        delay = 0.001
+        while True:
+            try:
+                return await self.pickup_task(capabilities)
+            except NoCapableTaskError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.5)
+
+    @abstractmethod
+    async def create_assignment(self, worker_id: ComponentId, task: BaseTask) -> Assignment:
+        ...
+
+    @abstractmethod
+    async def complete_assignment(self, assignment: Assignment) -> None:
+        ...
+
+    @abstractmethod
+    async def abandon_assignment(self, assignment: Assignment) -> None:
+        ...
+
+    async def heartbeat(self, assignment: Assignment) -> Assignment:
+        return assignment
+
+    async def fail_assignment(self, assignment: Assignment, error: str) -> None:
+        await self.abandon_assignment(assignment)
+
+    async def get_dead_tasks(self) -> list[BaseTask]:
+        return []
@@ -0,0 +1,249 @@
+from collections import OrderedDict
+from collections.abc import Iterator, Sequence
+from threading import Lock
+from typing import Dict, Optional
+
+from ...fields import AssignmentId, BlobId, ComponentId, ComponentName, TaskId
+from ...storages.base import DEFAULT_CHUNK_SIZE, ChunkSource
+from ...types import Assignment, BaseCapability, BaseTask, Blob, CacheStats
+from ..base import BaseInterface
+
+
+class _SegmentedLru:
+    """Blobs bounded by their total size, evicted by a segmented LRU policy.
+
+    New blobs enter the probation segment; a blob hit there moves to the protected segment,
+    which holds up to ``protected_ratio`` of the capacity and demotes its least recently used
+    blobs back to probation. Evictions take the least recently used blob of probation first,
+    so a scan through many blobs read once cannot push out the blobs read repeatedly.
+    """
+
+    def __init__(self, capacity: int, protected_ratio: float):
+        self.capacity = capacity
+        self.protected_capacity = int(capacity * protected_ratio)
+        self.probation: OrderedDict[BlobId, Blob] = OrderedDict()
+        self.protected: OrderedDict[BlobId, Blob] = OrderedDict()
+        self.size = 0
+        self.protected_size = 0
+        self.evictions = 0
+
+    def get(self, blob_id: BlobId) -> Optional[Blob]:
+        blob = self.protected.get(blob_id)
+        if blob is not None:
+            self.protected.move_to_end(blob_id)
+            return blob
+        blob = self.probation.pop(blob_id, None)
+        if blob is None:
+            return None
+        self.protected[blob_id] = blob
+        self.protected_size += len(blob.blob)
+        while self.protected_size > self.protected_capacity:
+            demoted_id, demoted = self.protected.popitem(last=False)
+            self.protected_size -= len(demoted.blob)
+            self.probation[demoted_id] = demoted
+        return blob
+
+    def put(self, blob: Blob) -> None:
+        size = len(blob.blob)
+        if size > self.capacity or blob.id in self.protected or blob.id in self.probation:
+            return
+        self.probation[blob.id] = blob
+        self.size += size
+        while self.size > self.capacity:
+            segment = self.probation if self.probation else self.protected
+            _, evicted = segment.popitem(last=False)
+            self.size -= len(evicted.blob)
+            if segment is self.protected:
+                self.protected_size -= len(evicted.blob)
+            self.evictions += 1
+
+    def discard(self, blob_id: BlobId) -> None:
+        blob = self.protected.pop(blob_id, None)
+        if blob is not None:
+            self.protected_size -= len(blob.blob)
+        else:
+            blob = self.probation.pop(blob_id, None)
+            if blob is None:
+                return
+        self.size -= len(blob.blob)
+
+
+class CachingInterface(BaseInterface):
+    """Wrap ``interface`` with a cache of blobs of up to ``max_bytes`` bytes.
+
+    Blobs are immutable once saved under an id, so a cached blob never goes stale. Blobs
+    read with ``get_blob`` or ``get_blobs`` and blobs saved with ``save_blob``, which writes
+    through to ``interface``, are cached; streams and views of blobs that are not cached go
+    to ``interface`` without filling the cache. The cache is scan resistant (see
+    ``_SegmentedLru``), and ``stats`` reports its hits, misses and size in bytes. Every other
+    call is passed on to ``interface``.
+
+    Since an interface collecting blobs (see ``InMemoryInterface``) may delete the blobs of a
+    task once it completes, the blobs of a task assigned through this interface are evicted
+    when its assignment is completed through it. Blobs collected on completions made through
+    other clients stay cached until evicted by size.
+    """
+
+    def __init__(
+        self,
+        interface: BaseInterface,
+        max_bytes: int,
+        name: Optional[ComponentName] = None,
+        protected_ratio: float = 0.8,
+    ):
+        super(CachingInterface, self).__init__(logger=interface.logger, name=name)
+        if max_bytes < 0 or not 0.0 <= protected_ratio <= 1.0:
+            raise ValueError(f"invalid cache bounds: max_bytes={max_bytes}, protected_ratio={protected_ratio}")
+        self._interface = interface
+        self._cache = _SegmentedLru(max_bytes, protected_ratio)
+        self._lock = Lock()
+        # blobs of the tasks assigned through this interface, to evict once they complete
+        self._assigned: Dict[AssignmentId, list[BlobId]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def interface(self) -> BaseInterface:
+        return self._interface
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._cache.evictions,
+                size=self._cache.size,
+                capacity=self._cache.capacity,
+            )
+
+    def _cached(self, blob_id: BlobId) -> Optional[Blob]:
+        with self._lock:
+            blob = self._cache.get(blob_id)
+            if blob is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return blob
+
+    def _peek(self, blob_id: BlobId) -> Optional[Blob]:
+        # for calls reading part of a blob, which count neither as hits nor as misses
+        with self._lock:
+            return self._cache.get(blob_id)
+
+    def _keep(self, blobs: Sequence[Blob]) -> None:
+        with self._lock:
+            for blob in blobs:
+                self._cache.put(blob)
+
+    def get_blob(self, blob_id: BlobId) -> Blob:
+        blob = self._cached(blob_id)
+        if blob is None:
+            blob = self._interface.get_blob(blob_id)
+            self._keep((blob,))
+        return blob
+
+    def get_blobs(self, blob_ids: Sequence[BlobId]) -> list[Blob]:
+        found: Dict[BlobId, Blob] = {}
+        missing = []
+        for blob_id in blob_ids:
+            blob = self._cached(blob_id)
+            if blob is None:
+                missing.append(blob_id)
+            else:
+                found[blob_id] = blob
+        if missing:
+            fetched = self._interface.get_blobs(missing)
+            self._keep(fetched)
+            found.update((blob.id, blob) for blob in fetched)
+        return [found[blob_id] for blob_id in blob_ids]
+
+    def view_blob(self, blob_id: BlobId) -> memoryview:
+        blob = self._peek(blob_id)
+        if blob is None:
+            return self._interface.view_blob(blob_id)
+        return memoryview(blob.blob)
+
+    def save_blob(self, blob: Blob) -> None:
+        self._interface.save_blob(blob)
+        self._keep((blob,))
+
+    def save_blob_stream(
+        self, source: ChunkSource, blob_id: Optional[BlobId] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> BlobId:
+        return self._interface.save_blob_stream(source, blob_id, chunk_size)
+
+    def blob_size(self, blob_id: BlobId) -> int:
+        blob = self._peek(blob_id)
+        if blob is None:
+            return self._interface.blob_size(blob_id)
+        return len(blob.blob)
+
+    def read_blob_range(self, blob_id: BlobId, offset: int, length: Optional[int] = None) -> bytes:
+        if self._peek(blob_id) is None:
+            return self._interface.read_blob_range(blob_id, offset, length)
+        return super(CachingInterface, self).read_blob_range(blob_id, offset, length)
+
+    def open_blob_stream(
+        self, blob_id: BlobId, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0, length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        if self._peek(blob_id) is None:
+            return self._interface.open_blob_stream(blob_id, chunk_size, offset, length)
+        return super(CachingInterface, self).open_blob_stream(blob_id, chunk_size, offset, length)
+
+    def add_task(self, task: BaseTask) -> None:
+        self._interface.add_task(task)
+
+    def add_tasks(self, tasks: Sequence[BaseTask]) -> None:
+        self._interface.add_tasks(tasks)
+
+    def get_task(self, task_id: TaskId) -> BaseTask:
+        return self._interface.get_task(task_id)
+
+    def get_tasks(self, task_ids: Sequence[TaskId]) -> list[BaseTask]:
+        return self._interface.get_tasks(task_ids)
+
+    def pickup_task(self, capabilities: Sequence[BaseCapability]) -> BaseTask:
+        return self._interface.pickup_task(capabilities)
+
+    def pickup_tasks(self, capabilities: Sequence[BaseCapability], n: int) -> list[BaseTask]:
+        return self._interface.pickup_tasks(capabilities, n)
+
+    def wait_for_task(self, capabilities: Sequence[BaseCapability], timeout: float) -> BaseTask:
+        return self._interface.wait_for_task(capabilities, timeout)
+
+    def create_assignment(self, worker_id: ComponentId, task: BaseTask) -> Assignment:
+        assignment = self._interface.create_assignment(worker_id, task)
+        blob_ids = task.blob_ids()
+        if blob_ids:
+            with self._lock:
+                self._assigned[assignment.id] = blob_ids
+        return assignment
+
+    def complete_assignment(self, assignment: Assignment) -> None:
+        try:
+            self._interface.complete_assignment(assignment)
+        finally:
+            # evicting blobs still stored costs only a cache miss
+            with self._lock:
+                for blob_id in self._assigned.pop(assignment.id, ()):
+                    self._cache.discard(blob_id)
+
+    def abandon_assignment(self, assignment: Assignment) -> None:
+        try:
+            self._interface.abandon_assignment(assignment)
+        finally:
+            with self._lock:
+                self._assigned.pop(assignment.id, None)
+
+    def heartbeat(self, assignment: Assignment) -> Assignment:
+        return self._interface.heartbeat(assignment)
+
+    def fail_assignment(self, assignment: Assignment, error: str) -> None:
+        try:
+            self._interface.fail_assignment(assignment, error)
+        finally:
+            with self._lock:
+                self._assigned.pop(assignment.id, None)
+
+    def get_dead_tasks(self) -> list[BaseTask]:
+        return self._interface.get_dead_tasks()
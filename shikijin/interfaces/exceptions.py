@@ -12,18 +12,38 @@ class BaseInterfaceError(BaseError):
 class BlobNotFoundError(BaseInterfaceError):
     def __init__(self, blob_id: BlobId):
         super(BlobNotFoundError, self).__init__(f"blob {blob_id} not found")
+        self.blob_id = blob_id
+
+
+class BlobCorruptedError(BaseInterfaceError):
+    def __init__(self, blob_id: BlobId, reason: str):
+        super(BlobCorruptedError, self).__init__(f"blob {blob_id} is corrupted: {reason}")
+        self.blob_id = blob_id
 
 
 class TaskNotFoundError(BaseInterfaceError):
     def __init__(self, task_id: TaskId):
         super(TaskNotFoundError, self).__init__(f"task {task_id} not found")
+        self.task_id = task_id
 
 
 class AssignmentNotFoundError(BaseInterfaceError):
     def __init__(self, assignment_id: AssignmentId):
         super(AssignmentNotFoundError, self).__init__(f"assignment {assignment_id} not found")
+        self.assignment_id = assignment_id
 
 
 class NoCapableTaskError(BaseInterfaceError):
     def __init__(self, capabilities: Sequence[BaseCapability]):
         super(NoCapableTaskError, self).__init__(f"no capable task found for capabilities {capabilities}")
+        self.capabilities = capabilities
+
+
+class TaskAlreadyAssignedError(BaseInterfaceError):
+    def __init__(self, task_id: TaskId):
+        super(TaskAlreadyAssignedError, self).__init__(f"task {task_id} is already assigned or completed")
+        self.task_id = task_id
+
+
+class RemoteInterfaceError(BaseInterfaceError):
+    """Failure of a ``RemoteInterface`` call that is not one of the errors above."""
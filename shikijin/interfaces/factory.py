@@ -1,8 +1,13 @@
 from ..components import BaseShikijinComponentFactory
 from ..settings import GlobalSettings, InterfaceType
+from ..storages.factory import StorageFactory
 from .base import BaseInterface
 from .in_memory_interface.core import InMemoryInterface
 from .in_memory_interface.settings import InMemoryInterfaceSettings
+from .remote_interface.core import RemoteInterface
+from .remote_interface.settings import RemoteInterfaceSettings
+from .sqlite_interface.core import SqliteInterface
+from .sqlite_interface.settings import SqliteInterfaceSettings
 
 
 class InterfaceFactory(BaseShikijinComponentFactory[BaseInterface]):
@@ -12,5 +17,49 @@ class InterfaceFactory(BaseShikijinComponentFactory[BaseInterface]):
             self.log_info("creating interface")
             self.log_info(f"interface settings: {settings.interface_settings}")
             s = InMemoryInterfaceSettings.from_global_settings(settings=settings)
-            return InMemoryInterface(logger=self.logger, name=s.name)
+            return InMemoryInterface(
+                logger=self.logger,
+                name=s.name,
+                lock_stripes=s.lock_stripes,
+                lease_duration=s.lease_duration,
+                owner_weights=s.owner_weights,
+                default_owner_weight=s.default_owner_weight,
+                memo_size=s.memo_size,
+                collect_blobs=s.collect_blobs,
+                storage=StorageFactory(logger=self.logger).create(settings=settings),
+            )
+        if t == InterfaceType.SQLITE:
+            self.log_info("creating interface")
+            self.log_info(f"interface settings: {settings.interface_settings}")
+            sq = SqliteInterfaceSettings.from_global_settings(settings=settings)
+            # blobs live in the same database unless a storage is configured explicitly
+            storage = (
+                StorageFactory(logger=self.logger).create(settings=settings)
+                if "storage_type" in settings.__fields_set__
+                else None
+            )
+            return SqliteInterface(
+                path=sq.path,
+                logger=self.logger,
+                name=sq.name,
+                busy_timeout=sq.busy_timeout,
+                synchronous=sq.synchronous,
+                poll_interval=sq.poll_interval,
+                lease_duration=sq.lease_duration,
+                storage=storage,
+            )
+        if t == InterfaceType.REMOTE:
+            self.log_info("creating interface")
+            self.log_info(f"interface settings: {settings.interface_settings}")
+            r = RemoteInterfaceSettings.from_global_settings(settings=settings)
+            return RemoteInterface(
+                address=r.address,
+                logger=self.logger,
+                name=r.name,
+                pool_size=r.pool_size,
+                timeout=r.timeout,
+                compression=r.compression,
+                compression_min_size=r.compression_min_size,
+                max_frame_size=r.max_frame_size,
+            )
         raise ValueError(f"unknown interface type: {t}")
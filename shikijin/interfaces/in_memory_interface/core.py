@@ -1,52 +1,507 @@
-from collections.abc import Sequence
-from typing import Dict, Optional
+import heapq
+import time
+from collections.abc import Mapping, Sequence
+from itertools import count
+from threading import Condition, Lock
+from typing import Dict, Optional, Set, Tuple
 
-from ...fields import BlobId, ComponentName, TaskId
+from ...fields import (
+    AssignmentId,
+    BlobId,
+    ComponentId,
+    ComponentName,
+    TaskId,
+    Timestamp,
+    WorkerId,
+)
 from ...loggers.base import BaseLogger
-from ...types import Assignment, BaseCapability, BaseTask, Blob
-from ..base import BaseInterface
+from ...storages.base import BaseStorage
+from ...storages.in_memory_storage.core import InMemoryStorage
+from ...types import (
+    Assignment,
+    BaseCapability,
+    BaseTask,
+    CacheStats,
+    provided_capability_names,
+)
+from ..base import StorageBackedInterface
 from ..exceptions import (
     AssignmentNotFoundError,
     BlobNotFoundError,
     NoCapableTaskError,
+    TaskAlreadyAssignedError,
     TaskNotFoundError,
 )
+from ..memo import MemoStore
+from .scheduler import ReadyQueues
+
+
+class InMemoryInterface(StorageBackedInterface):
+    """Interface keeping every task, assignment and blob in process memory.
+
+    Unassigned tasks are kept in ready queues keyed by their owner and capability signature,
+    so ``pickup_task`` only looks at the heads of the queues whose signature the caller can
+    satisfy instead of scanning every task ever added. Owners share the workers by weighted
+    fair queueing, with the weights given by ``owner_weights`` and ``default_owner_weight``:
+    one owner submitting a million tasks only gets its share while others have ready tasks
+    (see ``ReadyQueues``). Within an owner, tasks are picked up by decreasing ``priority``
+    and then first in, first out. Adding and claiming a task costs O(log n). Callers blocked
+    in ``wait_for_task`` are woken up whenever a task becomes ready.
+
+    The interface can be shared by many threads. The state of a task (its assignment and
+    completion) is guarded by one of ``lock_stripes`` locks chosen by the task id, and the
+    ready queues have their own lock, always taken after the task lock. ``create_assignment``
+    is the atomic claim: it fails with ``TaskAlreadyAssignedError`` for every caller but one.
+
+    Assignments are leases of ``lease_duration`` seconds, renewed by ``heartbeat``. Their
+    expiry times are kept in a heap, so reclaiming expired leases, which happens whenever
+    tasks are picked up, only looks at the leases that have actually expired. A reclaimed
+    task goes back to the front of its ready queue.
+
+    Tasks whose ``not_before`` has not passed yet, including failed tasks waiting for their
+    retry, sit in a timer heap instead of a ready queue, and are moved to the back of their
+    queue when they become due; until then they cost nothing to ``pickup_task``. Tasks that
+    used up their attempts are kept aside as dead letters.
+
+    A task with ``depends_on`` gets a counter of its dependencies that have not completed
+    yet, and is listed as a dependent of each of them; it only enters a ready queue when
+    the completion of its last dependency brings the counter to zero. Completing a task
+    thus costs O(1) per dependent, and pickup never looks at waiting tasks.
+
+    Tasks of classes that set ``memoize`` are looked up by ``content_hash`` in a
+    ``MemoStore`` of ``memo_size`` entries when they are first added. A task identical to
+    one in flight is not queued: it joins the first one, completes with it, releasing its
+    own dependents, and is dead-lettered with it if it dies. A task identical to a completed
+    one is completed at once. ``memo_stats`` counts the hits and misses of the store.
+
+    With ``collect_blobs``, the interface counts the tasks referring to each blob through
+    their ``blob_ids``, from the time they are added until they complete, and deletes a blob
+    from the storage when the last task referring to it completes. Blobs no task ever
+    referred to, such as final results, are kept.
 
+    Blobs are delegated to ``storage``, which defaults to an ``InMemoryStorage``.
+    """
 
-class InMemoryInterface(BaseInterface):
-    def __init__(self, logger: BaseLogger, name: Optional[ComponentName]):
-        super(InMemoryInterface, self).__init__(logger=logger, name=name)
+    def __init__(
+        self,
+        logger: BaseLogger,
+        name: Optional[ComponentName],
+        lock_stripes: int = 64,
+        storage: Optional[BaseStorage] = None,
+        lease_duration: Optional[float] = 60.0,
+        owner_weights: Optional[Mapping[str, float]] = None,
+        default_owner_weight: float = 1.0,
+        memo_size: int = 100_000,
+        collect_blobs: bool = False,
+    ):
+        super(InMemoryInterface, self).__init__(
+            logger=logger, name=name, storage=storage if storage is not None else InMemoryStorage(logger=logger)
+        )
         self._task_map: Dict[TaskId, BaseTask] = {}
+        self._ready = ReadyQueues(weights=owner_weights, default_weight=default_owner_weight)
         self._assignment_map: Dict[TaskId, Assignment] = {}
-        self._blobs: Dict[BlobId, Blob] = {}
+        self._completed_tasks: Set[TaskId] = set()
+        self._task_locks = [Lock() for _ in range(max(1, lock_stripes))]
+        self._task_ready = Condition()
+        self._ready_version = 0
+        self._lease_duration = None if lease_duration is None else int(lease_duration * 1_000_000)
+        # (expires_at, assignment id, task id); entries outlived by a heartbeat or a completion are skipped
+        self._leases: list[Tuple[int, AssignmentId, TaskId]] = []
+        self._leases_lock = Lock()
+        # delayed task id -> not_before; the heap holds (not_before, insertion order, task id)
+        self._delayed: Dict[TaskId, int] = {}
+        self._timers: list[Tuple[int, int, TaskId]] = []
+        self._timers_lock = Lock()
+        self._timer_order = count()
+        self._dead_tasks: Dict[TaskId, BaseTask] = {}
+        # task id -> number of its dependencies yet to complete, and task id -> the tasks waiting for it
+        self._pending: Dict[TaskId, int] = {}
+        self._dependents: Dict[TaskId, list[TaskId]] = {}
+        self._memo = MemoStore(capacity=memo_size)
+        # task id -> the identical tasks that joined it, and the reverse
+        self._joined: Dict[TaskId, list[TaskId]] = {}
+        self._aliases: Dict[TaskId, TaskId] = {}
+        # guards the maps above, the completed tasks and the dead tasks, taken after task locks
+        self._dependencies_lock = Lock()
+        # blob id -> number of tasks added and not completed yet that refer to it
+        self._collect_blobs = collect_blobs
+        self._blob_refs: Dict[BlobId, int] = {}
+        self._blob_refs_lock = Lock()
 
-    def abandon_assignment(self, assignment: Assignment) -> None:
-        if assignment.task_id not in self._assignment_map:
+    def _task_lock(self, task_id: TaskId) -> Lock:
+        return self._task_locks[hash(task_id) % len(self._task_locks)]
+
+    def _enqueue(self, task: BaseTask, front: bool = False) -> None:
+        self._ready.push(task, front)
+
+    def _dequeue(self, task: BaseTask) -> bool:
+        return self._ready.remove(task)
+
+    def _notify_ready(self) -> None:
+        with self._task_ready:
+            self._ready_version += 1
+            self._task_ready.notify_all()
+
+    def _schedule(self, task: BaseTask, now: int) -> bool:
+        """Enqueue ``task``, or put it on the timer heap if it is not due yet; return whether it was enqueued.
+
+        Must be called with the lock of the task.
+        """
+        if task.is_due(now):
+            self._delayed.pop(task.id, None)
+            self._enqueue(task)
+            return True
+        assert task.not_before is not None
+        self._dequeue(task)
+        self._delayed[task.id] = task.not_before
+        entry: Tuple[int, int, TaskId] = (task.not_before, next(self._timer_order), task.id)
+        with self._timers_lock:
+            heapq.heappush(self._timers, entry)
+        return False
+
+    def _next_timer(self) -> Optional[int]:
+        try:
+            return self._timers[0][0]
+        except IndexError:
+            return None
+
+    def _release_due(self) -> None:
+        next_due = self._next_timer()
+        if next_due is None or next_due > Timestamp.now():
+            return
+        now = Timestamp.now()
+        due = []
+        with self._timers_lock:
+            timers = self._timers
+            while timers and timers[0][0] <= now:
+                due.append(heapq.heappop(timers))
+        released = False
+        for not_before, _, task_id in due:
+            with self._task_lock(task_id):
+                if self._delayed.get(task_id) != not_before:
+                    continue
+                del self._delayed[task_id]
+                self._enqueue(self._task_map[task_id])
+                released = True
+        if released:
+            self._notify_ready()
+
+    def _pop_assignment(self, assignment: Assignment) -> None:
+        current = self._assignment_map.get(assignment.task_id)
+        if current is None or current.id != assignment.id:
             self.log_error(f"assignment {assignment} not found")
             raise AssignmentNotFoundError(assignment_id=assignment.id)
-        self._assignment_map.pop(assignment.task_id)
+        del self._assignment_map[assignment.task_id]
+
+    def _lease(self, assignment: Assignment) -> None:
+        if assignment.expires_at is None:
+            return
+        with self._leases_lock:
+            leases = self._leases
+            entry: Tuple[int, AssignmentId, TaskId] = (assignment.expires_at, assignment.id, assignment.task_id)
+            heapq.heappush(leases, entry)
+            if len(leases) > 1024 and len(leases) > 4 * len(self._assignment_map):
+                # drop the entries of leases that were renewed or ended, so the heap stays proportional to live ones
+                self._leases = [
+                    (a.expires_at, a.id, a.task_id)
+                    for a in list(self._assignment_map.values())
+                    if a.expires_at is not None
+                ]
+                heapq.heapify(self._leases)
+
+    def _next_expiry(self) -> Optional[int]:
+        try:
+            return self._leases[0][0]
+        except IndexError:
+            return None
 
-    def get_blob(self, blob_id: BlobId) -> Blob:
-        if id not in self._blobs:
-            self.log_error(f"blob {blob_id} not found")
-            raise BlobNotFoundError(blob_id=blob_id)
-        return self._blobs[id]
+    def _reclaim_expired(self) -> None:
+        next_expiry = self._next_expiry()
+        if next_expiry is None or next_expiry > Timestamp.now():
+            return
+        now = Timestamp.now()
+        expired = []
+        with self._leases_lock:
+            leases = self._leases
+            while leases and leases[0][0] <= now:
+                expired.append(heapq.heappop(leases))
+        reclaimed = False
+        for expires_at, assignment_id, task_id in expired:
+            with self._task_lock(task_id):
+                current = self._assignment_map.get(task_id)
+                if current is None or current.id != assignment_id or current.expires_at != expires_at:
+                    continue
+                del self._assignment_map[task_id]
+                self._enqueue(self._task_map[task_id], front=True)
+                reclaimed = True
+            self.log_warning(f"lease of assignment {assignment_id} expired, task {task_id} is ready again")
+        if reclaimed:
+            self._notify_ready()
 
-    def save_blob(self, blob: Blob) -> None:
-        self._blobs[blob.id] = blob
+    def heartbeat(self, assignment: Assignment) -> Assignment:
+        if self._lease_duration is None:
+            return assignment
+        with self._task_lock(assignment.task_id):
+            current = self._assignment_map.get(assignment.task_id)
+            if current is None or current.id != assignment.id:
+                self.log_error(f"assignment {assignment} not found")
+                raise AssignmentNotFoundError(assignment_id=assignment.id)
+            now = Timestamp.now()
+            renewed = Assignment.construct_trusted(
+                id=current.id,
+                created_at=current.created_at,
+                updated_at=now,
+                worker_id=current.worker_id,
+                task_id=current.task_id,
+                expires_at=Timestamp(now + self._lease_duration),
+            )
+            self._assignment_map[assignment.task_id] = renewed
+        self._lease(renewed)
+        return renewed
+
+    def abandon_assignment(self, assignment: Assignment) -> None:
+        with self._task_lock(assignment.task_id):
+            self._pop_assignment(assignment)
+            self._enqueue(self._task_map[assignment.task_id], front=True)
+        self._notify_ready()
+
+    def fail_assignment(self, assignment: Assignment, error: str) -> None:
+        with self._task_lock(assignment.task_id):
+            self._pop_assignment(assignment)
+            task = self._task_map[assignment.task_id]
+            retry = task.retried()
+            if retry is None:
+                with self._dependencies_lock:
+                    self._dead_tasks[task.id] = task
+                    for duplicate in self._joined.pop(task.id, ()):
+                        del self._aliases[duplicate]
+                        self._dead_tasks[duplicate] = self._task_map[duplicate]
+                if task.memoize:
+                    # identical tasks added from now on run again
+                    self._memo.discard(task.content_hash(), task.id)
+                self.log_error(f"task {task.id} failed {task.attempts + 1} times, giving up: {error}")
+                return
+            self._task_map[task.id] = retry
+            enqueued = self._schedule(retry, Timestamp.now())
+        if enqueued:
+            self._notify_ready()
+
+    def get_dead_tasks(self) -> list[BaseTask]:
+        return list(self._dead_tasks.values())
+
+    def memo_stats(self) -> CacheStats:
+        return self._memo.stats()
+
+    def _wait_for_dependencies(self, task: BaseTask, first: bool) -> bool:
+        """Whether ``task`` waits for some of its dependencies, which are counted when it is ``first`` added.
+
+        Must be called with the lock of the task.
+        """
+        if not first:
+            return task.id in self._pending
+        if not task.depends_on:
+            return False
+        with self._dependencies_lock:
+            waiting = [d for d in dict.fromkeys(task.depends_on) if d not in self._completed_tasks]
+            if not waiting:
+                return False
+            self._pending[task.id] = len(waiting)
+            for dependency in waiting:
+                self._dependents.setdefault(dependency, []).append(task.id)
+        return True
+
+    def _join_memoized(self, task: BaseTask, first: bool, released: list[TaskId]) -> bool:
+        """Whether ``task`` joins an identical task instead of running, which is looked up when it is ``first`` added.
+
+        Dependents released because the identical task already completed are appended to
+        ``released``. Must be called with the lock of the task.
+        """
+        if not first:
+            return task.id in self._aliases
+        if not task.memoize:
+            return False
+        key = task.content_hash()
+        with self._dependencies_lock:
+            original = self._memo.get(key)
+            if original is None or original in self._dead_tasks:
+                self._memo.put(key, task.id)
+                return False
+            if original in self._completed_tasks:
+                completed, newly_released = self._mark_completed(task.id)
+                released.extend(newly_released)
+            else:
+                self._aliases[task.id] = original
+                self._joined.setdefault(original, []).append(task.id)
+                return True
+        self._release_blobs(completed)
+        return True
+
+    def _mark_completed(self, task_id: TaskId) -> Tuple[list[TaskId], list[TaskId]]:
+        """Mark the task and the tasks that joined it completed; return them and the dependents this released.
+
+        Must be called with the dependencies lock.
+        """
+        completed = []
+        released = []
+        to_complete = [task_id]
+        while to_complete:
+            task_id = to_complete.pop()
+            completed.append(task_id)
+            self._completed_tasks.add(task_id)
+            self._aliases.pop(task_id, None)
+            to_complete.extend(self._joined.pop(task_id, ()))
+            for dependent in self._dependents.pop(task_id, ()):
+                pending = self._pending[dependent] - 1
+                if pending:
+                    self._pending[dependent] = pending
+                else:
+                    del self._pending[dependent]
+                    released.append(dependent)
+        return completed, released
+
+    def _retain_blobs(self, task: BaseTask, previous: Optional[BaseTask]) -> None:
+        """Count the references of ``task`` to blobs, in place of those of the ``previous`` version of the task."""
+        if not self._collect_blobs:
+            return
+        with self._blob_refs_lock:
+            refs = self._blob_refs
+            for blob_id in task.blob_ids():
+                refs[blob_id] = refs.get(blob_id, 0) + 1
+            if previous is not None:
+                self._drop_blob_refs(previous.blob_ids())
+
+    def _release_blobs(self, task_ids: list[TaskId]) -> None:
+        """Drop the references of the completed tasks ``task_ids`` to blobs."""
+        if not self._collect_blobs:
+            return
+        with self._blob_refs_lock:
+            for task_id in task_ids:
+                self._drop_blob_refs(self._task_map[task_id].blob_ids())
+
+    def _drop_blob_refs(self, blob_ids: list[BlobId]) -> None:
+        # deletes under the lock, so that a task added meanwhile cannot refer to a blob being deleted
+        refs = self._blob_refs
+        for blob_id in blob_ids:
+            count = refs[blob_id] - 1
+            if count:
+                refs[blob_id] = count
+                continue
+            del refs[blob_id]
+            try:
+                self._storage.delete_blob(blob_id)
+            except BlobNotFoundError:
+                pass
+
+    def _release_dependents(self, task_ids: list[TaskId]) -> None:
+        now = Timestamp.now()
+        enqueued = False
+        for task_id in task_ids:
+            with self._task_lock(task_id):
+                enqueued = self._schedule(self._task_map[task_id], now) or enqueued
+        if enqueued:
+            self._notify_ready()
+
+    def complete_assignment(self, assignment: Assignment) -> None:
+        with self._task_lock(assignment.task_id):
+            self._pop_assignment(assignment)
+            with self._dependencies_lock:
+                completed, released = self._mark_completed(assignment.task_id)
+        self._release_blobs(completed)
+        if released:
+            self._release_dependents(released)
+
+    def create_assignment(self, worker_id: ComponentId, task: BaseTask) -> Assignment:
+        with self._task_lock(task.id):
+            # the stored task, which is the one in the ready queues
+            current = self._task_map.get(task.id, task)
+            if task.id in self._assignment_map or not self._dequeue(current):
+                self.log_error(f"task {task.id} is not available")
+                raise TaskAlreadyAssignedError(task_id=task.id)
+            self._ready.charge(current)
+            now = Timestamp.now()
+            assignment = Assignment.construct_trusted(
+                created_at=now,
+                updated_at=now,
+                worker_id=WorkerId(worker_id),
+                task_id=task.id,
+                expires_at=None if self._lease_duration is None else Timestamp(now + self._lease_duration),
+            )
+            self._assignment_map[task.id] = assignment
+        self._lease(assignment)
+        return assignment
 
     def add_task(self, task: BaseTask) -> None:
-        self._task_map[task.id] = task
+        self.add_tasks((task,))
+
+    def add_tasks(self, tasks: Sequence[BaseTask]) -> None:
+        enqueued = False
+        released: list[TaskId] = []
+        now = Timestamp.now()
+        for task in tasks:
+            with self._task_lock(task.id):
+                previous = self._task_map.get(task.id)
+                if previous is not None and previous.owner != task.owner:
+                    # the task moves to the queue of its new owner
+                    self._dequeue(previous)
+                self._task_map[task.id] = task
+                if task.id in self._completed_tasks:
+                    continue
+                self._retain_blobs(task, previous)
+                if task.id in self._assignment_map:
+                    continue
+                if self._join_memoized(task, previous is None, released):
+                    continue
+                if self._wait_for_dependencies(task, first=previous is None):
+                    continue
+                self._dead_tasks.pop(task.id, None)
+                enqueued = self._schedule(task, now) or enqueued
+        if enqueued:
+            self._notify_ready()
+        if released:
+            self._release_dependents(released)
 
     def get_task(self, task_id: TaskId) -> BaseTask:
-        if id not in self._task_map:
+        if task_id not in self._task_map:
             self.log_error(f"task {task_id} not found")
             raise TaskNotFoundError(task_id=task_id)
-        return self._task_map[id]
+        return self._task_map[task_id]
+
+    def get_tasks(self, task_ids: Sequence[TaskId]) -> list[BaseTask]:
+        task_map = self._task_map
+        try:
+            return [task_map[task_id] for task_id in task_ids]
+        except KeyError as e:
+            self.log_error(f"task {e.args[0]} not found")
+            raise TaskNotFoundError(task_id=e.args[0])
 
     def pickup_task(self, capabilities: Sequence[BaseCapability]) -> BaseTask:
-        for k, v in self._task_map.items():
-            if v.is_capable(capabilities):
-                if k not in self._assignment_map:
-                    return v
-        raise NoCapableTaskError(capabilities=capabilities)
+        self._reclaim_expired()
+        self._release_due()
+        task = self._ready.best(provided_capability_names(capabilities))
+        if task is None:
+            raise NoCapableTaskError(capabilities=capabilities)
+        return task
+
+    def pickup_tasks(self, capabilities: Sequence[BaseCapability], n: int) -> list[BaseTask]:
+        self._reclaim_expired()
+        self._release_due()
+        return self._ready.first(provided_capability_names(capabilities), n)
+
+    def wait_for_task(self, capabilities: Sequence[BaseCapability], timeout: float) -> BaseTask:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._task_ready:
+                version = self._ready_version
+            try:
+                return self.pickup_task(capabilities)
+            except NoCapableTaskError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise
+            # wake up in time to reclaim the next lease to expire and to release the next delayed task
+            for wakeup in (self._next_expiry(), self._next_timer()):
+                if wakeup is not None:
+                    remaining = min(remaining, max(wakeup - Timestamp.now(), 0) / 1_000_000 + 0.001)
+            with self._task_ready:
+                if self._ready_version == version:
+                    self._task_ready.wait(remaining)
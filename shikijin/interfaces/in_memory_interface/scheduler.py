@@ -0,0 +1,244 @@
+"""Ready queues of ``InMemoryInterface``, shared fairly between the owners of tasks.
+
+Ready tasks are kept in one heap per owner and capability signature, ordered by decreasing
+``priority`` and then by order of arrival. Owners share the workers by stride scheduling, a
+form of weighted fair queueing: each owner has a *pass* that grows by ``1 / weight`` whenever
+one of its tasks is claimed, and the capable owner with the smallest pass is served next, so
+while they both have ready tasks an owner of weight 2 gets twice the claims of an owner of
+weight 1. An owner coming back after it had no ready task starts from the pass of the last
+served owner, so it cannot bank the share it did not use. Each signature keeps a heap of its
+owners by pass, so picking a task costs O(log n) in the number of owners and of tasks. Tasks
+without an owner share the pool of the ``None`` owner.
+"""
+
+import heapq
+from collections.abc import Mapping
+from itertools import count
+from operator import itemgetter
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from ...fields import TaskId
+from ...types import BaseTask, CapabilitySignature
+
+# (-priority, order of arrival): the smallest key is picked up first
+_Key = Tuple[int, int]
+
+
+class _Queue:
+    """Ready tasks of one owner and signature, in a heap of ``(-priority, order, task id)``.
+
+    Removed tasks leave stale heap entries behind, recognized by a key that no longer
+    matches ``tasks``; they are skipped, and the heap is rebuilt once they outnumber the
+    live ones.
+    """
+
+    __slots__ = ("tasks", "heap")
+
+    def __init__(self) -> None:
+        self.tasks: Dict[TaskId, Tuple[_Key, BaseTask]] = {}
+        self.heap: list[Tuple[int, int, TaskId]] = []
+
+    def push(self, task: BaseTask, order: int) -> None:
+        key = (-task.priority, order)
+        current = self.tasks.get(task.id)
+        self.tasks[task.id] = (key, task)
+        if current is None or current[0] != key:
+            entry: Tuple[int, int, TaskId] = (key[0], key[1], task.id)
+            heapq.heappush(self.heap, entry)
+            self._compact()
+
+    def order_of(self, task_id: TaskId) -> Optional[int]:
+        current = self.tasks.get(task_id)
+        return None if current is None else current[0][1]
+
+    def remove(self, task_id: TaskId) -> bool:
+        if self.tasks.pop(task_id, None) is None:
+            return False
+        self._compact()
+        return True
+
+    def _compact(self) -> None:
+        if len(self.heap) > 2 * len(self.tasks) + 64:
+            self.heap = [(key[0], key[1], task_id) for task_id, (key, _) in self.tasks.items()]
+            heapq.heapify(self.heap)
+
+    def head(self) -> Optional[Tuple[_Key, BaseTask]]:
+        heap, tasks = self.heap, self.tasks
+        while heap:
+            priority, order, task_id = heap[0]
+            current = tasks.get(task_id)
+            if current is not None and current[0] == (priority, order):
+                return current
+            heapq.heappop(heap)
+        return None
+
+    def first(self, n: int) -> list[Tuple[_Key, BaseTask]]:
+        """The ``n`` first live tasks in heap order, found by walking the heap without popping it."""
+        heap, tasks = self.heap, self.tasks
+        found: list[Tuple[_Key, BaseTask]] = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(found) < n:
+            (priority, order, task_id), i = heapq.heappop(frontier)
+            current = tasks.get(task_id)
+            if current is not None and current[0] == (priority, order):
+                found.append(current)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return found
+
+
+class _Owner:
+    __slots__ = ("id", "rank", "weight", "pass_", "ready", "queues")
+
+    def __init__(self, owner_id: Optional[str], rank: int, weight: float, pass_: float):
+        self.id = owner_id
+        self.rank = rank
+        self.weight = weight
+        self.pass_ = pass_
+        # number of ready tasks over every signature
+        self.ready = 0
+        self.queues: Dict[CapabilitySignature, _Queue] = {}
+
+
+# (pass of the owner when offered, rank of the owner, offer number, owner); an entry is
+# stale once the pass of its owner has moved on or its queue is empty
+_Offer = Tuple[float, int, int, _Owner]
+
+
+class ReadyQueues:
+    """Ready tasks by owner and capability signature, served by weighted fair share.
+
+    ``weights`` gives the weight of some owners and ``default_weight`` that of the others,
+    including tasks without an owner. Every method is thread-safe.
+    """
+
+    def __init__(self, weights: Optional[Mapping[str, float]] = None, default_weight: float = 1.0):
+        self._weights = dict(weights or {})
+        for owner_id, weight in [(None, default_weight), *self._weights.items()]:
+            if not weight > 0:
+                raise ValueError(f"weight of owner {owner_id} must be positive: {weight}")
+        self._default_weight = default_weight
+        self._lock = Lock()
+        self._owners: Dict[Optional[str], _Owner] = {}
+        self._offers: Dict[CapabilitySignature, list[_Offer]] = {}
+        self._offer_numbers = count()
+        # pass of the owner served last
+        self._virtual_time = 0.0
+        # order of arrival; tasks put back in front count down from -1
+        self._back_order = count()
+        self._front_order = count(-1, -1)
+
+    def _owner(self, owner_id: Optional[str]) -> _Owner:
+        owner = self._owners.get(owner_id)
+        if owner is None:
+            weight = self._weights.get(owner_id, self._default_weight) if owner_id is not None else self._default_weight
+            owner = self._owners[owner_id] = _Owner(owner_id, len(self._owners), weight, self._virtual_time)
+        return owner
+
+    def _offer(self, owner: _Owner, signature: CapabilitySignature) -> None:
+        offer: _Offer = (owner.pass_, owner.rank, next(self._offer_numbers), owner)
+        heapq.heappush(self._offers.setdefault(signature, []), offer)
+
+    def push(self, task: BaseTask, front: bool = False) -> None:
+        """Make ``task`` ready, behind the tasks of its owner of equal priority, or before them if ``front``."""
+        signature = task.capability_signature
+        with self._lock:
+            owner = self._owner(task.owner)
+            queue = owner.queues.get(signature)
+            if queue is None:
+                queue = owner.queues[signature] = _Queue()
+            current = queue.order_of(task.id)
+            was_empty = not queue.tasks
+            if current is None and owner.ready == 0:
+                # an idle owner does not keep the share it did not use
+                owner.pass_ = max(owner.pass_, self._virtual_time)
+            order = next(self._front_order) if front else (current if current is not None else next(self._back_order))
+            queue.push(task, order)
+            if current is None:
+                owner.ready += 1
+            if was_empty:
+                self._offer(owner, signature)
+
+    def remove(self, task: BaseTask) -> bool:
+        """Remove ``task`` from the ready tasks; return whether it was ready."""
+        with self._lock:
+            owner = self._owners.get(task.owner)
+            queue = None if owner is None else owner.queues.get(task.capability_signature)
+            if owner is None or queue is None or not queue.remove(task.id):
+                return False
+            owner.ready -= 1
+            return True
+
+    def charge(self, task: BaseTask) -> None:
+        """Account the claim of ``task`` to its owner, which moves it behind the owners that were served less."""
+        with self._lock:
+            owner = self._owners.get(task.owner)
+            if owner is None:
+                return
+            self._virtual_time = max(self._virtual_time, owner.pass_)
+            owner.pass_ += 1.0 / owner.weight
+            for signature, queue in owner.queues.items():
+                if queue.tasks:
+                    self._offer(owner, signature)
+
+    def _head(self, signature: CapabilitySignature, offers: list[_Offer]) -> Optional[Tuple[_Owner, _Key, BaseTask]]:
+        while offers:
+            pass_, _, _, owner = offers[0]
+            if pass_ == owner.pass_:
+                head = owner.queues[signature].head()
+                if head is not None:
+                    return owner, head[0], head[1]
+            heapq.heappop(offers)
+        return None
+
+    def best(self, provided: CapabilitySignature) -> Optional[BaseTask]:
+        """The task to serve next among those whose signature is in ``provided``."""
+        with self._lock:
+            best: Optional[Tuple[Tuple[float, int, _Key], BaseTask]] = None
+            for signature, offers in self._offers.items():
+                if signature <= provided:
+                    head = self._head(signature, offers)
+                    if head is not None:
+                        owner, key, task = head
+                        rank = (owner.pass_, owner.rank, key)
+                        if best is None or rank < best[0]:
+                            best = (rank, task)
+            return None if best is None else best[1]
+
+    def _owners_of(self, signature: CapabilitySignature, offers: list[_Offer], n: int) -> list[_Owner]:
+        """Up to ``n`` distinct owners with ready tasks of ``signature``, by increasing pass."""
+        owners: list[_Owner] = []
+        frontier = [(offers[0], 0)] if offers else []
+        while frontier and len(owners) < n:
+            (pass_, _, _, owner), i = heapq.heappop(frontier)
+            if pass_ == owner.pass_ and owner.queues[signature].tasks and owner not in owners:
+                owners.append(owner)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(offers):
+                    heapq.heappush(frontier, (offers[child], child))
+        return owners
+
+    def first(self, provided: CapabilitySignature, n: int) -> list[BaseTask]:
+        """Up to ``n`` tasks whose signature is in ``provided``, in the order they would be served."""
+        with self._lock:
+            candidates: Dict[_Owner, list[Tuple[_Key, BaseTask]]] = {}
+            for signature, offers in self._offers.items():
+                if signature <= provided:
+                    for owner in self._owners_of(signature, offers, n):
+                        candidates.setdefault(owner, []).extend(owner.queues[signature].first(n))
+            owners = list(candidates)
+            queues = [heapq.nsmallest(n, candidates[owner], key=itemgetter(0)) for owner in owners]
+            positions = [0] * len(owners)
+            # replay the passes the owners would go through
+            turns = [(owner.pass_, owner.rank, i) for i, owner in enumerate(owners)]
+            heapq.heapify(turns)
+            tasks: list[BaseTask] = []
+            while turns and len(tasks) < n:
+                pass_, rank, i = heapq.heappop(turns)
+                tasks.append(queues[i][positions[i]][1])
+                positions[i] += 1
+                if positions[i] < len(queues[i]):
+                    heapq.heappush(turns, (pass_ + 1.0 / owners[i].weight, rank, i))
+            return tasks
@@ -1,5 +1,12 @@
+from typing import Dict, Optional
+
 from ..settings import BaseInterfaceSettings
 
 
 class InMemoryInterfaceSettings(BaseInterfaceSettings):
-    ...
+    lock_stripes: int = 64
+    lease_duration: Optional[float] = 60.0
+    owner_weights: Dict[str, float] = {}
+    default_owner_weight: float = 1.0
+    memo_size: int = 100_000
+    collect_blobs: bool = False
@@ -0,0 +1,72 @@
+"""Store of memoized tasks, by content hash.
+
+>>> from shikijin.fields import TaskId
+>>> memo = MemoStore(capacity=2)
+>>> first, second, third = TaskId.generate(), TaskId.generate(), TaskId.generate()
+>>> memo.put(b"a", first)
+>>> memo.put(b"b", second)
+>>> memo.get(b"a") == first
+True
+>>> memo.put(b"c", third)
+>>> memo.get(b"b") is None
+True
+>>> memo.stats()
+CacheStats(hits=1, misses=1, evictions=1, size=2, capacity=2)
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from ..fields import TaskId
+from ..types import CacheStats
+
+
+class MemoStore:
+    """Map from the content hash of tasks to the id of the task that computes it.
+
+    Holds up to ``capacity`` entries and evicts the least recently used one beyond that;
+    a task whose entry was evicted is simply run again. Every method is thread-safe.
+    """
+
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._entries: OrderedDict[bytes, TaskId] = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: bytes) -> Optional[TaskId]:
+        with self._lock:
+            task_id = self._entries.get(key)
+            if task_id is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return task_id
+
+    def put(self, key: bytes, task_id: TaskId) -> None:
+        with self._lock:
+            self._entries[key] = task_id
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def discard(self, key: bytes, task_id: TaskId) -> None:
+        """Forget ``key`` if it still maps to ``task_id``."""
+        with self._lock:
+            if self._entries.get(key) == task_id:
+                del self._entries[key]
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+                capacity=self._capacity,
+            )
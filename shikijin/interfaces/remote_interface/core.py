@@ -0,0 +1,266 @@
+import os
+import socket
+import threading
+from collections.abc import Iterator, Sequence
+from typing import Any, Optional
+
+from ...compression import DEFAULT_MIN_SIZE, Codec
+from ...fields import BlobId, ComponentId, ComponentName, TaskId
+from ...loggers.base import BaseLogger
+from ...storages.base import DEFAULT_CHUNK_SIZE, check_chunk_size, resolve_range
+from ...types import Assignment, BaseCapability, BaseTask, Blob
+from ..base import BaseInterface
+from ..exceptions import RemoteInterfaceError
+from .protocol import (
+    ERROR,
+    MAX_FRAME_SIZE,
+    ProtocolError,
+    encode_frames,
+    error_from_value,
+    parse_address,
+    read_frame,
+)
+
+Call = tuple[str, Sequence[Any]]
+
+
+class _Connection:
+    def __init__(
+        self,
+        family: int,
+        sockaddr: Any,
+        timeout: Optional[float],
+        compression: Codec,
+        compression_min_size: int,
+        max_frame_size: int,
+    ):
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            self.socket.settimeout(timeout)
+            self.socket.connect(sockaddr)
+            if family != socket.AF_UNIX:
+                self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except BaseException:
+            self.socket.close()
+            raise
+        self.rfile = self.socket.makefile("rb")
+        self.timeout = timeout
+        self.compression = compression
+        self.compression_min_size = compression_min_size
+        self.max_frame_size = max_frame_size
+        self.next_request_id = 0
+
+    def call_many(self, calls: Sequence[Call], timeout: Optional[float]) -> list[list[Any]]:
+        if timeout != self.timeout:
+            self.socket.settimeout(timeout)
+            self.timeout = timeout
+        first = self.next_request_id
+        self.next_request_id = (first + len(calls)) & 0xFFFFFFFF
+        self.socket.sendall(
+            encode_frames(
+                [((first + i) & 0xFFFFFFFF, [method, list(args)]) for i, (method, args) in enumerate(calls)],
+                self.compression,
+                self.compression_min_size,
+            )
+        )
+        responses = []
+        for i in range(len(calls)):
+            frame = read_frame(self.rfile, self.max_frame_size)
+            if frame is None:
+                raise ProtocolError("connection closed by the server")
+            request_id, response = frame
+            if request_id != (first + i) & 0xFFFFFFFF:
+                raise ProtocolError(f"expected a response to request {first + i}, got {request_id}")
+            responses.append(response)
+        return responses
+
+    def close(self) -> None:
+        self.rfile.close()
+        self.socket.close()
+
+
+class RemoteInterface(BaseInterface):
+    """Client of an ``InterfaceServer``, so that many worker processes share one interface.
+
+    Calls borrow a connection from a pool that keeps up to ``pool_size`` idle connections,
+    so concurrent threads do not wait for each other. ``pipeline`` sends several calls on
+    one connection before reading any response, paying for one round trip instead of one
+    per call.
+
+    ``timeout`` bounds every socket operation; ``wait_for_task`` extends it by the time it
+    is asked to wait.
+
+    Requests of at least ``compression_min_size`` bytes, such as blobs being saved, are
+    compressed with ``compression`` where it is worth it; the server chooses on its own
+    whether to compress its responses.
+
+    Responses larger than ``max_frame_size`` bytes are refused; read large blobs with
+    ``read_blob_range`` or ``open_blob_stream`` instead.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        logger: BaseLogger,
+        name: Optional[ComponentName] = None,
+        pool_size: int = 8,
+        timeout: Optional[float] = None,
+        compression: Codec = Codec.NONE,
+        compression_min_size: int = DEFAULT_MIN_SIZE,
+        max_frame_size: int = MAX_FRAME_SIZE,
+    ):
+        super(RemoteInterface, self).__init__(logger=logger, name=name)
+        self._address = address
+        self._family, self._sockaddr = parse_address(address)
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._compression = compression
+        self._compression_min_size = compression_min_size
+        self._max_frame_size = max_frame_size
+        self._idle: list[_Connection] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    def _acquire(self) -> _Connection:
+        with self._lock:
+            if self._pid != os.getpid():
+                # connections inherited through fork belong to the parent
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        return _Connection(
+            self._family,
+            self._sockaddr,
+            self._timeout,
+            self._compression,
+            self._compression_min_size,
+            self._max_frame_size,
+        )
+
+    def _release(self, connection: _Connection) -> None:
+        with self._lock:
+            if len(self._idle) < self._pool_size and self._pid == os.getpid():
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def _exchange(self, calls: Sequence[Call], extra_timeout: float = 0.0) -> list[list[Any]]:
+        try:
+            connection = self._acquire()
+        except OSError as e:
+            self.log_error(f"cannot connect to {self._address}: {e}")
+            raise RemoteInterfaceError(f"cannot connect to {self._address}: {e}")
+        timeout = None if self._timeout is None else self._timeout + extra_timeout
+        try:
+            responses = connection.call_many(calls, timeout)
+        except (OSError, ProtocolError) as e:
+            connection.close()
+            self.log_error(f"call to {self._address} failed: {e}")
+            raise RemoteInterfaceError(f"call to {self._address} failed: {e}")
+        self._release(connection)
+        return responses
+
+    def pipeline(self, calls: Sequence[Call]) -> list[Any]:
+        """Run ``calls``, given as ``(method name, arguments)``, in order in one round trip.
+
+        Every call is run even if an earlier one fails; the first error is raised once all
+        responses have been read.
+        """
+        if not calls:
+            return []
+        responses = self._exchange(calls)
+        for status, value in responses:
+            if status == ERROR:
+                raise error_from_value(value)
+        return [value for _, value in responses]
+
+    def _call(self, method: str, *args: Any, extra_timeout: float = 0.0) -> Any:
+        ((status, value),) = self._exchange(((method, args),), extra_timeout)
+        if status == ERROR:
+            raise error_from_value(value)
+        return value
+
+    def get_blob(self, blob_id: BlobId) -> Blob:
+        blob: Blob = self._call("get_blob", blob_id)
+        return blob
+
+    def get_blobs(self, blob_ids: Sequence[BlobId]) -> list[Blob]:
+        blobs: list[Blob] = self._call("get_blobs", blob_ids)
+        return blobs
+
+    def save_blob(self, blob: Blob) -> None:
+        self._call("save_blob", blob)
+
+    def blob_size(self, blob_id: BlobId) -> int:
+        size: int = self._call("blob_size", blob_id)
+        return size
+
+    def read_blob_range(self, blob_id: BlobId, offset: int, length: Optional[int] = None) -> bytes:
+        data: bytes = self._call("read_blob_range", blob_id, offset, length)
+        return data
+
+    def open_blob_stream(
+        self, blob_id: BlobId, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0, length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        check_chunk_size(chunk_size)
+        start, end = resolve_range(self.blob_size(blob_id), offset, length)
+        for position in range(start, end, chunk_size):
+            yield self.read_blob_range(blob_id, position, min(chunk_size, end - position))
+
+    def add_task(self, task: BaseTask) -> None:
+        self._call("add_task", task)
+
+    def add_tasks(self, tasks: Sequence[BaseTask]) -> None:
+        self._call("add_tasks", tasks)
+
+    def get_task(self, task_id: TaskId) -> BaseTask:
+        task: BaseTask = self._call("get_task", task_id)
+        return task
+
+    def get_tasks(self, task_ids: Sequence[TaskId]) -> list[BaseTask]:
+        tasks: list[BaseTask] = self._call("get_tasks", task_ids)
+        return tasks
+
+    def pickup_task(self, capabilities: Sequence[BaseCapability]) -> BaseTask:
+        task: BaseTask = self._call("pickup_task", capabilities)
+        return task
+
+    def pickup_tasks(self, capabilities: Sequence[BaseCapability], n: int) -> list[BaseTask]:
+        tasks: list[BaseTask] = self._call("pickup_tasks", capabilities, n)
+        return tasks
+
+    def wait_for_task(self, capabilities: Sequence[BaseCapability], timeout: float) -> BaseTask:
+        task: BaseTask = self._call("wait_for_task", capabilities, float(timeout), extra_timeout=timeout)
+        return task
+
+    def create_assignment(self, worker_id: ComponentId, task: BaseTask) -> Assignment:
+        assignment: Assignment = self._call("create_assignment", worker_id, task)
+        return assignment
+
+    def complete_assignment(self, assignment: Assignment) -> None:
+        self._call("complete_assignment", assignment)
+
+    def abandon_assignment(self, assignment: Assignment) -> None:
+        self._call("abandon_assignment", assignment)
+
+    def heartbeat(self, assignment: Assignment) -> Assignment:
+        renewed: Assignment = self._call("heartbeat", assignment)
+        return renewed
+
+    def fail_assignment(self, assignment: Assignment, error: str) -> None:
+        self._call("fail_assignment", assignment, error)
+
+    def get_dead_tasks(self) -> list[BaseTask]:
+        tasks: list[BaseTask] = self._call("get_dead_tasks")
+        return tasks
@@ -0,0 +1,366 @@
+"""Wire format shared by ``InterfaceServer`` and ``RemoteInterface``.
+
+Every message is a frame made of a header, holding the length of the body and the id of the
+request, followed by the body. A request body is the value ``[method, args]`` and a response
+body is ``[OK, result]`` or ``[ERROR, [error class name, argument]]``. Responses are sent in the
+order the requests were received, so a client may write several requests before reading any
+response.
+
+Values are encoded with a one byte tag: ids are sent as their 16 raw bytes and entities in
+the tagged binary form of ``shikijin.codecs``. A peer may compress the body of a frame with
+one of the codecs of ``shikijin.compression``, which wraps the whole value of the body in a
+compressed value that may not expand beyond the frame size bound; every peer decodes
+compressed bodies, so each side chooses whether to compress what it sends.
+
+>>> from shikijin.fields import TaskId
+>>> task_id = TaskId("z1dDLoCeQ1OtvZ1cDXM4aA")
+>>> decode_value(encode_value(["get_task", [task_id, None, 1.5, b"x"]]))
+['get_task', [TaskId('z1dDLoCeQ1OtvZ1cDXM4aA'), None, 1.5, b'x']]
+>>> frame = encode_frame(7, ["save_blob", [b"text " * 1000]], Codec.ZLIB)
+>>> len(frame) < 100
+True
+>>> import io
+>>> read_frame(io.BytesIO(frame)) == (7, ["save_blob", [b"text " * 1000]])
+True
+"""
+
+import lzma
+import socket
+import struct
+import zlib
+from collections.abc import Sequence
+from typing import IO, Any, Optional, Union
+
+from ... import codecs
+from ...compression import DEFAULT_MIN_SIZE, Codec, compress, decompress_bounded
+from ...fields import (
+    AssignmentId,
+    BlobId,
+    CapabilityId,
+    ComponentId,
+    Id,
+    InterfaceId,
+    TaskId,
+    WorkerId,
+)
+from ..exceptions import (
+    AssignmentNotFoundError,
+    BaseInterfaceError,
+    BlobNotFoundError,
+    NoCapableTaskError,
+    RemoteInterfaceError,
+    TaskAlreadyAssignedError,
+    TaskNotFoundError,
+)
+
+# length of the body, request id
+HEADER = struct.Struct(">II")
+# default bound of the frames a peer accepts; larger blobs go through ranged reads and streams
+MAX_FRAME_SIZE = 64 << 20
+
+OK = 0
+ERROR = 1
+
+METHODS = frozenset(
+    (
+        "get_blob",
+        "get_blobs",
+        "save_blob",
+        "blob_size",
+        "read_blob_range",
+        "add_task",
+        "add_tasks",
+        "get_task",
+        "get_tasks",
+        "pickup_task",
+        "pickup_tasks",
+        "wait_for_task",
+        "create_assignment",
+        "complete_assignment",
+        "abandon_assignment",
+        "heartbeat",
+        "fail_assignment",
+        "get_dead_tasks",
+    )
+)
+
+_ID_CLASSES: tuple[type[Id], ...] = (
+    Id,
+    ComponentId,
+    WorkerId,
+    InterfaceId,
+    TaskId,
+    AssignmentId,
+    CapabilityId,
+    BlobId,
+)
+_ID_CODES = {cls: code for code, cls in enumerate(_ID_CLASSES)}
+
+_NONE = b"N"
+_TRUE = b"T"
+_FALSE = b"F"
+_INT = b"i"
+_FLOAT = b"d"
+_BYTES = b"b"
+_STR = b"s"
+_ID = b"I"
+_ENTITY = b"e"
+_LIST = b"l"
+_COMPRESSED = b"z"
+
+# lists nested deeper than this are rejected
+MAX_DEPTH = 32
+
+_INT64 = struct.Struct(">q")
+_FLOAT64 = struct.Struct(">d")
+_UINT32 = struct.Struct(">I")
+
+
+# interface errors sent with the argument they were raised with
+_ERRORS: dict[str, tuple[type[BaseInterfaceError], str]] = {
+    cls.__name__: (cls, argument)
+    for cls, argument in (
+        (BlobNotFoundError, "blob_id"),
+        (TaskNotFoundError, "task_id"),
+        (AssignmentNotFoundError, "assignment_id"),
+        (NoCapableTaskError, "capabilities"),
+        (TaskAlreadyAssignedError, "task_id"),
+    )
+}
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def parse_address(address: str) -> tuple[int, Union[str, tuple[str, int]]]:
+    """Socket family and address of ``unix:<path>`` or ``tcp:<host>:<port>``.
+
+    >>> parse_address("tcp:127.0.0.1:7000")[1]
+    ('127.0.0.1', 7000)
+    >>> parse_address("unix:/tmp/shikijin.sock")[1]
+    '/tmp/shikijin.sock'
+    """
+    scheme, _, rest = address.partition(":")
+    if scheme == "unix" and rest:
+        return socket.AF_UNIX, rest
+    if scheme == "tcp":
+        host, _, port = rest.rpartition(":")
+        if host and port.isdigit():
+            return socket.AF_INET6 if ":" in host else socket.AF_INET, (host.strip("[]"), int(port))
+    raise ValueError(f"invalid address {address!r}, expected unix:<path> or tcp:<host>:<port>")
+
+
+def error_value(error: BaseException) -> list[Any]:
+    """Encodable form of ``error``; interface errors keep the argument they were raised with."""
+    name = type(error).__name__
+    known = _ERRORS.get(name)
+    if known is not None and known[0] is type(error):
+        return [name, getattr(error, known[1])]
+    return [name, str(error)]
+
+
+def error_from_value(value: list[Any]) -> BaseInterfaceError:
+    name, argument = value
+    known = _ERRORS.get(name)
+    if known is None:
+        return RemoteInterfaceError(f"{name}: {argument}")
+    return known[0](argument)
+
+
+def _id_code(cls: type) -> int:
+    # ids of other subclasses are sent as the closest class known to the protocol
+    for c in cls.__mro__:
+        code = _ID_CODES.get(c)
+        if code is not None:
+            return code
+    return 0
+
+
+def _encode_into(value: Any, out: bytearray) -> None:
+    if value is None:
+        out += _NONE
+    elif value is True:
+        out += _TRUE
+    elif value is False:
+        out += _FALSE
+    elif isinstance(value, Id):
+        out += _ID
+        out.append(_id_code(type(value)))
+        out += value.bytes
+    elif isinstance(value, int):
+        out += _INT
+        out += _INT64.pack(value)
+    elif isinstance(value, float):
+        out += _FLOAT
+        out += _FLOAT64.pack(value)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        out += _BYTES
+        out += _UINT32.pack(len(value))
+        out += value
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8")
+        out += _STR
+        out += _UINT32.pack(len(encoded))
+        out += encoded
+    elif isinstance(value, (list, tuple)):
+        out += _LIST
+        out += _UINT32.pack(len(value))
+        for v in value:
+            _encode_into(v, out)
+    else:
+        encoded = codecs.encode_tagged(value)
+        out += _ENTITY
+        out += _UINT32.pack(len(encoded))
+        out += encoded
+
+
+def _take(data: memoryview, pos: int, size: int) -> memoryview:
+    if pos + size > len(data):
+        raise ProtocolError(f"value of {size} bytes at {pos} overruns a body of {len(data)} bytes")
+    return data[pos : pos + size]
+
+
+def _decode_from(data: memoryview, pos: int, depth: int) -> tuple[Any, int]:
+    tag = _take(data, pos, 1)
+    pos += 1
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _ID:
+        raw = _take(data, pos, 17)
+        if raw[0] >= len(_ID_CLASSES):
+            raise ProtocolError(f"unknown id class {raw[0]}")
+        return _ID_CLASSES[raw[0]](raw[1:].tobytes()), pos + 17
+    if tag == _INT:
+        return _INT64.unpack_from(data, pos)[0], pos + 8
+    if tag == _FLOAT:
+        return _FLOAT64.unpack_from(data, pos)[0], pos + 8
+    if tag == _LIST:
+        if depth >= MAX_DEPTH:
+            raise ProtocolError(f"lists nested deeper than {MAX_DEPTH}")
+        (count,) = _UINT32.unpack_from(data, pos)
+        pos += 4
+        items = []
+        for _ in range(count):
+            item, pos = _decode_from(data, pos, depth + 1)
+            items.append(item)
+        return items, pos
+    if tag in (_BYTES, _STR, _ENTITY):
+        (size,) = _UINT32.unpack_from(data, pos)
+        pos += 4
+        raw = _take(data, pos, size)
+        if tag == _BYTES:
+            return raw.tobytes(), pos + size
+        if tag == _STR:
+            return str(raw, "utf-8"), pos + size
+        # entities from a peer are validated
+        return codecs.decode_tagged(raw, trusted=False), pos + size
+    raise ProtocolError(f"unknown value tag {bytes(tag)!r}")
+
+
+def encode_value(value: Any) -> bytes:
+    out = bytearray()
+    _encode_into(value, out)
+    return bytes(out)
+
+
+def _decompress_value(data: memoryview, max_size: int) -> memoryview:
+    """Encoding of the value held by a compressed value, which may only wrap a whole body."""
+    header = _take(data, 1, 5)
+    try:
+        codec = Codec.from_code(header[0])
+    except ValueError:
+        raise ProtocolError(f"unknown codec {header[0]}")
+    (size,) = _UINT32.unpack_from(header, 1)
+    if 6 + size != len(data):
+        raise ProtocolError(f"compressed value of {size} bytes in a body of {len(data)} bytes")
+    try:
+        return memoryview(decompress_bounded(codec, data[6:], max_size))
+    except (ValueError, EOFError, OSError, lzma.LZMAError, zlib.error) as e:
+        raise ProtocolError(f"cannot decompress value: {e}")
+
+
+def decode_value(data: bytes, max_size: int = MAX_FRAME_SIZE) -> Any:
+    """Decode a value, raising ``ProtocolError`` on any malformed input.
+
+    A compressed value may not expand beyond ``max_size`` bytes.
+    """
+    view = memoryview(data)
+    if view[:1] == _COMPRESSED:
+        view = _decompress_value(view, max_size)
+    try:
+        value, pos = _decode_from(view, 0, 0)
+    except ProtocolError:
+        raise
+    except (ValueError, IndexError, struct.error, RecursionError) as e:
+        # truncated numbers, invalid text, entities failing validation or nesting too deep in JSON fields
+        raise ProtocolError(f"malformed value: {e}")
+    if pos != len(view):
+        raise ProtocolError(f"{len(view) - pos} trailing bytes after value")
+    return value
+
+
+def encode_frame(
+    request_id: int, value: Any, compression: Codec = Codec.NONE, min_size: int = DEFAULT_MIN_SIZE
+) -> bytes:
+    """Frame of ``value``, with a body compressed with ``compression`` if it is worth it."""
+    out = bytearray(HEADER.size)
+    _encode_into(value, out)
+    if compression != Codec.NONE:
+        codec, packed = compress(memoryview(out)[HEADER.size :], compression, min_size)
+        if codec != Codec.NONE:
+            out = bytearray(HEADER.size)
+            out += _COMPRESSED
+            out.append(codec.code)
+            out += _UINT32.pack(len(packed))
+            out += packed
+    HEADER.pack_into(out, 0, len(out) - HEADER.size, request_id)
+    return bytes(out)
+
+
+def encode_frames(
+    frames: Sequence[tuple[int, Any]], compression: Codec = Codec.NONE, min_size: int = DEFAULT_MIN_SIZE
+) -> bytes:
+    return b"".join(encode_frame(request_id, value, compression, min_size) for request_id, value in frames)
+
+
+def _read_exactly(stream: IO[bytes], size: int) -> Optional[bytes]:
+    data = stream.read(size)
+    if not data:
+        return None
+    while len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            raise ProtocolError("connection closed in the middle of a frame")
+        data += more
+    return data
+
+
+def read_frame(stream: IO[bytes], max_size: int = MAX_FRAME_SIZE) -> Optional[tuple[int, Any]]:
+    """Read the next frame of ``stream``, or return None if the peer closed the connection.
+
+    Frames with a body larger than ``max_size`` bytes are rejected before being read.
+    """
+    frame = read_raw_frame(stream, max_size)
+    if frame is None:
+        return None
+    request_id, body = frame
+    return request_id, decode_value(body, max_size)
+
+
+def read_raw_frame(stream: IO[bytes], max_size: int = MAX_FRAME_SIZE) -> Optional[tuple[int, bytes]]:
+    """Like ``read_frame``, but leave the body undecoded, so that only framing errors raise."""
+    header = _read_exactly(stream, HEADER.size)
+    if header is None:
+        return None
+    size, request_id = HEADER.unpack(header)
+    if size > max_size:
+        raise ProtocolError(f"frame of {size} bytes is too large")
+    body = _read_exactly(stream, size) if size else b""
+    if body is None:
+        raise ProtocolError("connection closed in the middle of a frame")
+    return request_id, body
@@ -0,0 +1,163 @@
+import os
+import socket
+import socketserver
+import stat
+import threading
+from typing import Any, Optional, cast
+
+from ...components import BaseShikijinComponent
+from ...compression import DEFAULT_MIN_SIZE, Codec
+from ...fields import ComponentName
+from ...loggers.base import BaseLogger
+from ..base import BaseInterface
+from .protocol import (
+    ERROR,
+    MAX_FRAME_SIZE,
+    METHODS,
+    OK,
+    ProtocolError,
+    decode_value,
+    encode_frame,
+    error_value,
+    parse_address,
+    read_raw_frame,
+)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_ThreadingServer"
+
+    def setup(self) -> None:
+        super(_Handler, self).setup()
+        if self.server.address_family != socket.AF_UNIX:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self) -> None:
+        interface = self.server.interface
+        while True:
+            try:
+                frame = read_raw_frame(self.rfile, self.server.max_frame_size)  # type: ignore[arg-type]
+            except (ProtocolError, OSError) as e:
+                self.server.owner.log_warning(f"dropping connection from {self.client_address}: {e}")
+                return
+            if frame is None:
+                return
+            # a body that does not decode fails its request only, not the others on the connection
+            request_id, body = frame
+            response: list[Any]
+            try:
+                method, args = decode_value(body, self.server.max_frame_size)
+                if method not in METHODS:
+                    raise ProtocolError(f"unknown method {method!r}")
+                response = [OK, getattr(interface, method)(*args)]
+            except Exception as e:
+                response = [ERROR, error_value(e)]
+            try:
+                self.wfile.write(
+                    encode_frame(request_id, response, self.server.compression, self.server.compression_min_size)
+                )
+            except OSError:
+                return
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = socket.SOMAXCONN
+
+    def __init__(
+        self,
+        family: int,
+        address: Any,
+        owner: "InterfaceServer",
+        interface: BaseInterface,
+        compression: Codec,
+        compression_min_size: int,
+        max_frame_size: int,
+    ):
+        self.address_family = family
+        self.owner = owner
+        self.interface = interface
+        self.compression = compression
+        self.compression_min_size = compression_min_size
+        self.max_frame_size = max_frame_size
+        super(_ThreadingServer, self).__init__(address, _Handler)
+
+
+class InterfaceServer(BaseShikijinComponent):
+    """Serve a ``BaseInterface`` to ``RemoteInterface`` clients over a Unix or TCP socket.
+
+    ``address`` is ``unix:<path>`` or ``tcp:<host>:<port>``; port 0 picks a free port, see
+    ``address``. Each connection is served by its own thread, which answers the requests of
+    the connection in order, so clients can pipeline requests. Calls such as
+    ``wait_for_task`` block only the connection they were made on.
+
+    Responses of at least ``compression_min_size`` bytes are compressed with ``compression``
+    where it is worth it, such as blobs of text. Requests larger than ``max_frame_size`` bytes
+    are refused by dropping their connection; a request whose body does not decode, such as
+    one naming a class the server has not imported, fails alone with an error response.
+    """
+
+    def __init__(
+        self,
+        interface: BaseInterface,
+        address: str,
+        logger: BaseLogger,
+        name: Optional[ComponentName] = None,
+        compression: Codec = Codec.NONE,
+        compression_min_size: int = DEFAULT_MIN_SIZE,
+        max_frame_size: int = MAX_FRAME_SIZE,
+    ):
+        super(InterfaceServer, self).__init__(logger=logger, name=name)
+        self._interface = interface
+        family, sockaddr = parse_address(address)
+        self._unix_path = sockaddr if isinstance(sockaddr, str) else None
+        if self._unix_path is not None:
+            self._remove_stale_socket(self._unix_path)
+        self._server = _ThreadingServer(
+            family, sockaddr, self, interface, compression, compression_min_size, max_frame_size
+        )
+        self._stopped = threading.Event()
+
+    def _remove_stale_socket(self, path: str) -> None:
+        """Remove the socket a previous server left at ``path``, refusing to remove anything else."""
+        try:
+            mode = os.stat(path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            self.log_error(f"{path} exists and is not a socket")
+            raise FileExistsError(f"{path} exists and is not a socket")
+        os.unlink(path)
+
+    @property
+    def interface(self) -> BaseInterface:
+        return self._interface
+
+    @property
+    def address(self) -> str:
+        """Address clients should connect to, with the actual port of TCP servers."""
+        if self._unix_path is not None:
+            return f"unix:{self._unix_path}"
+        host, port = cast(tuple[str, int], self._server.server_address[:2])
+        return f"tcp:[{host}]:{port}" if ":" in str(host) else f"tcp:{host}:{port}"
+
+    def serve_forever(self) -> None:
+        self.log_info(f"serving {type(self._interface).__name__} on {self.address}")
+        try:
+            self._server.serve_forever(poll_interval=0.1)
+        finally:
+            self._server.server_close()
+            if self._unix_path is not None:
+                try:
+                    os.unlink(self._unix_path)
+                except FileNotFoundError:
+                    pass
+            self._stopped.set()
+
+    def stop(self) -> None:
+        """Stop serving; safe to call from a signal handler of the thread running ``serve_forever``."""
+        threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def wait_stopped(self, timeout: Optional[float] = None) -> bool:
+        return self._stopped.wait(timeout)
@@ -0,0 +1,14 @@
+from typing import Optional
+
+from ...compression import DEFAULT_MIN_SIZE, Codec
+from ..settings import BaseInterfaceSettings
+from .protocol import MAX_FRAME_SIZE
+
+
+class RemoteInterfaceSettings(BaseInterfaceSettings):
+    address: str
+    pool_size: int = 8
+    timeout: Optional[float] = None
+    compression: Codec = Codec.NONE
+    compression_min_size: int = DEFAULT_MIN_SIZE
+    max_frame_size: int = MAX_FRAME_SIZE
@@ -1,14 +1,18 @@
-from typing import Union
+from typing import Type, Union
+
+from pydantic import Extra
 
 from ..fields import ComponentName
-from ..settings import BaseComponentSettings, GlobalSettings
+from ..settings import BaseComponentSettings, GlobalSettings, S
 
 
 class BaseInterfaceSettings(BaseComponentSettings):
     name: Union[ComponentName, None] = None
 
+    class Config:
+        # ``interface_settings`` is shared by every type, so keys meant for another type are ignored
+        extra = Extra.ignore
+
     @classmethod
-    def from_global_settings(cls, settings: GlobalSettings) -> "BaseInterfaceSettings":
-        if "name" in settings.interface_settings:
-            return BaseInterfaceSettings(name=ComponentName(settings.interface_settings["name"]))
-        return BaseInterfaceSettings()
+    def from_global_settings(cls: Type[S], settings: GlobalSettings) -> S:
+        return cls(**settings.interface_settings)
@@ -0,0 +1,468 @@
+import heapq
+import sqlite3
+import time
+from collections.abc import Sequence
+from operator import itemgetter
+from threading import Condition
+from typing import Dict, Optional, Tuple
+
+from ... import codecs
+from ...fields import (
+    AssignmentId,
+    ComponentId,
+    ComponentName,
+    TaskId,
+    Timestamp,
+    WorkerId,
+)
+from ...loggers.base import BaseLogger
+from ...sqlite import SqliteDatabase
+from ...storages.base import BaseStorage
+from ...storages.sqlite_storage.core import SqliteStorage
+from ...types import (
+    Assignment,
+    BaseCapability,
+    BaseTask,
+    CapabilitySignature,
+    provided_capability_names,
+)
+from ..base import StorageBackedInterface
+from ..exceptions import (
+    AssignmentNotFoundError,
+    NoCapableTaskError,
+    TaskAlreadyAssignedError,
+    TaskNotFoundError,
+)
+
+READY = 0
+ASSIGNED = 1
+COMPLETED = 2
+# waiting for ``not_before``
+DELAYED = 3
+# failed ``retry_policy.max_attempts`` times
+DEAD = 4
+# waiting for the tasks it ``depends_on`` to complete
+WAITING = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY,
+    names TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY,
+    id BLOB NOT NULL UNIQUE,
+    signature_id INTEGER NOT NULL REFERENCES signatures (id),
+    status INTEGER NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    not_before INTEGER,
+    pending INTEGER NOT NULL DEFAULT 0,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_ready_by_priority ON tasks (status, signature_id, priority DESC, seq);
+CREATE INDEX IF NOT EXISTS tasks_delayed ON tasks (not_before) WHERE status = 3;
+CREATE TABLE IF NOT EXISTS assignments (
+    task_id BLOB PRIMARY KEY,
+    id BLOB NOT NULL,
+    expires_at INTEGER,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS assignments_expiry ON assignments (expires_at) WHERE expires_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS dependencies (
+    depends_on BLOB NOT NULL,
+    task_id BLOB NOT NULL,
+    PRIMARY KEY (depends_on, task_id)
+) WITHOUT ROWID;
+"""
+
+# keeps the number of bound parameters of a query below the SQLite limit
+_BATCH_SIZE = 500
+
+
+class SqliteInterface(StorageBackedInterface):
+    """Interface keeping tasks and assignments in a SQLite database, so they survive a crash.
+
+    Several processes on one host can share the database. Tasks are stored in the binary
+    form of ``shikijin.codecs`` together with their status and an integer id of their
+    capability signature, and the ``(status, signature_id, priority DESC, seq)`` index lets
+    ``pickup_task`` read the best ready tasks of each signature the caller can satisfy,
+    highest priority and then oldest first, without scanning or sorting the table; the
+    heads of the signatures are then merged. The signatures a caller can satisfy are found
+    among the rows of the small ``signatures`` table, which is cached and only read for
+    the signatures registered since, so picking up costs the same whatever the backlog.
+    ``create_assignment`` claims a task with a single ``UPDATE ... RETURNING`` in a write
+    transaction, so only one caller across every process gets it.
+
+    Assignments are leases of ``lease_duration`` seconds, renewed by ``heartbeat``. Picking
+    up tasks first reclaims the expired leases through the index on their expiry time, so
+    a task held by a crashed worker goes back to the front of its queue.
+
+    Tasks whose ``not_before`` has not passed yet, including failed tasks waiting for their
+    retry, are kept with a delayed status in a partial index on ``not_before``, and picking
+    up tasks moves the due ones to the back of their queue. Tasks that used up their
+    attempts keep a dead status until they are added again.
+
+    A task with ``depends_on`` is stored with a waiting status and the number of its
+    dependencies that have not completed yet, and a row of the ``dependencies`` table per
+    such dependency. Completing a task decrements the counter of its dependents and queues
+    those reaching zero, so waiting tasks are never looked at by ``pickup_task``.
+
+    ``wait_for_task`` is woken up at once by tasks added through this instance and polls
+    every ``poll_interval`` seconds for tasks added by other processes.
+
+    Blobs are delegated to ``storage``, which defaults to a ``SqliteStorage`` on the same
+    database file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        logger: BaseLogger,
+        name: Optional[ComponentName] = None,
+        busy_timeout: float = 30.0,
+        synchronous: str = "NORMAL",
+        poll_interval: float = 0.05,
+        storage: Optional[BaseStorage] = None,
+        lease_duration: Optional[float] = 60.0,
+    ):
+        database = SqliteDatabase(path, busy_timeout=busy_timeout, synchronous=synchronous, schema=SCHEMA)
+        if storage is None:
+            storage = SqliteStorage(path, logger=logger, busy_timeout=busy_timeout, synchronous=synchronous)
+        super(SqliteInterface, self).__init__(logger=logger, name=name, storage=storage)
+        self._database = database
+        self._poll_interval = poll_interval
+        self._lease_duration = None if lease_duration is None else int(lease_duration * 1_000_000)
+        self._signature_ids: Dict[CapabilitySignature, int] = {}
+        self._signatures: Dict[int, CapabilitySignature] = {}
+        # highest signature id read from the signatures table, and the signature ids each set
+        # of provided capability names can run, with the highest signature id they account for
+        self._last_signature_id = 0
+        self._capable: Dict[CapabilitySignature, Tuple[int, list[int]]] = {}
+        self._task_ready = Condition()
+
+    @property
+    def path(self) -> str:
+        return self._database.path
+
+    def _signature_id(self, signature: CapabilitySignature) -> int:
+        signature_id = self._signature_ids.get(signature)
+        if signature_id is None:
+            names = "\n".join(sorted(signature))
+            connection = self._database.connection
+            connection.execute("INSERT OR IGNORE INTO signatures (names) VALUES (?)", (names,))
+            (signature_id,) = connection.execute("SELECT id FROM signatures WHERE names = ?", (names,)).fetchone()
+            self._signature_ids[signature] = signature_id
+            self._signatures[signature_id] = signature
+        return signature_id
+
+    def _signature(self, signature_id: int) -> CapabilitySignature:
+        signature = self._signatures.get(signature_id)
+        if signature is None:
+            (names,) = self._database.connection.execute(
+                "SELECT names FROM signatures WHERE id = ?", (signature_id,)
+            ).fetchone()
+            signature = frozenset(names.split("\n")) if names else frozenset()
+            self._signatures[signature_id] = signature
+            self._signature_ids[signature] = signature_id
+        return signature
+
+    def _refresh_signatures(self) -> None:
+        """Read the signatures registered since the last call, by this or other processes."""
+        rows = self._database.connection.execute(
+            "SELECT id, names FROM signatures WHERE id > ? ORDER BY id", (self._last_signature_id,)
+        ).fetchall()
+        if not rows:
+            return
+        for signature_id, names in rows:
+            signature = frozenset(names.split("\n")) if names else frozenset()
+            self._signatures[signature_id] = signature
+            self._signature_ids[signature] = signature_id
+        self._last_signature_id = max(self._last_signature_id, rows[-1][0])
+
+    def _capable_signature_ids(self, capabilities: Sequence[BaseCapability]) -> list[int]:
+        self._refresh_signatures()
+        provided = provided_capability_names(capabilities)
+        # signatures are recorded before the id accounting for them is raised
+        last_signature_id = self._last_signature_id
+        cached = self._capable.get(provided)
+        if cached is not None and cached[0] == last_signature_id:
+            return cached[1]
+        signatures = list(self._signatures.items())
+        capable = [signature_id for signature_id, signature in signatures if signature <= provided]
+        self._capable[provided] = (last_signature_id, capable)
+        return capable
+
+    def _requeue_front(self, connection: sqlite3.Connection, task_id: bytes) -> None:
+        connection.execute(
+            "UPDATE tasks SET status = ?, seq = (SELECT min(seq) FROM tasks) - 1 WHERE id = ?", (READY, task_id)
+        )
+
+    def _release_due(self) -> None:
+        now = Timestamp.now()
+        connection = self._database.connection
+        # the status is inlined so that the partial index on delayed tasks applies, and the index is
+        # forced since the planner would rather scan every delayed task through the ready index
+        due_query = (
+            f"SELECT id FROM tasks INDEXED BY tasks_delayed WHERE status = {DELAYED} AND not_before <= ?"
+            " ORDER BY not_before"
+        )
+        if connection.execute(f"{due_query} LIMIT 1", (now,)).fetchone() is None:
+            return
+        with self._database.transaction() as connection:
+            for (task_id,) in connection.execute(due_query, (now,)).fetchall():
+                self._requeue_back(connection, task_id)
+
+    def _requeue_back(self, connection: sqlite3.Connection, task_id: bytes) -> None:
+        connection.execute(
+            "UPDATE tasks SET status = ?, seq = (SELECT max(seq) FROM tasks) + 1 WHERE id = ?", (READY, task_id)
+        )
+
+    def _reclaim_expired(self) -> None:
+        now = Timestamp.now()
+        connection = self._database.connection
+        if connection.execute("SELECT 1 FROM assignments WHERE expires_at <= ? LIMIT 1", (now,)).fetchone() is None:
+            return
+        with self._database.transaction() as connection:
+            expired = connection.execute(
+                "DELETE FROM assignments WHERE expires_at <= ? RETURNING task_id, id", (now,)
+            ).fetchall()
+            for task_id, _ in expired:
+                self._requeue_front(connection, task_id)
+        for task_id, assignment_id in expired:
+            self.log_warning(
+                f"lease of assignment {AssignmentId(assignment_id)} expired, task {TaskId(task_id)} is ready again"
+            )
+
+    def add_task(self, task: BaseTask) -> None:
+        self.add_tasks((task,))
+
+    def add_tasks(self, tasks: Sequence[BaseTask]) -> None:
+        if not tasks:
+            return
+        now = Timestamp.now()
+        rows = [
+            [
+                task.id.bytes,
+                self._signature_id(task.capability_signature),
+                READY if task.is_due(now) else DELAYED,
+                task.priority,
+                task.not_before,
+                0,
+                codecs.encode_tagged(task),
+            ]
+            for task in tasks
+        ]
+        with self._database.transaction() as connection:
+            added = set()
+            for task, row in zip(tasks, rows):
+                if task.depends_on and task.id not in added:
+                    added.add(task.id)
+                    pending = self._add_dependencies(connection, task)
+                    if pending:
+                        row[2], row[5] = WAITING, pending
+            # tasks added again keep their status unless they are delayed, ready or dead
+            connection.executemany(
+                "INSERT INTO tasks (id, signature_id, status, priority, not_before, pending, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET data = excluded.data, priority = excluded.priority,"
+                f" status = CASE WHEN status IN ({READY}, {DELAYED}, {DEAD}) THEN excluded.status ELSE status END,"
+                f" not_before = CASE WHEN status IN ({READY}, {DELAYED}, {DEAD}) THEN excluded.not_before"
+                " ELSE not_before END",
+                rows,
+            )
+        with self._task_ready:
+            self._task_ready.notify_all()
+
+    def _add_dependencies(self, connection: sqlite3.Connection, task: BaseTask) -> int:
+        """Record the dependencies of ``task`` that have not completed yet and return their number.
+
+        Dependencies are only recorded when the task is first added.
+        """
+        if connection.execute("SELECT 1 FROM tasks WHERE id = ?", (task.id.bytes,)).fetchone() is not None:
+            return 0
+        dependencies = [d.bytes for d in dict.fromkeys(task.depends_on)]
+        completed: set[bytes] = set()
+        for i in range(0, len(dependencies), _BATCH_SIZE):
+            keys = dependencies[i : i + _BATCH_SIZE]
+            placeholders = ", ".join("?" * len(keys))
+            completed.update(
+                task_id
+                for (task_id,) in connection.execute(
+                    f"SELECT id FROM tasks WHERE status = {COMPLETED} AND id IN ({placeholders})", keys
+                )
+            )
+        waiting = [d for d in dependencies if d not in completed]
+        connection.executemany(
+            "INSERT INTO dependencies (depends_on, task_id) VALUES (?, ?)", [(d, task.id.bytes) for d in waiting]
+        )
+        return len(waiting)
+
+    def get_task(self, task_id: TaskId) -> BaseTask:
+        row = self._database.connection.execute("SELECT data FROM tasks WHERE id = ?", (task_id.bytes,)).fetchone()
+        if row is None:
+            self.log_error(f"task {task_id} not found")
+            raise TaskNotFoundError(task_id=task_id)
+        return codecs.decode_tagged(row[0], trusted=True)  # type: ignore[return-value]
+
+    def get_tasks(self, task_ids: Sequence[TaskId]) -> list[BaseTask]:
+        found: Dict[bytes, bytes] = {}
+        connection = self._database.connection
+        for i in range(0, len(task_ids), _BATCH_SIZE):
+            keys = [task_id.bytes for task_id in task_ids[i : i + _BATCH_SIZE]]
+            placeholders = ", ".join("?" * len(keys))
+            found.update(connection.execute(f"SELECT id, data FROM tasks WHERE id IN ({placeholders})", keys))
+        tasks = []
+        for task_id in task_ids:
+            data = found.get(task_id.bytes)
+            if data is None:
+                self.log_error(f"task {task_id} not found")
+                raise TaskNotFoundError(task_id=task_id)
+            tasks.append(codecs.decode_tagged(data, trusted=True))
+        return tasks  # type: ignore[return-value]
+
+    def pickup_task(self, capabilities: Sequence[BaseCapability]) -> BaseTask:
+        tasks = self.pickup_tasks(capabilities, 1)
+        if not tasks:
+            raise NoCapableTaskError(capabilities=capabilities)
+        return tasks[0]
+
+    def pickup_tasks(self, capabilities: Sequence[BaseCapability], n: int) -> list[BaseTask]:
+        if n <= 0:
+            return []
+        self._reclaim_expired()
+        self._release_due()
+        signature_ids = self._capable_signature_ids(capabilities)
+        if not signature_ids:
+            return []
+        connection = self._database.connection
+        rows: list[tuple[int, int, bytes]] = []
+        for signature_id in signature_ids:
+            rows.extend(
+                connection.execute(
+                    "SELECT -priority, seq, data FROM tasks WHERE status = ? AND signature_id = ?"
+                    " ORDER BY priority DESC, seq LIMIT ?",
+                    (READY, signature_id, n),
+                )
+            )
+        best = heapq.nsmallest(n, rows, key=itemgetter(0, 1)) if len(signature_ids) > 1 else rows
+        return [codecs.decode_tagged(data, trusted=True) for _, _, data in best]  # type: ignore[misc]
+
+    def wait_for_task(self, capabilities: Sequence[BaseCapability], timeout: float) -> BaseTask:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self.pickup_task(capabilities)
+            except NoCapableTaskError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise
+            with self._task_ready:
+                self._task_ready.wait(min(remaining, self._poll_interval))
+
+    def create_assignment(self, worker_id: ComponentId, task: BaseTask) -> Assignment:
+        now = Timestamp.now()
+        assignment = Assignment.construct_trusted(
+            created_at=now,
+            updated_at=now,
+            worker_id=WorkerId(worker_id),
+            task_id=task.id,
+            expires_at=None if self._lease_duration is None else Timestamp(now + self._lease_duration),
+        )
+        with self._database.transaction() as connection:
+            claimed = connection.execute(
+                "UPDATE tasks SET status = ? WHERE id = ? AND status = ? RETURNING seq",
+                (ASSIGNED, task.id.bytes, READY),
+            ).fetchall()
+            if not claimed:
+                self.log_error(f"task {task.id} is not available")
+                raise TaskAlreadyAssignedError(task_id=task.id)
+            connection.execute(
+                "INSERT OR REPLACE INTO assignments (task_id, id, expires_at, data) VALUES (?, ?, ?, ?)",
+                (task.id.bytes, assignment.id.bytes, assignment.expires_at, assignment.to_bytes()),
+            )
+        return assignment
+
+    def heartbeat(self, assignment: Assignment) -> Assignment:
+        if self._lease_duration is None:
+            return assignment
+        now = Timestamp.now()
+        renewed = Assignment.construct_trusted(
+            id=assignment.id,
+            created_at=assignment.created_at,
+            updated_at=now,
+            worker_id=assignment.worker_id,
+            task_id=assignment.task_id,
+            expires_at=Timestamp(now + self._lease_duration),
+        )
+        updated = self._database.connection.execute(
+            "UPDATE assignments SET expires_at = ?, data = ? WHERE task_id = ? AND id = ?",
+            (renewed.expires_at, renewed.to_bytes(), assignment.task_id.bytes, assignment.id.bytes),
+        )
+        if updated.rowcount == 0:
+            self.log_error(f"assignment {assignment} not found")
+            raise AssignmentNotFoundError(assignment_id=assignment.id)
+        return renewed
+
+    def _delete_assignment(self, assignment: Assignment) -> None:
+        deleted = self._database.connection.execute(
+            "DELETE FROM assignments WHERE task_id = ? AND id = ?", (assignment.task_id.bytes, assignment.id.bytes)
+        )
+        if deleted.rowcount == 0:
+            self.log_error(f"assignment {assignment} not found")
+            raise AssignmentNotFoundError(assignment_id=assignment.id)
+
+    def fail_assignment(self, assignment: Assignment, error: str) -> None:
+        with self._database.transaction() as connection:
+            self._delete_assignment(assignment)
+            (data,) = connection.execute("SELECT data FROM tasks WHERE id = ?", (assignment.task_id.bytes,)).fetchone()
+            task: BaseTask = codecs.decode_tagged(data, trusted=True)  # type: ignore[assignment]
+            retry = task.retried()
+            if retry is None:
+                connection.execute("UPDATE tasks SET status = ? WHERE id = ?", (DEAD, task.id.bytes))
+            else:
+                connection.execute(
+                    "UPDATE tasks SET status = ?, not_before = ?, data = ? WHERE id = ?",
+                    (DELAYED, retry.not_before, codecs.encode_tagged(retry), task.id.bytes),
+                )
+        if retry is None:
+            self.log_error(f"task {task.id} failed {task.attempts + 1} times, giving up: {error}")
+
+    def get_dead_tasks(self) -> list[BaseTask]:
+        rows = self._database.connection.execute(
+            "SELECT data FROM tasks WHERE status = ? ORDER BY seq", (DEAD,)
+        ).fetchall()
+        return [codecs.decode_tagged(data, trusted=True) for (data,) in rows]  # type: ignore[misc]
+
+    def complete_assignment(self, assignment: Assignment) -> None:
+        task_id = assignment.task_id.bytes
+        with self._database.transaction() as connection:
+            self._delete_assignment(assignment)
+            connection.execute("UPDATE tasks SET status = ? WHERE id = ?", (COMPLETED, task_id))
+            counted = connection.execute(
+                "UPDATE tasks SET pending = pending - 1"
+                " WHERE id IN (SELECT task_id FROM dependencies WHERE depends_on = ?) AND status = ?"
+                " RETURNING id, pending, not_before",
+                (task_id, WAITING),
+            ).fetchall()
+            connection.execute("DELETE FROM dependencies WHERE depends_on = ?", (task_id,))
+            now = Timestamp.now()
+            released = False
+            for dependent, pending, not_before in counted:
+                if pending:
+                    continue
+                if not_before is None or not_before <= now:
+                    self._requeue_back(connection, dependent)
+                    released = True
+                else:
+                    connection.execute("UPDATE tasks SET status = ? WHERE id = ?", (DELAYED, dependent))
+        if released:
+            with self._task_ready:
+                self._task_ready.notify_all()
+
+    def abandon_assignment(self, assignment: Assignment) -> None:
+        with self._database.transaction() as connection:
+            self._delete_assignment(assignment)
+            # abandoned tasks go back to the front of their queue
+            self._requeue_front(connection, assignment.task_id.bytes)
+        with self._task_ready:
+            self._task_ready.notify_all()
@@ -0,0 +1,11 @@
+from typing import Optional
+
+from ..settings import BaseInterfaceSettings
+
+
+class SqliteInterfaceSettings(BaseInterfaceSettings):
+    path: str
+    busy_timeout: float = 30.0
+    synchronous: str = "NORMAL"
+    poll_interval: float = 0.05
+    lease_duration: Optional[float] = 60.0
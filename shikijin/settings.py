@@ -15,7 +15,9 @@ class AuthProviderType(str, Enum):
 
 
 class StorageType(str, Enum):
+    IN_MEMORY = "in_memory"
     LOCAL_FILE = "local_file"
+    SQLITE = "sqlite"
 
 
 class LoggerType(str, Enum):
@@ -24,10 +26,15 @@ class LoggerType(str, Enum):
 
 class WorkerType(str, Enum):
     BASIC = "basic"
+    THREAD_POOL = "thread_pool"
+    PROCESS_POOL = "process_pool"
+    ASYNC = "async"
 
 
 class InterfaceType(str, Enum):
     IN_MEMORY = "in_memory"
+    SQLITE = "sqlite"
+    REMOTE = "remote"
 
 
 class BaseSettings(_BaseSettings):
@@ -0,0 +1,65 @@
+"""Connections to SQLite databases shared by threads and processes.
+
+``sqlite3`` connections must not be used by more than one thread, and must not cross a
+``fork``, so ``SqliteDatabase`` opens one connection per thread and per process on demand.
+Every connection uses WAL journaling, so readers never block the single writer, and runs
+in autocommit mode: writes that must be atomic go through ``transaction``, which takes the
+write lock up front with ``BEGIN IMMEDIATE`` instead of upgrading a read lock midway.
+"""
+
+import os
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+class SqliteDatabase:
+    """Database at ``path``, created with the statements of ``schema`` if they are not there yet."""
+
+    def __init__(self, path: str, busy_timeout: float = 30.0, synchronous: str = "NORMAL", schema: str = ""):
+        if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"invalid synchronous mode: {synchronous}")
+        self._path = path
+        self._busy_timeout = busy_timeout
+        self._synchronous = synchronous.upper()
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if schema:
+            self.connection.executescript(schema)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self._path, timeout=self._busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={self._synchronous}")
+        return connection
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection of the calling thread, opened on first use and reopened after a fork."""
+        local = self._local
+        pid = os.getpid()
+        if getattr(local, "pid", None) != pid:
+            local.connection = self._open()
+            local.pid = pid
+        connection: sqlite3.Connection = local.connection
+        return connection
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the block in a write transaction, committed on success and rolled back on error."""
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
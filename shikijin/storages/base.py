@@ -0,0 +1,109 @@
+from abc import ABCMeta, abstractmethod
+from collections.abc import Iterable, Iterator, Sequence
+from typing import IO, Optional, Union
+
+from ..components import BaseShikijinComponent
+from ..fields import BlobId, Bytes
+from ..types import Blob
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+ChunkSource = Union[Iterable[bytes], IO[bytes]]
+
+
+def check_chunk_size(chunk_size: int) -> None:
+    """Reject chunk sizes that would never make progress through a payload.
+
+    >>> check_chunk_size(0)
+    Traceback (most recent call last):
+    ...
+    ValueError: chunk size must be positive: 0
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk size must be positive: {chunk_size}")
+
+
+def iter_chunks(source: ChunkSource, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Iterate over the chunks of ``source``, reading file-like objects ``chunk_size`` bytes at a time.
+
+    >>> import io
+    >>> list(iter_chunks(io.BytesIO(b"hello"), chunk_size=2))
+    [b'he', b'll', b'o']
+    >>> list(iter_chunks([b"he", b"llo"]))
+    [b'he', b'llo']
+    """
+    if hasattr(source, "read"):
+        check_chunk_size(chunk_size)
+        read = source.read
+        while chunk := read(chunk_size):
+            yield chunk
+        return
+    yield from source
+
+
+def resolve_range(size: int, offset: int, length: Optional[int]) -> tuple[int, int]:
+    """Clamp the byte range ``[offset, offset + length)`` to a payload of ``size`` bytes.
+
+    >>> resolve_range(10, 2, None)
+    (2, 10)
+    >>> resolve_range(10, 8, 5)
+    (8, 10)
+    """
+    if offset < 0 or (length is not None and length < 0):
+        raise ValueError(f"invalid range: offset={offset}, length={length}")
+    start = min(offset, size)
+    end = size if length is None else min(size, start + length)
+    return start, end
+
+
+class BaseStorage(BaseShikijinComponent, metaclass=ABCMeta):
+    @abstractmethod
+    def get_blob(self, blob_id: BlobId) -> Blob:
+        ...
+
+    def get_blobs(self, blob_ids: Sequence[BlobId]) -> list[Blob]:
+        return [self.get_blob(blob_id) for blob_id in blob_ids]
+
+    @abstractmethod
+    def save_blob(self, blob: Blob) -> None:
+        ...
+
+    def view_blob(self, blob_id: BlobId) -> memoryview:
+        """Read-only view of the payload of a blob, without copying it where the backend allows."""
+        return memoryview(self.get_blob(blob_id).blob)
+
+    @abstractmethod
+    def delete_blob(self, blob_id: BlobId) -> None:
+        """Delete a blob, raising ``BlobNotFoundError`` if there is none with this id."""
+        ...
+
+    def save_blob_stream(self, chunks: Iterable[bytes], blob_id: Optional[BlobId] = None) -> BlobId:
+        """Store the concatenation of ``chunks`` as one blob and return its id.
+
+        This default joins the chunks in memory; backends override it to keep memory use
+        proportional to the chunk size.
+        """
+        blob = Blob.construct_trusted(
+            id=blob_id if blob_id is not None else BlobId.generate(), blob=Bytes(b"".join(chunks))
+        )
+        self.save_blob(blob)
+        return blob.id
+
+    def blob_size(self, blob_id: BlobId) -> int:
+        with self.view_blob(blob_id) as view:
+            return len(view)
+
+    def read_blob_range(self, blob_id: BlobId, offset: int, length: Optional[int] = None) -> bytes:
+        with self.view_blob(blob_id) as view:
+            start, end = resolve_range(len(view), offset, length)
+            return view[start:end].tobytes()
+
+    def open_blob_stream(
+        self, blob_id: BlobId, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0, length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Iterate over the payload of a blob, or a byte range of it, ``chunk_size`` bytes at a time."""
+        check_chunk_size(chunk_size)
+        view = self.view_blob(blob_id)
+        start, end = resolve_range(len(view), offset, length)
+        for position in range(start, end, chunk_size):
+            yield view[position : min(position + chunk_size, end)].tobytes()
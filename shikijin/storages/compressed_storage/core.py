@@ -0,0 +1,246 @@
+import lzma
+import struct
+import zlib
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import chain
+from typing import Optional, Tuple
+
+from ...compression import (
+    DEFAULT_MIN_SIZE,
+    Buffer,
+    Codec,
+    compress,
+    compress_stream,
+    compressible,
+    decompress,
+    decompress_stream,
+)
+from ...fields import BlobId, Bytes, ComponentName
+from ...interfaces.exceptions import BlobCorruptedError
+from ...types import Blob
+from ..base import DEFAULT_CHUNK_SIZE, BaseStorage, check_chunk_size, resolve_range
+
+_MAGIC = b"\x89SKZ"
+# magic, code of the codec
+_HEADER = struct.Struct(">4sB")
+# size of the payload, then of the body stored between the header and the trailer
+_TRAILER = struct.Struct(">QQ")
+
+_DECOMPRESSION_ERRORS = (zlib.error, lzma.LZMAError, OSError, EOFError, ValueError)
+
+# codec and size of the payload of a blob stored behind a header, or None if it was stored as it is
+Framing = Optional[Tuple[Codec, int]]
+
+
+def _framing(head: Buffer, trailer: Buffer, size: int) -> Framing:
+    """Framing of a stored payload of ``size`` bytes, given its first and last bytes.
+
+    Payloads whose header or trailer is not consistent, such as blobs stored before
+    compression was enabled that happen to start with the magic, are stored as they are.
+    """
+    if size < _HEADER.size + _TRAILER.size or head[: len(_MAGIC)] != _MAGIC:
+        return None
+    try:
+        codec = Codec.from_code(head[len(_MAGIC)])
+    except ValueError:
+        return None
+    raw_size, body_size = _TRAILER.unpack(trailer)
+    if body_size != size - _HEADER.size - _TRAILER.size or (codec == Codec.NONE and raw_size != body_size):
+        return None
+    return codec, raw_size
+
+
+def _framing_of(stored: Buffer) -> Framing:
+    return _framing(stored[: _HEADER.size], stored[len(stored) - _TRAILER.size :], len(stored))
+
+
+def _counted(chunks: Iterable[bytes], sizes: list[int], index: int) -> Iterator[bytes]:
+    """Yield ``chunks``, adding up their sizes in ``sizes[index]``."""
+    for chunk in chunks:
+        sizes[index] += len(chunk)
+        yield chunk
+
+
+def _checked(blob_id: BlobId, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    try:
+        yield from chunks
+    except _DECOMPRESSION_ERRORS as e:
+        raise BlobCorruptedError(blob_id, str(e))
+
+
+def _rechunk(chunks: Iterable[bytes], chunk_size: int, start: int, end: int) -> Iterator[bytes]:
+    """Bytes ``[start, end)`` of the concatenation of ``chunks``, ``chunk_size`` bytes at a time."""
+    position = 0
+    pending = bytearray()
+    for chunk in chunks:
+        skip = max(0, start - position)
+        position += len(chunk)
+        if skip < len(chunk):
+            pending += chunk[skip : len(chunk) - max(0, position - end)]
+        while len(pending) >= chunk_size:
+            yield bytes(pending[:chunk_size])
+            del pending[:chunk_size]
+        if position >= end:
+            break
+    if pending:
+        yield bytes(pending)
+
+
+class CompressedStorage(BaseStorage):
+    """Wrap ``storage`` so that payloads are compressed with ``codec`` where it is worth it.
+
+    A payload of at least ``min_size`` bytes whose first bytes compress well (see
+    ``shikijin.compression``) is stored behind a header recording its codec and before a
+    trailer holding its size and the size of the compressed body, and every read
+    decompresses it transparently. Other payloads are stored as they are, so that
+    ``view_blob`` keeps serving them without copying; a header with no codec and a trailer
+    are added only to those starting like a header. A header is trusted only when its codec
+    is known and its trailer matches the size of the stored payload, so blobs stored before
+    compression was enabled are read as they are, as are blobs saved with another codec. A
+    compressed payload that fails to decompress raises ``BlobCorruptedError``.
+
+    Ranges and streams of compressed blobs decompress the payload from its start, so they
+    cost as much as reading the blob up to the end of the range.
+    """
+
+    def __init__(
+        self,
+        storage: BaseStorage,
+        codec: Codec,
+        min_size: int = DEFAULT_MIN_SIZE,
+        name: Optional[ComponentName] = None,
+    ):
+        super(CompressedStorage, self).__init__(logger=storage.logger, name=name)
+        self._storage = storage
+        self._codec = codec
+        self._min_size = min_size
+
+    @property
+    def storage(self) -> BaseStorage:
+        return self._storage
+
+    def _encode(self, payload: Buffer) -> Buffer:
+        codec, packed = compress(payload, self._codec, self._min_size)
+        if codec != Codec.NONE:
+            return b"".join((_HEADER.pack(_MAGIC, codec.code), packed, _TRAILER.pack(len(payload), len(packed))))
+        if payload[: len(_MAGIC)] == _MAGIC:
+            return b"".join((_HEADER.pack(_MAGIC, Codec.NONE.code), payload, _TRAILER.pack(len(payload), len(payload))))
+        return payload
+
+    @staticmethod
+    def _decode(blob_id: BlobId, stored: Buffer) -> Buffer:
+        framing = _framing_of(stored)
+        if framing is None:
+            return stored
+        codec, raw_size = framing
+        body = stored[_HEADER.size : len(stored) - _TRAILER.size]
+        if codec == Codec.NONE:
+            return body
+        try:
+            payload = decompress(codec, body)
+        except _DECOMPRESSION_ERRORS as e:
+            raise BlobCorruptedError(blob_id, str(e))
+        if len(payload) != raw_size:
+            raise BlobCorruptedError(blob_id, f"expected {raw_size} bytes, decompressed {len(payload)}")
+        return payload
+
+    def _probe(self, blob_id: BlobId) -> Tuple[Framing, int]:
+        """Framing and size of the stored payload of a blob."""
+        size = self._storage.blob_size(blob_id)
+        if size < _HEADER.size + _TRAILER.size:
+            return None, size
+        head = self._storage.read_blob_range(blob_id, 0, _HEADER.size)
+        if head[: len(_MAGIC)] != _MAGIC:
+            return None, size
+        return _framing(head, self._storage.read_blob_range(blob_id, size - _TRAILER.size), size), size
+
+    def get_blob(self, blob_id: BlobId) -> Blob:
+        return self._decoded(self._storage.get_blob(blob_id))
+
+    def get_blobs(self, blob_ids: Sequence[BlobId]) -> list[Blob]:
+        return [self._decoded(blob) for blob in self._storage.get_blobs(blob_ids)]
+
+    def _decoded(self, blob: Blob) -> Blob:
+        payload = self._decode(blob.id, blob.blob)
+        if payload is blob.blob:
+            return blob
+        return Blob.construct_trusted(
+            id=blob.id, created_at=blob.created_at, updated_at=blob.updated_at, blob=Bytes(payload)
+        )
+
+    def save_blob(self, blob: Blob) -> None:
+        stored = self._encode(blob.blob)
+        if stored is not blob.blob:
+            blob = Blob.construct_trusted(
+                id=blob.id, created_at=blob.created_at, updated_at=blob.updated_at, blob=Bytes(stored)
+            )
+        self._storage.save_blob(blob)
+
+    def save_blob_stream(self, chunks: Iterable[bytes], blob_id: Optional[BlobId] = None) -> BlobId:
+        chunks = iter(chunks)
+        head = bytearray()
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= self._min_size:
+                break
+        else:
+            # small enough to be compressed at once
+            blob = Blob.construct_trusted(id=blob_id if blob_id is not None else BlobId.generate(), blob=Bytes(head))
+            self.save_blob(blob)
+            return blob.id
+        # sizes of the payload and of the stored body, known once the chunks are consumed
+        sizes = [0, 0]
+
+        def trailer() -> Iterator[bytes]:
+            yield _TRAILER.pack(*sizes)
+
+        payload = _counted(chain((bytes(head),), chunks), sizes, 0)
+        if self._codec == Codec.NONE or not compressible(head):
+            if head[: len(_MAGIC)] != _MAGIC:
+                return self._storage.save_blob_stream(chain((bytes(head),), chunks), blob_id)
+            header = _HEADER.pack(_MAGIC, Codec.NONE.code)
+            body = _counted(payload, sizes, 1)
+        else:
+            header = _HEADER.pack(_MAGIC, self._codec.code)
+            body = _counted(compress_stream(self._codec, payload), sizes, 1)
+        return self._storage.save_blob_stream(chain((header,), body, trailer()), blob_id)
+
+    def delete_blob(self, blob_id: BlobId) -> None:
+        self._storage.delete_blob(blob_id)
+
+    def view_blob(self, blob_id: BlobId) -> memoryview:
+        view = self._storage.view_blob(blob_id)
+        framing = _framing_of(view)
+        if framing is None:
+            return view
+        if framing[0] == Codec.NONE:
+            return view[_HEADER.size : len(view) - _TRAILER.size]
+        return memoryview(self._decode(blob_id, view))
+
+    def blob_size(self, blob_id: BlobId) -> int:
+        framing, size = self._probe(blob_id)
+        return size if framing is None else framing[1]
+
+    def read_blob_range(self, blob_id: BlobId, offset: int, length: Optional[int] = None) -> bytes:
+        framing, _ = self._probe(blob_id)
+        if framing is None:
+            return self._storage.read_blob_range(blob_id, offset, length)
+        codec, raw_size = framing
+        if codec == Codec.NONE:
+            start, end = resolve_range(raw_size, offset, length)
+            return self._storage.read_blob_range(blob_id, _HEADER.size + start, end - start)
+        return b"".join(self.open_blob_stream(blob_id, offset=offset, length=length))
+
+    def open_blob_stream(
+        self, blob_id: BlobId, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0, length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        check_chunk_size(chunk_size)
+        framing, size = self._probe(blob_id)
+        if framing is None:
+            return self._storage.open_blob_stream(blob_id, chunk_size, offset, length)
+        codec, raw_size = framing
+        start, end = resolve_range(raw_size, offset, length)
+        if codec == Codec.NONE:
+            return self._storage.open_blob_stream(blob_id, chunk_size, _HEADER.size + start, end - start)
+        packed = self._storage.open_blob_stream(blob_id, chunk_size, _HEADER.size, size - _HEADER.size - _TRAILER.size)
+        return _rechunk(_checked(blob_id, decompress_stream(codec, packed)), chunk_size, start, end)
@@ -0,0 +1,48 @@
+from ..components import BaseShikijinComponentFactory
+from ..compression import Codec
+from ..settings import GlobalSettings, StorageType
+from .base import BaseStorage
+from .compressed_storage.core import CompressedStorage
+from .in_memory_storage.core import InMemoryStorage
+from .in_memory_storage.settings import InMemoryStorageSettings
+from .local_file_storage.core import LocalFileStorage
+from .local_file_storage.settings import LocalFileStorageSettings
+from .settings import BaseStorageSettings
+from .sqlite_storage.core import SqliteStorage
+from .sqlite_storage.settings import SqliteStorageSettings
+
+
+class StorageFactory(BaseShikijinComponentFactory[BaseStorage]):
+    def create(self, settings: GlobalSettings) -> BaseStorage:
+        t = settings.storage_type
+        if t == StorageType.IN_MEMORY:
+            self.log_info("creating storage")
+            s = InMemoryStorageSettings.from_global_settings(settings=settings)
+            return self._compressed(InMemoryStorage(logger=self.logger, name=s.name), s)
+        if t == StorageType.LOCAL_FILE:
+            self.log_info("creating storage")
+            self.log_info(f"storage settings: {settings.storage_settings}")
+            lf = LocalFileStorageSettings.from_global_settings(settings=settings)
+            local_file = LocalFileStorage(
+                root_path=lf.root_path, logger=self.logger, name=lf.name, shard_depth=lf.shard_depth, fsync=lf.fsync
+            )
+            return self._compressed(local_file, lf)
+        if t == StorageType.SQLITE:
+            self.log_info("creating storage")
+            self.log_info(f"storage settings: {settings.storage_settings}")
+            sq = SqliteStorageSettings.from_global_settings(settings=settings)
+            sqlite = SqliteStorage(
+                path=sq.path,
+                logger=self.logger,
+                name=sq.name,
+                busy_timeout=sq.busy_timeout,
+                synchronous=sq.synchronous,
+            )
+            return self._compressed(sqlite, sq)
+        raise ValueError(f"unknown storage type: {t}")
+
+    def _compressed(self, storage: BaseStorage, s: BaseStorageSettings) -> BaseStorage:
+        if s.compression == Codec.NONE:
+            return storage
+        self.log_info(f"compressing blobs with {s.compression.value}")
+        return CompressedStorage(storage, codec=s.compression, min_size=s.compression_min_size, name=s.name)
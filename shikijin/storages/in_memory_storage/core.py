@@ -0,0 +1,185 @@
+import hashlib
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator, Sequence
+from threading import Lock
+from typing import Dict, Optional, Tuple, Union
+
+from ...fields import BlobId, Bytes, ComponentName, Timestamp
+from ...interfaces.exceptions import BlobNotFoundError
+from ...loggers.base import BaseLogger
+from ...types import Blob
+from ..base import DEFAULT_CHUNK_SIZE, BaseStorage, check_chunk_size, resolve_range
+
+
+def _digest() -> "hashlib.blake2b":
+    return hashlib.blake2b(digest_size=16)
+
+
+class _ChunkedPayload:
+    """Payload of a streamed blob, kept as the list of chunks it was written with."""
+
+    __slots__ = ("chunks", "offsets", "size", "digest")
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks: list[bytes] = []
+        self.offsets: list[int] = []
+        self.size = 0
+        digest = _digest()
+        for chunk in chunks:
+            if not chunk:
+                continue
+            self.offsets.append(self.size)
+            self.chunks.append(bytes(chunk))
+            self.size += len(chunk)
+            digest.update(chunk)
+        self.digest = digest.digest()
+
+    def pieces(self, start: int, end: int) -> Iterator[memoryview]:
+        i = max(bisect_right(self.offsets, start) - 1, 0)
+        while i < len(self.chunks) and self.offsets[i] < end:
+            chunk_start = self.offsets[i]
+            view = memoryview(self.chunks[i])
+            yield view[max(start - chunk_start, 0) : min(end - chunk_start, len(view))]
+            i += 1
+
+
+_Payload = Union[Bytes, _ChunkedPayload]
+
+
+def _size(payload: _Payload) -> int:
+    return len(payload) if isinstance(payload, Bytes) else payload.size
+
+
+class _Stored:
+    """Blob id entry: its timestamps and the digest of its payload."""
+
+    __slots__ = ("created_at", "updated_at", "digest")
+
+    def __init__(self, created_at: Timestamp, updated_at: Timestamp, digest: bytes):
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.digest = digest
+
+
+class InMemoryStorage(BaseStorage):
+    """Storage keeping blobs on the heap.
+
+    Blobs written with ``save_blob_stream`` keep the chunks they were written with, so range
+    reads and streams only touch the chunks they need instead of joining the whole payload.
+
+    Payloads are deduplicated by content: blobs saved under different ids with identical
+    bytes share one payload, counted by the number of ids referring to it and freed when
+    the last of them is deleted. ``stored_bytes`` is the size of the distinct payloads.
+    """
+
+    def __init__(self, logger: BaseLogger, name: Optional[ComponentName] = None):
+        super(InMemoryStorage, self).__init__(logger=logger, name=name)
+        self._blobs: Dict[BlobId, _Stored] = {}
+        # digest -> payload, and the number of blob ids referring to it
+        self._payloads: Dict[bytes, _Payload] = {}
+        self._payload_refs: Dict[bytes, int] = {}
+        self._stored_bytes = 0
+        self._lock = Lock()
+
+    @property
+    def stored_bytes(self) -> int:
+        return self._stored_bytes
+
+    def _get(self, blob_id: BlobId) -> Tuple[_Stored, _Payload]:
+        try:
+            with self._lock:
+                stored = self._blobs[blob_id]
+                return stored, self._payloads[stored.digest]
+        except KeyError:
+            self.log_error(f"blob {blob_id} not found")
+            raise BlobNotFoundError(blob_id=blob_id)
+
+    def _to_blob(self, blob_id: BlobId, stored: _Stored, payload: _Payload) -> Blob:
+        data = payload if isinstance(payload, Bytes) else Bytes(b"".join(payload.chunks))
+        return Blob.construct_trusted(id=blob_id, created_at=stored.created_at, updated_at=stored.updated_at, blob=data)
+
+    def _store(self, blob_id: BlobId, stored: _Stored, payload: _Payload) -> None:
+        with self._lock:
+            previous = self._blobs.get(blob_id)
+            if previous is not None:
+                self._release(previous.digest)
+            self._blobs[blob_id] = stored
+            refs = self._payload_refs.get(stored.digest, 0)
+            if not refs:
+                self._payloads[stored.digest] = payload
+                self._stored_bytes += _size(payload)
+            self._payload_refs[stored.digest] = refs + 1
+
+    def _release(self, digest: bytes) -> None:
+        refs = self._payload_refs[digest] - 1
+        if refs:
+            self._payload_refs[digest] = refs
+            return
+        del self._payload_refs[digest]
+        self._stored_bytes -= _size(self._payloads.pop(digest))
+
+    def get_blob(self, blob_id: BlobId) -> Blob:
+        return self._to_blob(blob_id, *self._get(blob_id))
+
+    def get_blobs(self, blob_ids: Sequence[BlobId]) -> list[Blob]:
+        return [self._to_blob(blob_id, *self._get(blob_id)) for blob_id in blob_ids]
+
+    def save_blob(self, blob: Blob) -> None:
+        digest = _digest()
+        digest.update(blob.blob)
+        payload = blob.blob if isinstance(blob.blob, Bytes) else Bytes(blob.blob)
+        self._store(blob.id, _Stored(blob.created_at, blob.updated_at, digest.digest()), payload)
+
+    def save_blob_stream(self, chunks: Iterable[bytes], blob_id: Optional[BlobId] = None) -> BlobId:
+        blob_id = blob_id if blob_id is not None else BlobId.generate()
+        payload = _ChunkedPayload(chunks)
+        now = Timestamp.now()
+        self._store(blob_id, _Stored(now, now, payload.digest), payload)
+        return blob_id
+
+    def delete_blob(self, blob_id: BlobId) -> None:
+        with self._lock:
+            stored = self._blobs.pop(blob_id, None)
+            if stored is not None:
+                self._release(stored.digest)
+                return
+        self.log_error(f"blob {blob_id} not found")
+        raise BlobNotFoundError(blob_id=blob_id)
+
+    def view_blob(self, blob_id: BlobId) -> memoryview:
+        _, payload = self._get(blob_id)
+        if isinstance(payload, Bytes):
+            return memoryview(payload)
+        return memoryview(b"".join(payload.chunks))
+
+    def blob_size(self, blob_id: BlobId) -> int:
+        return _size(self._get(blob_id)[1])
+
+    def read_blob_range(self, blob_id: BlobId, offset: int, length: Optional[int] = None) -> bytes:
+        _, payload = self._get(blob_id)
+        if isinstance(payload, Bytes):
+            start, end = resolve_range(len(payload), offset, length)
+            return payload[start:end]
+        start, end = resolve_range(payload.size, offset, length)
+        return b"".join(payload.pieces(start, end))
+
+    def open_blob_stream(
+        self, blob_id: BlobId, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0, length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        check_chunk_size(chunk_size)
+        _, entry = self._get(blob_id)
+        if isinstance(entry, Bytes):
+            yield from super(InMemoryStorage, self).open_blob_stream(blob_id, chunk_size, offset, length)
+            return
+        start, end = resolve_range(entry.size, offset, length)
+        buffer = bytearray()
+        for piece in entry.pieces(start, end):
+            while len(piece):
+                taken = piece[: chunk_size - len(buffer)]
+                buffer += taken
+                piece = piece[len(taken) :]
+                if len(buffer) == chunk_size:
+                    yield bytes(buffer)
+                    buffer.clear()
+        if buffer:
+            yield bytes(buffer)
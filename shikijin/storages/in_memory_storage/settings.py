@@ -0,0 +1,5 @@
+from ..settings import BaseStorageSettings
+
+
+class InMemoryStorageSettings(BaseStorageSettings):
+    ...
@@ -0,0 +1,128 @@
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Iterable
+from typing import IO, Optional
+
+from ...fields import BlobId, Bytes, ComponentName, Timestamp
+from ...interfaces.exceptions import BlobNotFoundError
+from ...loggers.base import BaseLogger
+from ...types import Blob
+from ..base import BaseStorage
+
+_MAGIC = b"SKJB"
+_VERSION = 1
+# magic, format version, created_at, updated_at
+_HEADER = struct.Struct(">4sBqq")
+
+
+class LocalFileStorage(BaseStorage):
+    """Storage keeping one file per blob under ``root_path``.
+
+    Files are spread over ``shard_depth`` levels of directories named after the leading bytes
+    of the blob id, so that no directory grows too large. A blob is written to a temporary
+    file in its final directory and renamed into place, so readers never see a partial blob.
+    Reads map the file into memory: ``view_blob`` returns a view of the payload without
+    copying it, and the data is paged in by the OS instead of living on the heap.
+    """
+
+    def __init__(
+        self,
+        root_path: str,
+        logger: BaseLogger,
+        name: Optional[ComponentName] = None,
+        shard_depth: int = 2,
+        fsync: bool = True,
+    ):
+        super(LocalFileStorage, self).__init__(logger=logger, name=name)
+        self._root_path = root_path
+        self._shard_depth = shard_depth
+        self._fsync = fsync
+        os.makedirs(root_path, exist_ok=True)
+
+    @property
+    def root_path(self) -> str:
+        return self._root_path
+
+    def path_of(self, blob_id: BlobId) -> str:
+        h = blob_id.hex
+        shards = [h[2 * i : 2 * i + 2] for i in range(self._shard_depth)]
+        return os.path.join(self._root_path, *shards, h)
+
+    def _map(self, blob_id: BlobId) -> mmap.mmap:
+        try:
+            with open(self.path_of(blob_id), "rb") as f:
+                if os.fstat(f.fileno()).st_size < _HEADER.size:
+                    # also an empty file, which cannot be mapped
+                    self.log_error(f"blob {blob_id} has an unknown file format")
+                    raise ValueError(f"blob {blob_id} has an unknown file format")
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            self.log_error(f"blob {blob_id} not found")
+            raise BlobNotFoundError(blob_id=blob_id)
+        magic, version, _, _ = _HEADER.unpack_from(mapped)
+        if magic != _MAGIC or version != _VERSION:
+            mapped.close()
+            self.log_error(f"blob {blob_id} has an unknown file format")
+            raise ValueError(f"blob {blob_id} has an unknown file format")
+        return mapped
+
+    def view_blob(self, blob_id: BlobId) -> memoryview:
+        return memoryview(self._map(blob_id))[_HEADER.size :]
+
+    def get_blob(self, blob_id: BlobId) -> Blob:
+        mapped = self._map(blob_id)
+        with mapped:
+            _, _, created_at, updated_at = _HEADER.unpack_from(mapped)
+            with memoryview(mapped) as view, view[_HEADER.size :] as payload_view:
+                payload = Bytes(payload_view)
+        return Blob.construct_trusted(
+            id=blob_id, created_at=Timestamp(created_at), updated_at=Timestamp(updated_at), blob=payload
+        )
+
+    def _write(self, blob_id: BlobId, created_at: Timestamp, updated_at: Timestamp, chunks: Iterable[bytes]) -> None:
+        path = self.path_of(blob_id)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            f: IO[bytes]
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, created_at, updated_at))
+                for chunk in chunks:
+                    f.write(chunk)
+                if self._fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def save_blob(self, blob: Blob) -> None:
+        self._write(blob.id, blob.created_at, blob.updated_at, (blob.blob,))
+
+    def save_blob_stream(self, chunks: Iterable[bytes], blob_id: Optional[BlobId] = None) -> BlobId:
+        blob_id = blob_id if blob_id is not None else BlobId.generate()
+        now = Timestamp.now()
+        self._write(blob_id, now, now, chunks)
+        return blob_id
+
+    def delete_blob(self, blob_id: BlobId) -> None:
+        try:
+            os.unlink(self.path_of(blob_id))
+        except FileNotFoundError:
+            self.log_error(f"blob {blob_id} not found")
+            raise BlobNotFoundError(blob_id=blob_id)
+
+    def blob_size(self, blob_id: BlobId) -> int:
+        try:
+            size = os.stat(self.path_of(blob_id)).st_size
+        except FileNotFoundError:
+            self.log_error(f"blob {blob_id} not found")
+            raise BlobNotFoundError(blob_id=blob_id)
+        if size < _HEADER.size:
+            self.log_error(f"blob {blob_id} has an unknown file format")
+            raise ValueError(f"blob {blob_id} has an unknown file format")
+        return size - _HEADER.size
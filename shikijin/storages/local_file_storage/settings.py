@@ -0,0 +1,7 @@
+from ..settings import BaseStorageSettings
+
+
+class LocalFileStorageSettings(BaseStorageSettings):
+    root_path: str = "blobs"
+    shard_depth: int = 2
+    fsync: bool = True
@@ -0,0 +1,21 @@
+from typing import Type, Union
+
+from pydantic import Extra
+
+from ..compression import DEFAULT_MIN_SIZE, Codec
+from ..fields import ComponentName
+from ..settings import BaseComponentSettings, GlobalSettings, S
+
+
+class BaseStorageSettings(BaseComponentSettings):
+    name: Union[ComponentName, None] = None
+    compression: Codec = Codec.NONE
+    compression_min_size: int = DEFAULT_MIN_SIZE
+
+    class Config:
+        # ``storage_settings`` is shared by every type, so keys meant for another type are ignored
+        extra = Extra.ignore
+
+    @classmethod
+    def from_global_settings(cls: Type[S], settings: GlobalSettings) -> S:
+        return cls(**settings.storage_settings)
@@ -0,0 +1,96 @@
+from collections.abc import Iterator
+from typing import Optional
+
+from ...fields import BlobId, Bytes, ComponentName, Timestamp
+from ...interfaces.exceptions import BlobNotFoundError
+from ...loggers.base import BaseLogger
+from ...sqlite import SqliteDatabase
+from ...types import Blob
+from ..base import DEFAULT_CHUNK_SIZE, BaseStorage, check_chunk_size, resolve_range
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    id BLOB PRIMARY KEY,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SqliteStorage(BaseStorage):
+    """Storage keeping blobs in a table of a SQLite database.
+
+    Ids are stored as their 16 raw bytes and payloads as they are. Range reads and streams
+    fetch only the requested bytes with ``substr``. The database may be shared with other
+    processes and with a ``SqliteInterface``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        logger: BaseLogger,
+        name: Optional[ComponentName] = None,
+        busy_timeout: float = 30.0,
+        synchronous: str = "NORMAL",
+    ):
+        super(SqliteStorage, self).__init__(logger=logger, name=name)
+        self._database = SqliteDatabase(path, busy_timeout=busy_timeout, synchronous=synchronous, schema=SCHEMA)
+
+    @property
+    def path(self) -> str:
+        return self._database.path
+
+    def _not_found(self, blob_id: BlobId) -> BlobNotFoundError:
+        self.log_error(f"blob {blob_id} not found")
+        return BlobNotFoundError(blob_id=blob_id)
+
+    def get_blob(self, blob_id: BlobId) -> Blob:
+        row = self._database.connection.execute(
+            "SELECT created_at, updated_at, data FROM blobs WHERE id = ?", (blob_id.bytes,)
+        ).fetchone()
+        if row is None:
+            raise self._not_found(blob_id)
+        return Blob.construct_trusted(
+            id=blob_id, created_at=Timestamp(row[0]), updated_at=Timestamp(row[1]), blob=Bytes(row[2])
+        )
+
+    def save_blob(self, blob: Blob) -> None:
+        self._database.connection.execute(
+            "INSERT OR REPLACE INTO blobs (id, created_at, updated_at, data) VALUES (?, ?, ?, ?)",
+            (blob.id.bytes, blob.created_at, blob.updated_at, blob.blob),
+        )
+
+    def delete_blob(self, blob_id: BlobId) -> None:
+        deleted = self._database.connection.execute("DELETE FROM blobs WHERE id = ?", (blob_id.bytes,))
+        if deleted.rowcount == 0:
+            raise self._not_found(blob_id)
+
+    def blob_size(self, blob_id: BlobId) -> int:
+        row = self._database.connection.execute(
+            "SELECT length(data) FROM blobs WHERE id = ?", (blob_id.bytes,)
+        ).fetchone()
+        if row is None:
+            raise self._not_found(blob_id)
+        size: int = row[0]
+        return size
+
+    def read_blob_range(self, blob_id: BlobId, offset: int, length: Optional[int] = None) -> bytes:
+        start, end = resolve_range(self.blob_size(blob_id), offset, length)
+        if start == end:
+            return b""
+        row = self._database.connection.execute(
+            "SELECT substr(data, ?, ?) FROM blobs WHERE id = ?", (start + 1, end - start, blob_id.bytes)
+        ).fetchone()
+        if row is None:
+            raise self._not_found(blob_id)
+        data: bytes = row[0]
+        return data
+
+    def open_blob_stream(
+        self, blob_id: BlobId, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0, length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        check_chunk_size(chunk_size)
+        start, end = resolve_range(self.blob_size(blob_id), offset, length)
+        for position in range(start, end, chunk_size):
+            yield self.read_blob_range(blob_id, position, min(chunk_size, end - position))
@@ -0,0 +1,7 @@
+from ..settings import BaseStorageSettings
+
+
+class SqliteStorageSettings(BaseStorageSettings):
+    path: str
+    busy_timeout: float = 30.0
+    synchronous: str = "NORMAL"
@@ -1,10 +1,33 @@
-from collections.abc import Mapping
-from typing import AbstractSet, Any, Callable, Dict, Generic, Optional, Union
+import random
+from abc import abstractmethod
+from collections.abc import AsyncIterable, Iterable, Mapping, Sequence
+from typing import (
+    AbstractSet,
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    FrozenSet,
+    Generic,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from humps import camelize
-from pydantic import Field
+from pydantic import BaseModel, Field
+from pydantic.fields import (
+    SHAPE_LIST,
+    SHAPE_SINGLETON,
+    SHAPE_TUPLE_ELLIPSIS,
+    ModelField,
+)
 from pydantic.generics import GenericModel as _BaseModel
 
+from . import codecs
 from .fields import (
     AssignmentId,
     BlobId,
@@ -15,9 +38,79 @@ from .fields import (
     Serializable,
     TaskId,
     Timestamp,
+    UserId,
     WorkerId,
 )
 
+Converter = Callable[[Any, Dict[str, Any]], Any]
+
+
+def to_plain(value: Any, options: Dict[str, Any]) -> Any:
+    """Convert ``value`` into plain containers and scalars, serializing ids, bytes and nested models.
+
+    ``options`` are the keyword arguments passed on to ``dict`` of nested models.
+    """
+    if isinstance(value, Serializable):
+        return value.serialize()
+    if isinstance(value, BaseModel):
+        return value.dict(**options)
+    if isinstance(value, dict):
+        return {to_plain(k, options): to_plain(v, options) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_plain(v, options) for v in value]
+    if isinstance(value, (tuple, set, frozenset)):
+        return type(value)(to_plain(v, options) for v in value)
+    return value
+
+
+def _serialize(value: Any, options: Dict[str, Any]) -> Any:
+    return value.serialize()
+
+
+def _nested_dict(value: Any, options: Dict[str, Any]) -> Any:
+    return value.dict(**options)
+
+
+def _serialize_list(value: Any, options: Dict[str, Any]) -> Any:
+    return [v.serialize() for v in value]
+
+
+def _serialize_tuple(value: Any, options: Dict[str, Any]) -> Any:
+    return tuple(v.serialize() for v in value)
+
+
+def _copy(value: Any, options: Dict[str, Any]) -> Any:
+    return value.copy()
+
+
+def _field_converter(field: ModelField) -> Optional[Converter]:
+    """How to turn the value of ``field`` into its plain form; None when it can be used as is."""
+    t = field.type_
+    if not isinstance(t, type) or field.sub_fields and field.shape == SHAPE_SINGLETON:
+        return to_plain
+    serializable = issubclass(t, Serializable)
+    if field.shape == SHAPE_SINGLETON:
+        if serializable:
+            return _serialize
+        if issubclass(t, BaseModel):
+            return _nested_dict
+        if issubclass(t, (bool, int, float, str, bytes)):
+            return None
+        return to_plain
+    if serializable and field.shape == SHAPE_LIST:
+        return _serialize_list
+    if serializable and field.shape == SHAPE_TUPLE_ELLIPSIS:
+        return _serialize_tuple
+    if field.shape == SHAPE_LIST and issubclass(t, (bool, int, float, str)):
+        return _copy
+    return to_plain
+
+
+BaseTypeT = TypeVar("BaseTypeT", bound="BaseType")
+
+_defaulted_fields: Dict[type, Tuple[Tuple[str, ModelField], ...]] = {}
+_serialization_plans: Dict[type, Tuple[Tuple[str, str, Optional[Converter], ModelField], ...]] = {}
+
 
 class BaseType(_BaseModel):
     class Config:
@@ -25,6 +118,54 @@ class BaseType(_BaseModel):
         alias_generator = camelize
         allow_population_by_field_name = True
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super(BaseType, cls).__init_subclass__(**kwargs)
+        codecs.register(cls)
+
+    @classmethod
+    def construct_trusted(cls: Type[BaseTypeT], **values: Any) -> BaseTypeT:
+        """Build an instance without validating ``values``.
+
+        Meant for data the framework produced itself, such as rows a backend wrote or entities
+        decoded by ``shikijin.codecs``: values are keyed by field name, must already have their
+        field types and are stored as is. Missing fields get their defaults. Data coming from
+        outside must still go through the regular constructor.
+
+        >>> from shikijin.fields import Bytes
+        >>> blob = Blob.construct_trusted(blob=Bytes(b"hello"))
+        >>> blob.blob
+        Bytes(b'hello')
+        >>> blob == Blob(id=blob.id, created_at=blob.created_at, updated_at=blob.updated_at, blob=b"hello")
+        True
+        """
+        fields_set = set(values)
+        for name, field in cls._defaulted_fields():
+            if name not in fields_set:
+                values[name] = field.get_default()
+        entity = cls.__new__(cls)
+        object.__setattr__(entity, "__dict__", values)
+        object.__setattr__(entity, "__fields_set__", fields_set)
+        if cls.__private_attributes__:
+            entity._init_private_attributes()
+        return entity
+
+    @classmethod
+    def _defaulted_fields(cls) -> Tuple[Tuple[str, ModelField], ...]:
+        fields = _defaulted_fields.get(cls)
+        if fields is None:
+            fields = tuple((name, field) for name, field in cls.__fields__.items() if not field.required)
+            _defaulted_fields[cls] = fields
+        return fields
+
+    @classmethod
+    def _serialization_plan(cls) -> Tuple[Tuple[str, str, Optional[Converter], ModelField], ...]:
+        """Field names, aliases and converters used by ``dict``, computed once per class."""
+        plan = _serialization_plans.get(cls)
+        if plan is None:
+            plan = tuple((name, field.alias, _field_converter(field), field) for name, field in cls.__fields__.items())
+            _serialization_plans[cls] = plan
+        return plan
+
     def dict(
         self,
         *,
@@ -36,20 +177,51 @@ class BaseType(_BaseModel):
         exclude_defaults: bool = False,
         exclude_none: bool = False,
     ) -> Dict[str, Any]:
-        return dict(
-            (k, v.serialize() if isinstance(v, Serializable) else v)
-            for k, v in super(BaseType, self)
-            .dict(
-                include=include,
-                exclude=exclude,
-                by_alias=by_alias,
-                skip_defaults=skip_defaults,
-                exclude_unset=exclude_unset,
-                exclude_defaults=exclude_defaults,
-                exclude_none=exclude_none,
+        if isinstance(include, Mapping) or isinstance(exclude, Mapping):
+            # nested include/exclude specifications are left to pydantic
+            return cast(
+                Dict[str, Any],
+                to_plain(
+                    super(BaseType, self).dict(
+                        include=include,
+                        exclude=exclude,
+                        by_alias=by_alias,
+                        skip_defaults=skip_defaults,
+                        exclude_unset=exclude_unset,
+                        exclude_defaults=exclude_defaults,
+                        exclude_none=exclude_none,
+                    ),
+                    {"by_alias": by_alias},
+                ),
             )
-            .items()
-        )
+        if skip_defaults is not None:
+            exclude_unset = skip_defaults
+        options = {
+            "by_alias": by_alias,
+            "exclude_unset": exclude_unset,
+            "exclude_defaults": exclude_defaults,
+            "exclude_none": exclude_none,
+        }
+        values = self.__dict__
+        fields_set = self.__fields_set__ if exclude_unset else None
+        result: Dict[str, Any] = {}
+        for name, alias, convert, field in self._serialization_plan():
+            if include is not None and name not in include:
+                continue
+            if exclude is not None and name in exclude:
+                continue
+            if fields_set is not None and name not in fields_set:
+                continue
+            value = values[name]
+            if value is None:
+                if exclude_none:
+                    continue
+            elif convert is not None:
+                value = convert(value, options)
+            if exclude_defaults and not field.required and values[name] == field.default:
+                continue
+            result[alias if by_alias else name] = value
+        return result
 
     def json(
         self,
@@ -65,7 +237,7 @@ class BaseType(_BaseModel):
         models_as_dict: bool = True,
         **dumps_kwargs: Any,
     ) -> str:
-        return super().json(
+        data = self.dict(
             include=include,
             exclude=exclude,
             by_alias=by_alias,
@@ -73,10 +245,11 @@ class BaseType(_BaseModel):
             exclude_unset=exclude_unset,
             exclude_defaults=exclude_defaults,
             exclude_none=exclude_none,
-            encoder=encoder,
-            models_as_dict=models_as_dict,
-            **dumps_kwargs,
         )
+        return self.__config__.json_dumps(data, default=encoder or self.__json_encoder__, **dumps_kwargs)
+
+
+EntityT = TypeVar("EntityT", bound="BaseEntity[Any]")
 
 
 class BaseEntity(BaseType, Generic[IdT]):
@@ -84,18 +257,263 @@ class BaseEntity(BaseType, Generic[IdT]):
     created_at: Timestamp = Field(default_factory=Timestamp.now)
     updated_at: Timestamp = Field(default_factory=Timestamp.now)
 
+    def to_bytes(self) -> bytes:
+        """Compact binary form of the entity, see ``shikijin.codecs``."""
+        return codecs.encode(self)
+
+    @classmethod
+    def from_bytes(cls: Type[EntityT], data: Union[bytes, memoryview], trusted: bool = False) -> EntityT:
+        """Decode the output of ``to_bytes``, validated unless the process wrote ``data`` itself."""
+        return codecs.decode(cls, data, trusted)
+
+    @classmethod
+    def many_to_bytes(cls, entities: Iterable["BaseEntity[Any]"]) -> bytes:
+        return codecs.encode_many(entities)
+
+    @classmethod
+    def many_from_bytes(cls: Type[EntityT], data: Union[bytes, memoryview], trusted: bool = False) -> list[EntityT]:
+        return list(codecs.decode_many(data, cls, trusted))
+
+
+CapabilitySignature = FrozenSet[str]
+
+
+class BaseCapability(BaseEntity[CapabilityId]):
+    @classmethod
+    def capability_name(cls) -> str:
+        return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def provided_capability_names(capabilities: Sequence[BaseCapability]) -> CapabilitySignature:
+    """Names of every capability class (including base classes) provided by ``capabilities``.
+
+    >>> class GpuCapability(BaseCapability):
+    ...     ...
+    >>> sorted(provided_capability_names([GpuCapability()]))
+    ['shikijin.types.BaseCapability', 'shikijin.types.GpuCapability']
+    """
+    return frozenset(
+        c.capability_name()
+        for capability in capabilities
+        for c in type(capability).__mro__
+        if isinstance(c, type) and issubclass(c, BaseCapability)
+    )
+
+
+class RetryPolicy(BaseType):
+    """How a task is retried after a failed run.
+
+    The ``n``-th retry waits ``initial_delay * multiplier ** (n - 1)`` seconds, capped at
+    ``max_delay``, minus a random fraction up to ``jitter`` of it so that tasks which failed
+    together do not come back together. A task that has failed ``max_attempts`` times is
+    dead-lettered; None retries it forever.
+
+    >>> policy = RetryPolicy(initial_delay=1.0, multiplier=2.0, max_delay=5.0)
+    >>> [policy.delay(n) for n in range(1, 6)]
+    [1.0, 2.0, 4.0, 5.0, 5.0]
+    """
+
+    max_attempts: Optional[int] = None
+    initial_delay: float = 1.0
+    multiplier: float = 2.0
+    max_delay: float = 300.0
+    jitter: float = 0.0
+
+    def delay(self, retry: int) -> float:
+        """Seconds to wait before the ``retry``-th retry, counted from 1."""
+        delay = min(self.initial_delay * self.multiplier ** max(retry - 1, 0), self.max_delay)
+        if self.jitter:
+            delay -= delay * self.jitter * random.random()
+        return delay
+
+
+class CacheStats(BaseType):
+    """Counters of a bounded cache; ``size`` and ``capacity`` are in the unit the cache is bounded by.
+
+    >>> CacheStats(hits=3, misses=1).hit_ratio
+    0.75
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+    capacity: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+TaskT = TypeVar("TaskT", bound="BaseTask")
+
+# names of the fields of each task class holding blob ids
+_blob_fields: Dict[type, Tuple[str, ...]] = {}
+
+# fields that say how and for whom a task is run rather than what it computes
+_SCHEDULING_FIELDS = frozenset(("id", "created_at", "updated_at", "priority", "not_before", "attempts", "owner"))
+
 
 class BaseTask(BaseEntity[TaskId]):
-    ...
+    """Unit of work run by a worker.
+
+    Interfaces hand out ready tasks by decreasing ``priority``, and in order of arrival
+    among tasks of equal priority. ``not_before`` delays the task: interfaces do not hand it
+    out before that time. ``attempts`` counts the failed runs of the task, which is retried
+    as its class's ``retry_policy`` says. ``owner`` is the user the task is run for: the
+    in-memory interface shares the workers fairly between owners, and child tasks without
+    an owner inherit the owner of their parent. ``depends_on`` lists the tasks that must
+    complete before this one is handed out; it is fixed when the task is first added, and
+    may name tasks that have not been added yet.
+
+    Classes whose tasks are deterministic may set ``memoize``: interfaces supporting it then
+    run a task only once per ``content_hash``, and an identical task added while the first
+    one is in flight or after it completed joins its outcome instead of running again.
+    """
+
+    required_capabilities: ClassVar[Tuple[Type[BaseCapability], ...]] = ()
+    retry_policy: ClassVar[RetryPolicy] = RetryPolicy()
+    memoize: ClassVar[bool] = False
+
+    priority: int = 0
+    not_before: Optional[Timestamp] = None
+    attempts: int = 0
+    owner: Optional[UserId] = None
+    depends_on: Tuple[TaskId, ...] = ()
+
+    @property
+    def capability_signature(self) -> CapabilitySignature:
+        """Names of the capability classes a worker must provide to run this task.
+
+        Tasks sharing a signature are interchangeable from a scheduling point of view,
+        so interfaces can index ready tasks by it.
+        """
+        return frozenset(c.capability_name() for c in self.required_capabilities)
+
+    @classmethod
+    def _blob_fields(cls) -> Tuple[str, ...]:
+        names = _blob_fields.get(cls)
+        if names is None:
+            names = tuple(
+                name
+                for name, field in cls.__fields__.items()
+                if isinstance(field.type_, type)
+                and issubclass(field.type_, BlobId)
+                and field.shape in (SHAPE_SINGLETON, SHAPE_LIST, SHAPE_TUPLE_ELLIPSIS)
+            )
+            _blob_fields[cls] = names
+        return names
+
+    def blob_ids(self) -> list[BlobId]:
+        """Ids of the blobs the task refers to through its fields of type ``BlobId``, or lists and tuples of them.
+
+        >>> class ConcatTask(BaseTask):
+        ...     parts: Tuple[BlobId, ...]
+        ...     output: Optional[BlobId] = None
+        ...     def run(self):
+        ...         return []
+        >>> a, b = BlobId.generate(), BlobId.generate()
+        >>> ConcatTask(parts=(a, b)).blob_ids() == [a, b]
+        True
+        """
+        values = self.__dict__
+        ids: list[BlobId] = []
+        for name in self._blob_fields():
+            value = values[name]
+            if isinstance(value, BlobId):
+                ids.append(value)
+            elif value is not None:
+                ids.extend(value)
+        return ids
+
+    def content_hash(self) -> bytes:
+        """Digest of the class and of the fields that make up what the task computes.
+
+        >>> class NoopTask(BaseTask):
+        ...     def run(self):
+        ...         return []
+        >>> NoopTask(priority=1).content_hash() == NoopTask(owner=UserId("alice")).content_hash()
+        True
+        """
+        return codecs.content_hash(self, _SCHEDULING_FIELDS)
+
+    def is_capable(self, capabilities: Sequence[BaseCapability]) -> bool:
+        return self.capability_signature <= provided_capability_names(capabilities)
+
+    def is_due(self, now: Optional[int] = None) -> bool:
+        """Whether the task may be handed out at ``now`` (default: the current time)."""
+        return self.not_before is None or self.not_before <= (Timestamp.now() if now is None else now)
+
+    def retried(self: TaskT) -> Optional[TaskT]:
+        """Copy of the task for the run after a failed one, or None once it has used up its attempts.
+
+        >>> class FlakyTask(BaseTask):
+        ...     retry_policy = RetryPolicy(max_attempts=2, initial_delay=10.0)
+        ...     def run(self):
+        ...         raise RuntimeError("flaky")
+        >>> retry = FlakyTask().retried()
+        >>> retry.attempts, retry.not_before - retry.updated_at
+        (1, 10000000)
+        >>> retry.retried() is None
+        True
+        """
+        attempts = self.attempts + 1
+        policy = self.retry_policy
+        if policy.max_attempts is not None and attempts >= policy.max_attempts:
+            return None
+        now = Timestamp.now()
+        values = dict(self.__dict__)
+        values.update(updated_at=now, attempts=attempts, not_before=Timestamp(now + int(policy.delay(attempts) * 1e6)))
+        return type(self).construct_trusted(**values)
+
+    def adopt(self, children: Sequence["BaseTask"]) -> list["BaseTask"]:
+        """``children`` spawned by the task, given its owner when they have none.
+
+        >>> class NoopTask(BaseTask):
+        ...     def run(self):
+        ...         return []
+        >>> parent = NoopTask(owner=UserId("alice"))
+        >>> [c.owner for c in parent.adopt([NoopTask(), NoopTask(owner=UserId("bob"))])]
+        ['alice', 'bob']
+        """
+        if self.owner is None:
+            return list(children)
+        return [c if c.owner is not None else c.copy(update={"owner": self.owner}) for c in children]
+
+    @abstractmethod
+    def run(self) -> Union[Iterable["BaseTask"], AsyncIterable["BaseTask"]]:
+        """Execute the task and yield the child tasks it spawns."""
+        ...
+
+
+class AsyncBaseTask(BaseTask):
+    """Task whose ``run`` is an async generator, for I/O-bound work on an event loop.
+
+    ``AsyncWorker`` drives ``run`` on its event loop; the other workers run it to completion
+    on a private loop.
+    """
+
+    @abstractmethod
+    def run(self) -> AsyncIterable[BaseTask]:
+        ...
 
 
 class Assignment(BaseEntity[AssignmentId]):
+    """Claim of a task by a worker.
+
+    ``expires_at`` is the end of the lease; interfaces hand the task to another worker once
+    it has passed without a ``heartbeat``. None means the assignment never expires.
+    """
+
     worker_id: WorkerId
     task_id: TaskId
+    expires_at: Optional[Timestamp] = None
 
-
-class BaseCapability(BaseEntity[CapabilityId]):
-    ...
+    @property
+    def lease_duration(self) -> Optional[int]:
+        """Length of the current lease in microseconds, counted from the last renewal."""
+        return None if self.expires_at is None else self.expires_at - self.updated_at
 
 
 class Blob(BaseEntity[BlobId]):
@@ -0,0 +1,150 @@
+import asyncio
+from collections.abc import AsyncIterable, Sequence
+from typing import Optional, Union
+
+from ...fields import ComponentName
+from ...interfaces.base import AsyncBaseInterface
+from ...interfaces.exceptions import (
+    AssignmentNotFoundError,
+    NoCapableTaskError,
+    TaskAlreadyAssignedError,
+)
+from ...loggers.base import BaseLogger
+from ...types import Assignment, BaseCapability, BaseTask
+from ..base import AsyncBaseWorker
+
+
+class _Lease:
+    __slots__ = ("assignment", "task_id")
+
+    def __init__(self, assignment: Assignment):
+        self.assignment: Optional[Assignment] = assignment
+        self.task_id = assignment.task_id
+
+
+class AsyncWorker(AsyncBaseWorker):
+    """Worker running up to ``concurrency`` tasks concurrently on a single event loop.
+
+    ``AsyncBaseTask`` instances are driven on the loop; tasks with a synchronous ``run`` are
+    executed on the default executor so that they do not block the other tasks.
+
+    While a task runs, its lease is renewed by a companion coroutine once half of it has
+    elapsed. The result of a task whose lease was lost is dropped, since the task may
+    already run on another worker.
+    """
+
+    def __init__(
+        self,
+        capabilities: Sequence[BaseCapability],
+        interface: AsyncBaseInterface,
+        logger: BaseLogger,
+        name: Optional[ComponentName] = None,
+        pickup_timeout: float = 1.0,
+        concurrency: int = 100,
+    ):
+        super(AsyncWorker, self).__init__(interface=interface, logger=logger, name=name)
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be positive: {concurrency}")
+        self._capabilities = capabilities
+        self._pickup_timeout = pickup_timeout
+        self._concurrency = concurrency
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    async def _claim_tasks(self, n: int) -> list[tuple[BaseTask, Assignment]]:
+        candidates = await self.interface.pickup_tasks(self.capabilities, n)
+        if not candidates:
+            try:
+                candidates = [await self.interface.wait_for_task(self.capabilities, timeout=self._pickup_timeout)]
+            except NoCapableTaskError:
+                return []
+        claimed = []
+        for t in candidates:
+            try:
+                claimed.append((t, await self.interface.create_assignment(self.id, t)))
+            except TaskAlreadyAssignedError:
+                continue
+        return claimed
+
+    async def _keep_lease(self, lease: _Lease) -> None:
+        while lease.assignment is not None:
+            duration = lease.assignment.lease_duration
+            if duration is None:
+                return
+            await asyncio.sleep(duration / 2_000_000)
+            try:
+                lease.assignment = await self.interface.heartbeat(lease.assignment)
+            except AssignmentNotFoundError:
+                lease.assignment = None
+                self.log_warning(f"lease of task {lease.task_id} was lost")
+            except Exception as e:
+                self.log_warning(f"cannot renew the lease of task {lease.task_id}: {e}")
+
+    async def execute(self, t: BaseTask, assignment: Assignment) -> None:
+        lease = _Lease(assignment)
+        keeper = asyncio.create_task(self._keep_lease(lease))
+        try:
+            self.logger.info(f"start {t.id}")
+            children = t.run()
+            if isinstance(children, AsyncIterable):
+                result = [c async for c in children]
+            else:
+                result = await asyncio.to_thread(list, children)
+        except Exception as e:
+            keeper.cancel()
+            await self._finish(t, lease, e)
+        else:
+            keeper.cancel()
+            await self._finish(t, lease, result)
+
+    async def _finish(self, t: BaseTask, lease: _Lease, result: Union[list[BaseTask], Exception]) -> None:
+        """Complete the assignment with the tasks spawned by ``t``, or report the error ``t`` failed with."""
+        failed = isinstance(result, Exception)
+        if failed:
+            self.logger.error(f"error in {self.name}({t.id}): {result}")
+        if lease.assignment is None:
+            if not failed:
+                self.log_warning(f"lease of task {t.id} was lost, dropping its result")
+            return
+        try:
+            if isinstance(result, Exception):
+                await self.interface.fail_assignment(lease.assignment, str(result))
+                return
+            await self.interface.add_tasks(t.adopt(result))
+            await self.interface.complete_assignment(lease.assignment)
+        except AssignmentNotFoundError:
+            self.log_warning(f"lease of task {t.id} was lost before it was finished")
+        except Exception as e:
+            if failed:
+                raise
+            await self._finish(t, lease, e)
+
+    async def run(self) -> None:
+        free_slots = asyncio.Semaphore(self._concurrency)
+        running: set["asyncio.Task[None]"] = set()
+
+        def done(task: "asyncio.Task[None]") -> None:
+            running.discard(task)
+            free_slots.release()
+
+        while not self.stopped:
+            await free_slots.acquire()
+            n = 1
+            while not free_slots.locked():
+                await free_slots.acquire()
+                n += 1
+            claimed = [] if self.stopped else await self._claim_tasks(n)
+            for t, assignment in claimed:
+                task = asyncio.create_task(self.execute(t, assignment))
+                running.add(task)
+                task.add_done_callback(done)
+            for _ in range(n - len(claimed)):
+                free_slots.release()
+        if running:
+            await asyncio.gather(*running)
+
+    @property
+    def capabilities(self) -> Sequence[BaseCapability]:
+        return self._capabilities
@@ -1,19 +1,135 @@
+import asyncio
+import heapq
+import time
 from abc import abstractmethod
-from collections.abc import Sequence
-from typing import Optional
+from collections.abc import AsyncIterable, Sequence
+from threading import Condition, Event, Thread
+from typing import Optional, Union
 
 from ..base import EntryPointMixin
 from ..components import BaseShikijinComponent
-from ..fields import ComponentName
-from ..interfaces.base import BaseInterface
+from ..fields import AssignmentId, ComponentName
+from ..interfaces.base import AsyncBaseInterface, BaseInterface
+from ..interfaces.exceptions import (
+    AssignmentNotFoundError,
+    NoCapableTaskError,
+    TaskAlreadyAssignedError,
+)
 from ..loggers.base import BaseLogger
-from ..types import BaseCapability
+from ..types import Assignment, BaseCapability, BaseTask
+
+
+async def _collect(children: AsyncIterable[BaseTask]) -> list[BaseTask]:
+    return [c async for c in children]
+
+
+def run_task(t: BaseTask) -> list[BaseTask]:
+    """Run ``t`` and return the child tasks it spawned, driving async tasks on a private event loop."""
+    children = t.run()
+    if isinstance(children, AsyncIterable):
+        return asyncio.run(_collect(children))
+    return list(children)
+
+
+class _LeaseKeeper:
+    """Renew the leases of the assignments held by a worker from a background thread.
+
+    A lease is renewed once half of it has elapsed. Renewal times are kept in a heap, so the
+    thread sleeps until the next one is due; it exits when no lease is held and is started
+    again by the next ``hold``. A lease the interface no longer knows is marked lost.
+    """
+
+    def __init__(self, worker: "BaseWorker"):
+        self._worker = worker
+        self._held: dict[AssignmentId, Assignment] = {}
+        self._lost: set[AssignmentId] = set()
+        # (monotonic time of the next renewal, assignment id); entries of released leases are skipped
+        self._schedule: list[tuple[float, AssignmentId]] = []
+        self._condition = Condition()
+        self._thread: Optional[Thread] = None
+
+    def _plan(self, assignment: Assignment, fraction: float) -> None:
+        duration = assignment.lease_duration
+        assert duration is not None
+        entry: tuple[float, AssignmentId] = (time.monotonic() + duration * fraction / 1_000_000, assignment.id)
+        heapq.heappush(self._schedule, entry)
+
+    def hold(self, assignment: Assignment) -> None:
+        if assignment.lease_duration is None:
+            return
+        with self._condition:
+            self._held[assignment.id] = assignment
+            self._plan(assignment, 0.5)
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name=f"{self._worker.name}-leases", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def release(self, assignment: Assignment) -> Optional[Assignment]:
+        """Stop renewing the lease of ``assignment`` and return its latest version, or None if it was lost."""
+        with self._condition:
+            if assignment.id in self._lost:
+                self._lost.discard(assignment.id)
+                return None
+            latest: Assignment = self._held.pop(assignment.id, assignment)
+            return latest
+
+    def _next_due(self) -> Optional[Assignment]:
+        with self._condition:
+            while True:
+                if not self._held:
+                    self._schedule.clear()
+                    self._thread = None
+                    return None
+                due, assignment_id = self._schedule[0]
+                if assignment_id not in self._held:
+                    heapq.heappop(self._schedule)
+                    continue
+                delay = due - time.monotonic()
+                if delay <= 0:
+                    heapq.heappop(self._schedule)
+                    return self._held[assignment_id]
+                self._condition.wait(delay)
+
+    def _run(self) -> None:
+        while True:
+            assignment = self._next_due()
+            if assignment is None:
+                return
+            try:
+                renewed = self._worker.interface.heartbeat(assignment)
+            except AssignmentNotFoundError:
+                with self._condition:
+                    if self._held.pop(assignment.id, None) is not None:
+                        self._lost.add(assignment.id)
+                self._worker.log_warning(f"lease of task {assignment.task_id} was lost")
+                continue
+            except Exception as e:
+                # try again before the lease expires
+                self._worker.log_warning(f"cannot renew the lease of task {assignment.task_id}: {e}")
+                renewed = assignment
+                fraction = 0.1
+            else:
+                fraction = 0.5
+            with self._condition:
+                if assignment.id in self._held:
+                    self._held[assignment.id] = renewed
+                    self._plan(renewed, fraction)
 
 
 class BaseWorker(BaseShikijinComponent, EntryPointMixin):
+    """Base of workers claiming tasks from a ``BaseInterface``.
+
+    The leases of claimed assignments are renewed in the background until the task is
+    completed or abandoned. If a lease is lost anyway, the task may already run on another
+    worker, so its result is dropped instead of being completed twice.
+    """
+
     def __init__(self, interface: BaseInterface, logger: BaseLogger, name: Optional[ComponentName] = None):
         super(BaseWorker, self).__init__(logger=logger, name=name)
         self._interface = interface
+        self._stop_event = Event()
+        self._leases = _LeaseKeeper(self)
 
     @property
     def interface(self) -> BaseInterface:
@@ -23,3 +139,98 @@ class BaseWorker(BaseShikijinComponent, EntryPointMixin):
     @abstractmethod
     def capabilities(self) -> Sequence[BaseCapability]:
         ...
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def stop(self) -> None:
+        """Ask ``main`` to return once the tasks already claimed have finished."""
+        self._stop_event.set()
+
+    def claim(self, t: BaseTask) -> Assignment:
+        """Assign ``t`` to this worker and keep its lease until it is completed or abandoned."""
+        assignment = self.interface.create_assignment(self.id, t)
+        self._leases.hold(assignment)
+        return assignment
+
+    def claim_task(self, timeout: float) -> Optional[tuple[BaseTask, Assignment]]:
+        try:
+            t = self.interface.wait_for_task(self.capabilities, timeout=timeout)
+            return t, self.claim(t)
+        except (NoCapableTaskError, TaskAlreadyAssignedError):
+            return None
+
+    def complete_task(self, t: BaseTask, assignment: Assignment, children: Sequence[BaseTask]) -> None:
+        current = self._leases.release(assignment)
+        if current is None:
+            self.log_warning(f"lease of task {t.id} was lost, dropping its result")
+            return
+        try:
+            self.interface.add_tasks(t.adopt(children))
+            self.interface.complete_assignment(current)
+        except AssignmentNotFoundError:
+            self.log_warning(f"lease of task {t.id} was lost before it was completed")
+        except Exception as e:
+            self.fail_task(t, current, e)
+
+    def fail_task(self, t: BaseTask, assignment: Assignment, error: Union[Exception, str]) -> None:
+        """Report that ``t`` failed, so that the interface retries it after a backoff or dead-letters it."""
+        self.logger.error(f"error in {self.name}({t.id}): {error}")
+        current = self._leases.release(assignment)
+        if current is None:
+            return
+        try:
+            self.interface.fail_assignment(current, str(error))
+        except AssignmentNotFoundError:
+            self.log_warning(f"lease of task {t.id} was lost before it failed")
+
+    def abandon_task(self, t: BaseTask, assignment: Assignment) -> None:
+        """Give ``t`` back to the interface without counting an attempt, e.g. on shutdown."""
+        current = self._leases.release(assignment)
+        if current is None:
+            return
+        try:
+            self.interface.abandon_assignment(current)
+        except AssignmentNotFoundError:
+            self.log_warning(f"lease of task {t.id} was lost before it was abandoned")
+
+    def execute(self, t: BaseTask, assignment: Assignment) -> None:
+        try:
+            self.logger.info(f"start {t.id}")
+            children = run_task(t)
+        except Exception as e:
+            self.fail_task(t, assignment, e)
+        else:
+            self.complete_task(t, assignment, children)
+
+
+class AsyncBaseWorker(BaseShikijinComponent, EntryPointMixin):
+    def __init__(self, interface: AsyncBaseInterface, logger: BaseLogger, name: Optional[ComponentName] = None):
+        super(AsyncBaseWorker, self).__init__(logger=logger, name=name)
+        self._interface = interface
+        self._stop_event = Event()
+
+    @property
+    def interface(self) -> AsyncBaseInterface:
+        return self._interface
+
+    @property
+    @abstractmethod
+    def capabilities(self) -> Sequence[BaseCapability]:
+        ...
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def stop(self) -> None:
+        """Ask ``main`` to return once the tasks already claimed have finished. Safe to call from any thread."""
+        self._stop_event.set()
+
+    @abstractmethod
+    async def run(self) -> None:
+        ...
+
+    def main(self) -> None:
+        asyncio.run(self.run())
@@ -3,8 +3,9 @@ from typing import Optional
 
 from ...fields import ComponentName
 from ...interfaces.base import BaseInterface
+from ...interfaces.exceptions import TaskAlreadyAssignedError
 from ...loggers.base import BaseLogger
-from ...types import BaseCapability
+from ...types import Assignment, BaseCapability, BaseTask
 from ..base import BaseWorker
 
 
@@ -15,22 +16,30 @@ class BasicWorker(BaseWorker):
         interface: BaseInterface,
         logger: BaseLogger,
         name: Optional[ComponentName] = None,
+        pickup_timeout: float = 1.0,
+        prefetch: int = 8,
     ):
         super(BasicWorker, self).__init__(interface=interface, logger=logger, name=name)
         self._capabilities = capabilities
+        self._pickup_timeout = pickup_timeout
+        self._prefetch = prefetch
 
-    def main(self) -> None:
-        while True:
-            t = self.interface.pickup_task(self.capabilities)
+    def _claim_tasks(self) -> list[tuple[BaseTask, Assignment]]:
+        claimed = []
+        for t in self.interface.pickup_tasks(self.capabilities, self._prefetch):
             try:
-                assignment = self.interface.get_assignment(self.id, t)
-                self.logger.info(f"start {t.id}")
-                for next_task in t.run():
-                    self.interface.add_task(next_task)
-                self.interface.complete_assignment(assignment)
-            except Exception as e:
-                self.interface.abandon_assignment(assignment)
-                self.logger.error(f"error in {self.name}({t.id}): {e}")
+                claimed.append((t, self.claim(t)))
+            except TaskAlreadyAssignedError:
+                continue
+        if claimed:
+            return claimed
+        c = self.claim_task(timeout=self._pickup_timeout)
+        return [c] if c is not None else []
+
+    def main(self) -> None:
+        while not self.stopped:
+            for t, assignment in self._claim_tasks():
+                self.execute(t, assignment)
 
     @property
     def capabilities(self) -> Sequence[BaseCapability]:
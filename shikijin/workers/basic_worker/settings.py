@@ -5,4 +5,5 @@ from ..settings import BaseWorkerSettings
 
 
 class BasicWorkerSettings(BaseWorkerSettings):
-    capabilities: Sequence[BaseCapability]
+    capabilities: Sequence[BaseCapability] = []
+    prefetch: int = 8
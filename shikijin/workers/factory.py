@@ -1,22 +1,81 @@
+from typing import Union
+
 from ..components import BaseShikijinComponentFactory
+from ..interfaces.async_adapter.core import AsyncInterfaceAdapter
+from ..interfaces.base import BaseInterface
+from ..interfaces.caching_interface.core import CachingInterface
 from ..interfaces.factory import InterfaceFactory
-from ..settings import GlobalSettings, WorkerType
-from .base import BaseWorker
+from ..settings import GlobalSettings, InterfaceType, WorkerType
+from .async_worker.core import AsyncWorker
+from .async_worker.settings import AsyncWorkerSettings
+from .base import AsyncBaseWorker, BaseWorker
 from .basic_worker.core import BasicWorker
 from .basic_worker.settings import BasicWorkerSettings
+from .process_pool_worker.core import ProcessPoolWorker
+from .process_pool_worker.settings import ProcessPoolWorkerSettings
+from .settings import BaseWorkerSettings
+from .thread_pool_worker.core import ThreadPoolWorker
+from .thread_pool_worker.settings import ThreadPoolWorkerSettings
+
 
+class WorkerFactory(BaseShikijinComponentFactory[Union[BaseWorker, AsyncBaseWorker]]):
+    def _interface(self, settings: GlobalSettings, worker_settings: BaseWorkerSettings) -> BaseInterface:
+        interface = InterfaceFactory(logger=self.logger).create(settings=settings)
+        if worker_settings.blob_cache_size > 0:
+            return CachingInterface(interface, max_bytes=worker_settings.blob_cache_size)
+        return interface
 
-class WorkerFactory(BaseShikijinComponentFactory[BaseWorker]):
-    def create(self, settings: GlobalSettings) -> BaseWorker:
+    def create(self, settings: GlobalSettings) -> Union[BaseWorker, AsyncBaseWorker]:
         t = settings.worker_type
         if t == WorkerType.BASIC:
             s = BasicWorkerSettings.from_global_settings(settings=settings)
             self.log_info("creating worker")
             self.log_info(f"worker settings: {settings.worker_settings}")
             return BasicWorker(
-                interface=InterfaceFactory(logger=self.logger).create(settings=settings),
+                interface=self._interface(settings, s),
                 capabilities=s.capabilities,
                 logger=self.logger,
                 name=s.name,
+                pickup_timeout=s.pickup_timeout,
+                prefetch=s.prefetch,
+            )
+        if t == WorkerType.THREAD_POOL:
+            tp = ThreadPoolWorkerSettings.from_global_settings(settings=settings)
+            self.log_info("creating worker")
+            self.log_info(f"worker settings: {settings.worker_settings}")
+            return ThreadPoolWorker(
+                interface=self._interface(settings, tp),
+                capabilities=tp.capabilities,
+                logger=self.logger,
+                name=tp.name,
+                pickup_timeout=tp.pickup_timeout,
+                concurrency=tp.concurrency,
+            )
+        if t == WorkerType.PROCESS_POOL:
+            pp = ProcessPoolWorkerSettings.from_global_settings(settings=settings)
+            self.log_info("creating worker")
+            self.log_info(f"worker settings: {settings.worker_settings}")
+            return ProcessPoolWorker(
+                interface=self._interface(settings, pp),
+                capabilities=pp.capabilities,
+                logger=self.logger,
+                name=pp.name,
+                pickup_timeout=pp.pickup_timeout,
+                concurrency=pp.concurrency,
+                start_method=pp.start_method,
+            )
+        if t == WorkerType.ASYNC:
+            a = AsyncWorkerSettings.from_global_settings(settings=settings)
+            self.log_info("creating worker")
+            self.log_info(f"worker settings: {settings.worker_settings}")
+            interface = self._interface(settings, a)
+            return AsyncWorker(
+                # in-memory calls never block, so they are cheaper to make on the event loop itself
+                interface=AsyncInterfaceAdapter(interface, offload=settings.interface_type != InterfaceType.IN_MEMORY),
+                capabilities=a.capabilities,
+                logger=self.logger,
+                name=a.name,
+                pickup_timeout=a.pickup_timeout,
+                concurrency=a.concurrency,
             )
         raise NotImplementedError()
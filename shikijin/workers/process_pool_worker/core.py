@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+from collections.abc import Sequence
+from multiprocessing.connection import Connection, wait
+from multiprocessing.process import BaseProcess
+from typing import Any, Optional
+
+from ...fields import ComponentName
+from ...interfaces.base import BaseInterface
+from ...loggers.base import BaseLogger
+from ...types import Assignment, BaseCapability, BaseTask
+from ..base import BaseWorker, run_task
+
+
+def _run_tasks(connection: Connection) -> None:
+    """Entry point of a child process: run the tasks sent by the supervisor one at a time."""
+    while True:
+        try:
+            t = connection.recv()
+        except EOFError:
+            return
+        if t is None:
+            return
+        try:
+            children = run_task(t)
+        except Exception as e:
+            connection.send((False, f"{type(e).__name__}: {e}"))
+        else:
+            connection.send((True, children))
+
+
+class _Child:
+    def __init__(self, process: BaseProcess, connection: Connection):
+        self.process = process
+        self.connection = connection
+        self.current: Optional[tuple[BaseTask, Assignment]] = None
+
+
+class ProcessPoolWorker(BaseWorker):
+    """Worker running tasks in a pool of child processes to use more than one core.
+
+    The supervisor (the process calling ``main``) is the only one talking to the interface.
+    It claims a task whenever a child is idle, sends it over a pipe, and receives the
+    spawned child tasks back. If a child process dies while running a task, the task is
+    reported as failed and the child is replaced.
+    """
+
+    poll_interval = 0.05
+
+    def __init__(
+        self,
+        capabilities: Sequence[BaseCapability],
+        interface: BaseInterface,
+        logger: BaseLogger,
+        name: Optional[ComponentName] = None,
+        pickup_timeout: float = 1.0,
+        concurrency: Optional[int] = None,
+        start_method: Optional[str] = None,
+    ):
+        super(ProcessPoolWorker, self).__init__(interface=interface, logger=logger, name=name)
+        concurrency = concurrency if concurrency is not None else (os.cpu_count() or 1)
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be positive: {concurrency}")
+        self._capabilities = capabilities
+        self._pickup_timeout = pickup_timeout
+        self._concurrency = concurrency
+        self._context = multiprocessing.get_context(start_method)
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    def _spawn(self) -> _Child:
+        parent_connection, child_connection = self._context.Pipe()
+        process: BaseProcess = self._context.Process(  # type: ignore[attr-defined]
+            target=_run_tasks, args=(child_connection,), daemon=True
+        )
+        process.start()
+        child_connection.close()
+        return _Child(process=process, connection=parent_connection)
+
+    def _dispatch(self, child: _Child, timeout: float) -> bool:
+        claimed = self.claim_task(timeout=timeout)
+        if claimed is None:
+            return False
+        t, _ = claimed
+        self.logger.info(f"start {t.id}")
+        child.current = claimed
+        child.connection.send(t)
+        return True
+
+    def _collect(self, child: _Child) -> None:
+        assert child.current is not None
+        t, assignment = child.current
+        ok, result = child.connection.recv()
+        child.current = None
+        if ok:
+            self.complete_task(t, assignment, result)
+        else:
+            self.fail_task(t, assignment, result)
+
+    def _replace(self, children: list[_Child], child: _Child) -> None:
+        if child.current is not None:
+            t, assignment = child.current
+            self.fail_task(t, assignment, f"process exited with code {child.process.exitcode}")
+        child.connection.close()
+        child.process.join()
+        children[children.index(child)] = self._spawn()
+
+    def _shutdown(self, children: list[_Child]) -> None:
+        for child in children:
+            if child.current is not None:
+                self.abandon_task(*child.current)
+            try:
+                child.connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for child in children:
+            child.process.join(timeout=self._pickup_timeout)
+            if child.process.is_alive():
+                child.process.terminate()
+                child.process.join()
+            child.connection.close()
+
+    def main(self) -> None:
+        children = [self._spawn() for _ in range(self._concurrency)]
+        try:
+            while True:
+                busy = [c for c in children if c.current is not None]
+                if self.stopped and not busy:
+                    break
+                idle = [c for c in children if c.current is None]
+                if idle and not self.stopped:
+                    for child in idle:
+                        if not self._dispatch(child, timeout=0.0 if busy else self._pickup_timeout):
+                            break
+                    busy = [c for c in children if c.current is not None]
+                if not busy:
+                    continue
+                waitables: list[Any] = [c.connection for c in busy] + [c.process.sentinel for c in busy]
+                all_busy = len(busy) == len(children)
+                ready = wait(waitables, timeout=self._pickup_timeout if all_busy else self.poll_interval)
+                for child in busy:
+                    if child.connection in ready:
+                        try:
+                            self._collect(child)
+                            continue
+                        except (EOFError, OSError):
+                            pass
+                    elif child.process.sentinel not in ready:
+                        continue
+                    self._replace(children, child)
+        finally:
+            self._shutdown(children)
+
+    @property
+    def capabilities(self) -> Sequence[BaseCapability]:
+        return self._capabilities
@@ -0,0 +1,11 @@
+from collections.abc import Sequence
+from typing import Optional
+
+from ...types import BaseCapability
+from ..settings import BaseWorkerSettings
+
+
+class ProcessPoolWorkerSettings(BaseWorkerSettings):
+    capabilities: Sequence[BaseCapability] = []
+    concurrency: Optional[int] = None
+    start_method: Optional[str] = None
@@ -1,14 +1,21 @@
 from typing import Type, Union
 
+from pydantic import Extra
+
 from ..fields import ComponentName
 from ..settings import BaseComponentSettings, GlobalSettings, S
 
 
 class BaseWorkerSettings(BaseComponentSettings):
     name: Union[ComponentName, None] = None
+    pickup_timeout: float = 1.0
+    # bytes of blobs the worker keeps in memory, see ``CachingInterface``; 0 disables the cache
+    blob_cache_size: int = 0
+
+    class Config:
+        # ``worker_settings`` is shared by every type, so keys meant for another type are ignored
+        extra = Extra.ignore
 
     @classmethod
     def from_global_settings(cls: Type[S], settings: GlobalSettings) -> S:
-        if "name" in settings.worker_settings:
-            return cls(name=ComponentName(settings.worker_settings["name"]))
-        return cls()
+        return cls(**settings.worker_settings)
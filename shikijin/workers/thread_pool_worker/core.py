@@ -0,0 +1,59 @@
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Semaphore
+from typing import Any, Optional
+
+from ...fields import ComponentName
+from ...interfaces.base import BaseInterface
+from ...loggers.base import BaseLogger
+from ...types import BaseCapability
+from ..base import BaseWorker
+
+
+class ThreadPoolWorker(BaseWorker):
+    """Worker running up to ``concurrency`` tasks at once on a pool of threads.
+
+    The thread calling ``main`` claims tasks from the interface only while a pool thread is
+    free, so the worker never holds more assignments than it can run. After ``stop`` the
+    loop stops claiming and ``main`` returns once the running tasks have finished.
+    """
+
+    def __init__(
+        self,
+        capabilities: Sequence[BaseCapability],
+        interface: BaseInterface,
+        logger: BaseLogger,
+        name: Optional[ComponentName] = None,
+        pickup_timeout: float = 1.0,
+        concurrency: int = 8,
+    ):
+        super(ThreadPoolWorker, self).__init__(interface=interface, logger=logger, name=name)
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be positive: {concurrency}")
+        self._capabilities = capabilities
+        self._pickup_timeout = pickup_timeout
+        self._concurrency = concurrency
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    def main(self) -> None:
+        free_slots = Semaphore(self._concurrency)
+
+        def release(_: "Future[Any]") -> None:
+            free_slots.release()
+
+        with ThreadPoolExecutor(max_workers=self._concurrency, thread_name_prefix=self.name) as executor:
+            while not self.stopped:
+                if not free_slots.acquire(timeout=self._pickup_timeout):
+                    continue
+                claimed = self.claim_task(timeout=self._pickup_timeout)
+                if claimed is None:
+                    free_slots.release()
+                    continue
+                executor.submit(self.execute, *claimed).add_done_callback(release)
+
+    @property
+    def capabilities(self) -> Sequence[BaseCapability]:
+        return self._capabilities
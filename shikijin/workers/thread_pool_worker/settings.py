@@ -0,0 +1,9 @@
+from collections.abc import Sequence
+
+from ...types import BaseCapability
+from ..settings import BaseWorkerSettings
+
+
+class ThreadPoolWorkerSettings(BaseWorkerSettings):
+    capabilities: Sequence[BaseCapability] = []
+    concurrency: int = 8
@@ -0,0 +1,111 @@
+from collections.abc import Iterable, Sequence
+
+import pytest
+
+from shikijin.fields import BlobId, Bytes, WorkerId
+from shikijin.interfaces.caching_interface.core import CachingInterface
+from shikijin.interfaces.exceptions import BlobNotFoundError
+from shikijin.interfaces.in_memory_interface.core import InMemoryInterface
+from shikijin.loggers.basic_logger.core import BasicLogger
+from shikijin.settings import GlobalSettings, StorageType, WorkerType
+from shikijin.types import BaseTask, Blob
+from shikijin.workers.factory import WorkerFactory
+
+
+class CountingInterface(InMemoryInterface):
+    def __init__(self) -> None:
+        super(CountingInterface, self).__init__(logger=BasicLogger("test"), name=None)
+        self.reads: list[BlobId] = []
+
+    def get_blob(self, blob_id: BlobId) -> Blob:
+        self.reads.append(blob_id)
+        return super(CountingInterface, self).get_blob(blob_id)
+
+    def get_blobs(self, blob_ids: Sequence[BlobId]) -> list[Blob]:
+        self.reads.extend(blob_ids)
+        return super(CountingInterface, self).get_blobs(blob_ids)
+
+
+def make_blob(size: int) -> Blob:
+    return Blob(blob=Bytes(b"x" * size))
+
+
+def test_saved_and_read_blobs_are_cached() -> None:
+    backend = CountingInterface()
+    stored = make_blob(10)
+    backend.save_blob(stored)
+    interface = CachingInterface(backend, max_bytes=100)
+    saved = make_blob(10)
+    interface.save_blob(saved)
+    assert backend.get_blob(saved.id) == saved
+
+    assert interface.get_blob(saved.id) == saved
+    assert interface.get_blobs([stored.id, saved.id]) == [stored, saved]
+    assert interface.get_blob(stored.id) == stored
+    assert interface.read_blob_range(stored.id, 2, 3) == b"xxx"
+    assert backend.reads == [saved.id, stored.id]
+    stats = interface.stats()
+    assert (stats.hits, stats.misses, stats.size) == (3, 1, 20)
+    assert stats.hit_ratio == 0.75
+
+
+def test_cache_is_bounded_and_scan_resistant() -> None:
+    backend = CountingInterface()
+    interface = CachingInterface(backend, max_bytes=100)
+    hot = make_blob(40)
+    interface.save_blob(hot)
+    interface.get_blob(hot.id)
+    # a scan through blobs read once evicts them rather than the blob read twice
+    for _ in range(10):
+        interface.save_blob(make_blob(30))
+    assert interface.stats().size <= 100
+    assert interface.stats().evictions == 8
+    interface.get_blob(hot.id)
+    assert backend.reads == []
+    # blobs larger than the cache are passed through
+    large = make_blob(200)
+    interface.save_blob(large)
+    assert interface.get_blob(large.id) == large
+    assert backend.reads == [large.id]
+
+
+def test_tasks_are_passed_through() -> None:
+    backend = CountingInterface()
+    interface = CachingInterface(backend, max_bytes=100)
+    task = ReadTask(source=BlobId.generate())
+    interface.add_task(task)
+    assert backend.pickup_task([]) == task
+    assert interface.pickup_tasks([], 10) == [task]
+
+
+class ReadTask(BaseTask):
+    source: BlobId
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def test_blobs_of_completed_tasks_are_evicted() -> None:
+    backend = InMemoryInterface(logger=BasicLogger("test"), name=None, collect_blobs=True)
+    interface = CachingInterface(backend, max_bytes=100)
+    kept, collected = make_blob(10), make_blob(10)
+    interface.save_blob(kept)
+    interface.save_blob(collected)
+    interface.add_task(ReadTask(source=collected.id))
+    task = interface.pickup_task([])
+    assignment = interface.create_assignment(WorkerId.generate(), task)
+    assert interface.get_blob(collected.id) == collected
+    interface.complete_assignment(assignment)
+    with pytest.raises(BlobNotFoundError):
+        interface.get_blob(collected.id)
+    assert interface.get_blob(kept.id) == kept
+    assert interface.stats().size == 10
+
+
+def test_worker_factory_enables_the_blob_cache() -> None:
+    settings = GlobalSettings(
+        worker_type=WorkerType.BASIC, worker_settings={"blob_cache_size": 1 << 20}, storage_type=StorageType.IN_MEMORY
+    )
+    worker = WorkerFactory(logger=BasicLogger("test")).create(settings)
+    assert isinstance(worker.interface, CachingInterface)
+    assert isinstance(worker.interface.interface, InMemoryInterface)
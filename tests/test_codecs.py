@@ -0,0 +1,113 @@
+import os
+import sys
+from collections.abc import Iterable
+from typing import Any, Optional
+
+import pytest
+from pydantic import ValidationError
+
+from shikijin import codecs
+from shikijin.fields import (
+    AssignmentId,
+    BlobId,
+    Bytes,
+    TaskId,
+    TaskName,
+    Timestamp,
+    UserId,
+    WorkerId,
+)
+from shikijin.types import Assignment, BaseEntity, BaseTask, Blob
+
+
+class PayloadTask(BaseTask):
+    name: TaskName
+    owner: Optional[UserId] = None
+    inputs: tuple[BlobId, ...] = ()
+    weights: list[float] = []
+    retries: int = 0
+    enabled: bool = True
+    options: dict[str, int] = {}
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def test_assignment_round_trip() -> None:
+    a = Assignment(worker_id=WorkerId.generate(), task_id=TaskId.generate())
+    encoded = a.to_bytes()
+    # three ids, two timestamps and the flag of the unset expiry time
+    assert len(encoded) == 16 * 3 + 8 * 2 + 1
+    decoded = Assignment.from_bytes(encoded)
+    assert decoded == a
+    assert type(decoded.id) is AssignmentId
+    assert type(decoded.created_at) is Timestamp
+
+
+def test_blob_is_stored_as_raw_bytes() -> None:
+    payload = os.urandom(1000)
+    blob = Blob(blob=Bytes(payload))
+    encoded = blob.to_bytes()
+    assert payload in encoded
+    assert len(encoded) < len(blob.dict()["blob"])
+    assert Blob.from_bytes(encoded) == blob
+
+
+def test_task_fields_round_trip() -> None:
+    task = PayloadTask(
+        name=TaskName("t"),
+        owner=UserId("alice"),
+        inputs=(BlobId.generate(), BlobId.generate()),
+        weights=[0.5, 1.5],
+        retries=3,
+        enabled=False,
+        options={"a": 1},
+    )
+    assert PayloadTask.from_bytes(task.to_bytes()) == task
+    assert PayloadTask.from_bytes(PayloadTask(name=TaskName("u")).to_bytes()).owner is None
+
+
+def test_many_and_tagged() -> None:
+    tasks = [PayloadTask(name=TaskName(f"t{i}")) for i in range(10)]
+    assert PayloadTask.many_from_bytes(PayloadTask.many_to_bytes(tasks)) == tasks
+
+    mixed: list[BaseEntity[Any]] = [tasks[0], Assignment(worker_id=WorkerId.generate(), task_id=tasks[0].id)]
+    decoded = codecs.decode_many(codecs.encode_many(mixed, tagged=True))
+    assert list(decoded) == mixed
+    assert isinstance(decoded[0], PayloadTask)
+
+
+def test_invalid_input() -> None:
+    with pytest.raises(codecs.CodecError):
+        codecs.decode_tagged(codecs.encode_tagged(Blob(blob=Bytes(b""))) + b"x")
+    bad = bytearray()
+    codecs._encode_str("os:system", bad)
+    with pytest.raises(codecs.CodecError):
+        codecs.decode_tagged(bytes(bad))
+
+
+def test_truncated_input() -> None:
+    task = PayloadTask(name=TaskName("truncated"), options={"a": 1})
+    for entity in (Blob(blob=Bytes(b"payload")), task):
+        encoded = codecs.encode_tagged(entity)
+        for size in range(len(encoded)):
+            with pytest.raises(codecs.CodecError):
+                codecs.decode_tagged(encoded[:size])
+    with pytest.raises(codecs.CodecError):
+        codecs.decode_many(b"\x00\x00")
+
+
+def test_tagged_entities_never_import_modules() -> None:
+    bad = bytearray()
+    codecs._encode_str("this:Zen", bad)
+    with pytest.raises(codecs.CodecError):
+        codecs.decode_tagged(bytes(bad))
+    assert "this" not in sys.modules
+    assert codecs.resolve_class(codecs.class_path(PayloadTask)) is PayloadTask
+
+
+def test_untrusted_entities_are_validated() -> None:
+    encoded = codecs.encode_tagged(PayloadTask.construct_trusted(name=TaskName("")))
+    with pytest.raises(ValidationError):
+        codecs.decode_tagged(encoded)
+    assert codecs.decode_tagged(encoded, trusted=True).name == ""  # type: ignore[attr-defined]
@@ -0,0 +1,77 @@
+import importlib
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+from shikijin.fields import TaskId
+from shikijin.interfaces.exceptions import RemoteInterfaceError, TaskNotFoundError
+from shikijin.interfaces.remote_interface.core import RemoteInterface
+from shikijin.loggers.basic_logger.core import BasicLogger
+
+
+@contextmanager
+def interface_server(tmp_path: Path, *args: str) -> Iterator[RemoteInterface]:
+    address = f"unix:{tmp_path / 'shikijin.sock'}"
+    process = subprocess.Popen(
+        [sys.executable, "-c", "from shikijin.cli import main; main()", "interface-server", "--address", address]
+        + list(args),
+        env={**os.environ, "INTERFACE_TYPE": "in_memory", "STORAGE_TYPE": "in_memory"},
+    )
+    try:
+        interface = RemoteInterface(address=address, logger=BasicLogger("test"), timeout=5.0)
+        deadline = time.monotonic() + 10.0
+        while True:
+            try:
+                interface.get_task(TaskId.generate())
+            except TaskNotFoundError:
+                break
+            except RemoteInterfaceError:
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+        yield interface
+        interface.close()
+    finally:
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10.0) == 0
+    assert not (tmp_path / "shikijin.sock").exists()
+
+
+def test_interface_server_command(tmp_path: Path) -> None:
+    with interface_server(tmp_path):
+        pass
+
+
+def test_interface_server_imports_task_modules(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "shikijin_cli_tasks.py").write_text(textwrap.dedent("""
+            from shikijin.types import BaseCapability, BaseTask
+
+
+            class Gpu(BaseCapability):
+                ...
+
+
+            class GpuTask(BaseTask):
+                required_capabilities = (Gpu,)
+                payload: str = ""
+
+                def run(self):
+                    return []
+            """))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(filter(None, (str(tmp_path), os.environ.get("PYTHONPATH")))))
+    tasks = importlib.import_module("shikijin_cli_tasks")
+
+    with interface_server(tmp_path, "--import", "shikijin_cli_tasks") as interface:
+        task = tasks.GpuTask(payload="hello")
+        interface.add_task(task)
+        picked = interface.pickup_task([tasks.Gpu()])
+    assert picked == task
+    assert type(picked) is tasks.GpuTask
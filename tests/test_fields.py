@@ -0,0 +1,45 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from dateutil.parser import ParserError
+from dateutil.parser import parse as parse_datetime
+
+from shikijin.fields import Timestamp
+
+
+def reference(value: str) -> int:
+    dt = parse_datetime(value)
+    return (dt - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+
+
+def test_rfc3339_fast_path_matches_dateutil() -> None:
+    rng = random.Random(0)
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    values = []
+    for _ in range(2000):
+        dt = epoch + timedelta(microseconds=rng.randrange(-(10**16), 10**17))
+        offset = rng.choice(["Z", "+09:00", "-0530", "+00:00", "z"])
+        separator = rng.choice(["T", " ", "t"])
+        fraction = rng.choice(["", f".{dt.microsecond:06d}", f".{dt.microsecond // 1000:03d}"])
+        values.append(dt.strftime(f"%Y-%m-%d{separator}%H:%M:%S") + fraction + offset)
+    expected = [reference(v) for v in values]
+    assert [Timestamp(v) for v in values] == expected
+    assert Timestamp.parse_many(values) == expected
+
+
+def test_leap_days_and_invalid_dates() -> None:
+    assert Timestamp("2024-02-29T00:00:00Z") == reference("2024-02-29T00:00:00Z")
+    assert Timestamp("2000-02-29T00:00:00Z") == reference("2000-02-29T00:00:00Z")
+    with pytest.raises(ParserError):
+        Timestamp("2023-02-29T00:00:00Z")
+    with pytest.raises(ParserError):
+        Timestamp("2023-01-01T24:00:00Z")
+
+
+def test_now_is_utc() -> None:
+    before = datetime.now(tz=timezone.utc).timestamp() * 1000000
+    now = Timestamp.now()
+    after = datetime.now(tz=timezone.utc).timestamp() * 1000000
+    assert before - 1 <= now <= after + 1
+    assert type(now) is Timestamp
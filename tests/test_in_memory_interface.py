@@ -0,0 +1,368 @@
+import threading
+import time
+from collections.abc import Iterable
+
+import pytest
+
+from shikijin.fields import BlobId, Bytes, Timestamp, UserId, WorkerId
+from shikijin.interfaces.exceptions import (
+    AssignmentNotFoundError,
+    BlobNotFoundError,
+    NoCapableTaskError,
+    TaskAlreadyAssignedError,
+)
+from shikijin.interfaces.in_memory_interface.core import InMemoryInterface
+from shikijin.loggers.basic_logger.core import BasicLogger
+from shikijin.types import BaseCapability, BaseTask, Blob, RetryPolicy
+
+
+class GpuCapability(BaseCapability):
+    ...
+
+
+class CpuTask(BaseTask):
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+class GpuTask(BaseTask):
+    required_capabilities = (GpuCapability,)
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+@pytest.fixture
+def interface() -> InMemoryInterface:
+    return InMemoryInterface(logger=BasicLogger("test"), name=None)
+
+
+def test_pickup_task_respects_capabilities(interface: InMemoryInterface) -> None:
+    gpu_task = GpuTask()
+    interface.add_task(gpu_task)
+    with pytest.raises(NoCapableTaskError):
+        interface.pickup_task([])
+    assert interface.pickup_task([GpuCapability()]) == gpu_task
+
+    cpu_task = CpuTask()
+    interface.add_task(cpu_task)
+    assert interface.pickup_task([]) == cpu_task
+
+
+def test_pickup_task_skips_assigned_tasks(interface: InMemoryInterface) -> None:
+    tasks = [CpuTask() for _ in range(3)]
+    for t in tasks:
+        interface.add_task(t)
+    worker_id = WorkerId.generate()
+    first = interface.pickup_task([])
+    assert first == tasks[0]
+    assignment = interface.create_assignment(worker_id, first)
+    with pytest.raises(TaskAlreadyAssignedError):
+        interface.create_assignment(worker_id, first)
+    assert interface.pickup_task([]) == tasks[1]
+
+    interface.abandon_assignment(assignment)
+    assert interface.pickup_task([]) == tasks[0]
+
+    assignment = interface.create_assignment(worker_id, tasks[0])
+    interface.complete_assignment(assignment)
+    assert interface.pickup_task([]) == tasks[1]
+    assert interface.get_task(tasks[0].id) == tasks[0]
+
+
+def test_pickup_task_is_independent_of_backlog_of_other_signatures(interface: InMemoryInterface) -> None:
+    for _ in range(1000):
+        interface.add_task(GpuTask())
+    cpu_task = CpuTask()
+    interface.add_task(cpu_task)
+    assert interface.pickup_task([]) == cpu_task
+
+
+def test_wait_for_task_times_out(interface: InMemoryInterface) -> None:
+    started = time.monotonic()
+    with pytest.raises(NoCapableTaskError):
+        interface.wait_for_task([], timeout=0.05)
+    assert time.monotonic() - started >= 0.05
+
+
+def test_wait_for_task_wakes_up_on_add_task(interface: InMemoryInterface) -> None:
+    task = CpuTask()
+    timer = threading.Timer(0.05, interface.add_task, args=(task,))
+    timer.start()
+    try:
+        assert interface.wait_for_task([], timeout=5.0) == task
+    finally:
+        timer.join()
+
+
+def test_wait_for_task_ignores_incapable_tasks(interface: InMemoryInterface) -> None:
+    interface.add_task(GpuTask())
+    with pytest.raises(NoCapableTaskError):
+        interface.wait_for_task([], timeout=0.05)
+
+
+def test_batch_task_apis(interface: InMemoryInterface) -> None:
+    tasks = [CpuTask() for _ in range(5)] + [GpuTask()]
+    interface.add_tasks(tasks)
+    assert interface.get_tasks([t.id for t in tasks]) == tasks
+    assert interface.pickup_tasks([], 3) == tasks[:3]
+    assert interface.pickup_tasks([], 10) == tasks[:5]
+    assert interface.pickup_tasks([GpuCapability()], 10) == tasks
+
+    interface.create_assignment(WorkerId.generate(), tasks[0])
+    assert interface.pickup_tasks([], 2) == tasks[1:3]
+
+
+def test_get_blobs(interface: InMemoryInterface) -> None:
+    blobs = [Blob(blob=Bytes(bytes([i]))) for i in range(3)]
+    for b in blobs:
+        interface.save_blob(b)
+    assert interface.get_blobs([b.id for b in reversed(blobs)]) == list(reversed(blobs))
+    with pytest.raises(BlobNotFoundError):
+        interface.get_blobs([blobs[0].id, BlobId.generate()])
+
+
+def test_expired_lease_is_reclaimed() -> None:
+    interface = InMemoryInterface(logger=BasicLogger("test"), name=None, lease_duration=0.05)
+    tasks = [CpuTask() for _ in range(2)]
+    interface.add_tasks(tasks)
+    worker_id = WorkerId.generate()
+    assignment = interface.create_assignment(worker_id, tasks[0])
+    assert assignment.lease_duration == 50_000
+    assert interface.pickup_task([]) == tasks[1]
+    interface.complete_assignment(interface.create_assignment(worker_id, tasks[1]))
+
+    # a waiting worker is woken up when the lease expires
+    assert interface.wait_for_task([], timeout=5.0) == tasks[0]
+    with pytest.raises(AssignmentNotFoundError):
+        interface.heartbeat(assignment)
+    with pytest.raises(AssignmentNotFoundError):
+        interface.complete_assignment(assignment)
+
+
+def test_heartbeat_extends_lease() -> None:
+    interface = InMemoryInterface(logger=BasicLogger("test"), name=None, lease_duration=0.1)
+    task = CpuTask()
+    interface.add_task(task)
+    assignment = interface.create_assignment(WorkerId.generate(), task)
+    for _ in range(4):
+        time.sleep(0.05)
+        renewed = interface.heartbeat(assignment)
+        assert renewed.id == assignment.id
+        assert renewed.expires_at is not None and assignment.expires_at is not None
+        assert renewed.expires_at > assignment.expires_at
+        assignment = renewed
+        assert interface.pickup_tasks([], 10) == []
+    interface.complete_assignment(assignment)
+
+
+def test_leases_can_be_disabled() -> None:
+    interface = InMemoryInterface(logger=BasicLogger("test"), name=None, lease_duration=None)
+    task = CpuTask()
+    interface.add_task(task)
+    assignment = interface.create_assignment(WorkerId.generate(), task)
+    assert assignment.expires_at is None
+    assert interface.heartbeat(assignment) == assignment
+
+
+def test_delayed_task_is_released_when_due(interface: InMemoryInterface) -> None:
+    delayed = CpuTask(not_before=Timestamp(Timestamp.now() + 100_000))
+    interface.add_task(delayed)
+    assert interface.pickup_tasks([], 10) == []
+    started = time.monotonic()
+    assert interface.wait_for_task([], timeout=5.0) == delayed
+    assert time.monotonic() - started >= 0.05
+
+    # adding a delayed task again without a delay makes it ready at once
+    later = CpuTask(not_before=Timestamp(Timestamp.now() + 60_000_000))
+    interface.add_task(later)
+    now = later.copy(update={"not_before": None})
+    interface.add_task(now)
+    assert interface.pickup_tasks([], 10) == [delayed, now]
+
+
+class FlakyTask(BaseTask):
+    retry_policy = RetryPolicy(max_attempts=2, initial_delay=0.05)
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def test_failed_assignment_is_retried_then_dead_lettered(interface: InMemoryInterface) -> None:
+    task = FlakyTask()
+    interface.add_task(task)
+    worker_id = WorkerId.generate()
+    interface.fail_assignment(interface.create_assignment(worker_id, task), "boom")
+    assert interface.pickup_tasks([], 10) == []
+    retry = interface.wait_for_task([], timeout=5.0)
+    assert retry.id == task.id and retry.attempts == 1
+
+    assignment = interface.create_assignment(worker_id, retry)
+    interface.fail_assignment(assignment, "boom")
+    assert interface.get_dead_tasks() == [retry]
+    time.sleep(0.1)
+    assert interface.pickup_tasks([], 10) == []
+    with pytest.raises(AssignmentNotFoundError):
+        interface.fail_assignment(assignment, "boom")
+
+
+def test_pickup_follows_priority_then_fifo(interface: InMemoryInterface) -> None:
+    low = [CpuTask(priority=-1) for _ in range(2)]
+    normal = [CpuTask() for _ in range(3)]
+    urgent = [GpuTask(priority=5), CpuTask(priority=5)]
+    interface.add_tasks([low[0], normal[0], urgent[0], normal[1], low[1], urgent[1], normal[2]])
+    assert interface.pickup_task([]) == urgent[1]
+    assert interface.pickup_task([GpuCapability()]) == urgent[0]
+    assert interface.pickup_tasks([GpuCapability()], 10) == urgent + normal + low
+    assert interface.pickup_tasks([], 4) == [urgent[1]] + normal
+
+    worker_id = WorkerId.generate()
+    assignment = interface.create_assignment(worker_id, normal[1])
+    interface.create_assignment(worker_id, urgent[1])
+    assert interface.pickup_tasks([], 10) == [normal[0], normal[2]] + low
+    # an abandoned task goes back to the front of the tasks of its priority
+    interface.abandon_assignment(assignment)
+    assert interface.pickup_tasks([], 10) == [normal[1], normal[0], normal[2]] + low
+
+
+def test_priority_of_ready_task_can_be_changed(interface: InMemoryInterface) -> None:
+    tasks = [CpuTask() for _ in range(3)]
+    interface.add_tasks(tasks)
+    bumped = tasks[2].copy(update={"priority": 1})
+    interface.add_task(bumped)
+    assert interface.pickup_tasks([], 10) == [bumped, tasks[0], tasks[1]]
+
+
+def claim_owners(interface: InMemoryInterface, n: int) -> list:
+    worker_id = WorkerId.generate()
+    owners = []
+    for _ in range(n):
+        t = interface.pickup_task([GpuCapability()])
+        interface.create_assignment(worker_id, t)
+        owners.append(t.owner)
+    return owners
+
+
+def test_owners_share_workers_by_weight() -> None:
+    interface = InMemoryInterface(logger=BasicLogger("test"), name=None, owner_weights={"alice": 2.0})
+    interface.add_tasks([CpuTask(owner=UserId("bob"), priority=9) for _ in range(1000)])
+    interface.add_tasks([GpuTask(owner=UserId("alice")) for _ in range(1000)])
+    interface.add_tasks([CpuTask(owner=UserId("carol")) for _ in range(1000)])
+    owners = claim_owners(interface, 400)
+    # bob's priority only orders bob's own tasks
+    assert owners.count("alice") == 200
+    assert owners.count("bob") == owners.count("carol") == 100
+    # ties between owners go to the one seen first
+    assert [t.owner for t in interface.pickup_tasks([GpuCapability()], 4)] == ["bob", "alice", "carol", "alice"]
+    assert [t.owner for t in interface.pickup_tasks([], 4)] == ["bob", "carol", "bob", "carol"]
+
+
+def test_idle_owner_does_not_bank_its_share(interface: InMemoryInterface) -> None:
+    interface.add_tasks([CpuTask(owner=UserId("bob")) for _ in range(1000)])
+    assert set(claim_owners(interface, 100)) == {"bob"}
+    interface.add_tasks([CpuTask(owner=UserId("alice")) for _ in range(1000)])
+    # alice is served at once, but then only gets her share instead of the 100 claims she missed
+    owners = claim_owners(interface, 20)
+    assert owners[0] == "alice"
+    assert owners.count("alice") == owners.count("bob") == 10
+
+
+def test_owner_keeps_priority_and_fifo_order(interface: InMemoryInterface) -> None:
+    alice = [CpuTask(owner=UserId("alice")) for _ in range(3)]
+    urgent = CpuTask(owner=UserId("alice"), priority=1)
+    bob = [CpuTask(owner=UserId("bob")) for _ in range(3)]
+    interface.add_tasks(alice + bob + [urgent])
+    assert interface.pickup_tasks([], 8) == [urgent, bob[0], alice[0], bob[1], alice[1], bob[2], alice[2]]
+    # moving a ready task to another owner moves it to that owner's queue
+    moved = alice[2].copy(update={"owner": UserId("bob")})
+    interface.add_task(moved)
+    assert interface.pickup_tasks([], 8) == [urgent, bob[0], alice[0], bob[1], alice[1], bob[2], moved]
+
+
+def test_owner_weights_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        InMemoryInterface(logger=BasicLogger("test"), name=None, owner_weights={"alice": 0.0})
+
+
+def run(interface: InMemoryInterface, task: BaseTask) -> None:
+    interface.complete_assignment(interface.create_assignment(WorkerId.generate(), task))
+
+
+def test_task_waits_for_its_dependencies(interface: InMemoryInterface) -> None:
+    done = CpuTask()
+    interface.add_task(done)
+    run(interface, done)
+    maps = [CpuTask() for _ in range(10_000)]
+    # dependencies may be added after the task waiting for them
+    reduce = CpuTask(depends_on=[done.id] + [m.id for m in maps])
+    interface.add_task(reduce)
+    interface.add_tasks(maps)
+    for m in maps[:-1]:
+        run(interface, m)
+    interface.add_task(reduce)
+    assert interface.pickup_tasks([], 10) == [maps[-1]]
+    run(interface, maps[-1])
+    assert interface.pickup_task([]) == reduce
+
+
+class SquareTask(BaseTask):
+    memoize = True
+    retry_policy = RetryPolicy(max_attempts=1)
+    x: int
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def test_identical_memoized_tasks_run_once(interface: InMemoryInterface) -> None:
+    first, other = SquareTask(x=2), SquareTask(x=3)
+    interface.add_tasks([first, other])
+    joined = SquareTask(x=2, priority=5)
+    after = CpuTask(depends_on=[joined.id])
+    interface.add_tasks([joined, after])
+    assert interface.pickup_tasks([], 10) == [first, other]
+
+    run(interface, first)
+    assert interface.pickup_tasks([], 10) == [other, after]
+    # an identical task added after the first one completed is completed at once
+    late = SquareTask(x=2)
+    interface.add_tasks([late, CpuTask(depends_on=[late.id])])
+    assert len(interface.pickup_tasks([], 10)) == 3
+    assert interface.memo_stats().hits == 2 and interface.memo_stats().misses == 2
+
+
+def test_memoized_task_dies_with_the_task_it_joined(interface: InMemoryInterface) -> None:
+    first, joined = SquareTask(x=2), SquareTask(x=2)
+    interface.add_tasks([first, joined])
+    interface.fail_assignment(interface.create_assignment(WorkerId.generate(), first), "boom")
+    assert interface.get_dead_tasks() == [first, joined]
+    # identical tasks run again once the first one died
+    again = SquareTask(x=2)
+    interface.add_task(again)
+    assert interface.pickup_tasks([], 10) == [again]
+
+
+class ConcatTask(BaseTask):
+    parts: tuple[BlobId, ...]
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def test_blobs_are_collected_once_no_task_refers_to_them() -> None:
+    interface = InMemoryInterface(logger=BasicLogger("test"), name=None, collect_blobs=True)
+    shared, own, output = (Blob(blob=Bytes(b"x" * n)) for n in (1, 2, 3))
+    for blob in (shared, own, output):
+        interface.save_blob(blob)
+    first, second = ConcatTask(parts=(shared.id, own.id)), ConcatTask(parts=(shared.id,))
+    interface.add_tasks([first, second])
+
+    run(interface, first)
+    assert interface.get_blobs([shared.id, output.id]) == [shared, output]
+    with pytest.raises(BlobNotFoundError):
+        interface.get_blob(own.id)
+    run(interface, second)
+    with pytest.raises(BlobNotFoundError):
+        interface.get_blob(shared.id)
+    # blobs no task referred to are kept
+    assert interface.get_blob(output.id) == output
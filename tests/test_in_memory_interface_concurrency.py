@@ -0,0 +1,78 @@
+import sys
+import threading
+import time
+from collections.abc import Iterable, Iterator
+
+import pytest
+
+from shikijin.fields import TaskId, WorkerId
+from shikijin.interfaces.exceptions import NoCapableTaskError, TaskAlreadyAssignedError
+from shikijin.interfaces.in_memory_interface.core import InMemoryInterface
+from shikijin.loggers.basic_logger.core import BasicLogger
+from shikijin.types import BaseTask
+
+
+class StressTask(BaseTask):
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches() -> Iterator[None]:
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_no_task_is_ever_double_assigned() -> None:
+    interface = InMemoryInterface(logger=BasicLogger("test"), name=None, lock_stripes=8)
+    tasks = [StressTask() for _ in range(2000)]
+    holders: dict[TaskId, WorkerId] = {}
+    completed: list[TaskId] = []
+    violations: list[TaskId] = []
+    bookkeeping = threading.Lock()
+
+    def work(abandon_every: int) -> None:
+        worker_id = WorkerId.generate()
+        claims = 0
+        while True:
+            try:
+                candidates = interface.pickup_tasks([], 4) or [interface.wait_for_task([], timeout=0.2)]
+            except NoCapableTaskError:
+                return
+            for t in candidates:
+                try:
+                    assignment = interface.create_assignment(worker_id, t)
+                except TaskAlreadyAssignedError:
+                    continue
+                with bookkeeping:
+                    if t.id in holders:
+                        violations.append(t.id)
+                    holders[t.id] = worker_id
+                claims += 1
+                time.sleep(0)
+                with bookkeeping:
+                    del holders[t.id]
+                if claims % abandon_every == 0:
+                    interface.abandon_assignment(assignment)
+                else:
+                    interface.complete_assignment(assignment)
+                    with bookkeeping:
+                        completed.append(t.id)
+
+    threads = [threading.Thread(target=work, args=(3 + i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    half = len(tasks) // 2
+    interface.add_tasks(tasks[:half])
+    for task in tasks[half:]:
+        interface.add_task(task)
+    for t in threads:
+        t.join()
+
+    assert violations == []
+    assert len(completed) == len(tasks)
+    assert set(completed) == {t.id for t in tasks}
+    with pytest.raises(NoCapableTaskError):
+        interface.pickup_task([])
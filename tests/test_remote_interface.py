@@ -0,0 +1,333 @@
+import multiprocessing
+import socket
+import threading
+import zlib
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import pytest
+
+from shikijin.compression import Codec
+from shikijin.fields import BlobId, Bytes, TaskId, WorkerId
+from shikijin.interfaces.exceptions import (
+    AssignmentNotFoundError,
+    BlobNotFoundError,
+    NoCapableTaskError,
+    RemoteInterfaceError,
+    TaskAlreadyAssignedError,
+)
+from shikijin.interfaces.factory import InterfaceFactory
+from shikijin.interfaces.in_memory_interface.core import InMemoryInterface
+from shikijin.interfaces.remote_interface.core import RemoteInterface
+from shikijin.interfaces.remote_interface.protocol import (
+    ERROR,
+    HEADER,
+    MAX_FRAME_SIZE,
+    OK,
+    ProtocolError,
+    decode_value,
+    encode_frame,
+    parse_address,
+    read_frame,
+)
+from shikijin.interfaces.remote_interface.server import InterfaceServer
+from shikijin.loggers.basic_logger.core import BasicLogger
+from shikijin.settings import GlobalSettings, InterfaceType
+from shikijin.types import BaseCapability, BaseTask, Blob
+
+
+class GpuCapability(BaseCapability):
+    ...
+
+
+class CpuTask(BaseTask):
+    inputs: tuple[BlobId, ...] = ()
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+class GpuTask(BaseTask):
+    required_capabilities = (GpuCapability,)
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+@pytest.fixture(params=["unix", "tcp"])
+def server(request: pytest.FixtureRequest, tmp_path: Path) -> Iterator[InterfaceServer]:
+    address = f"unix:{tmp_path / 's.sock'}" if request.param == "unix" else "tcp:127.0.0.1:0"
+    backend = InMemoryInterface(logger=BasicLogger("test"), name=None)
+    server = InterfaceServer(interface=backend, address=address, logger=BasicLogger("test"))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.stop()
+    thread.join(timeout=5.0)
+    assert not thread.is_alive()
+
+
+@pytest.fixture
+def interface(server: InterfaceServer) -> Iterator[RemoteInterface]:
+    interface = RemoteInterface(address=server.address, logger=BasicLogger("test"), timeout=5.0)
+    yield interface
+    interface.close()
+
+
+def test_task_life_cycle(interface: RemoteInterface) -> None:
+    tasks = [CpuTask(inputs=(BlobId.generate(),)) for _ in range(3)]
+    interface.add_tasks(tasks[:2])
+    interface.add_task(tasks[2])
+    assert interface.get_task(tasks[0].id) == tasks[0]
+    assert interface.get_tasks([t.id for t in tasks]) == tasks
+    assert interface.pickup_tasks([], 10) == tasks
+
+    worker_id = WorkerId.generate()
+    assignment = interface.create_assignment(worker_id, tasks[0])
+    assert assignment.worker_id == worker_id and assignment.task_id == tasks[0].id
+    with pytest.raises(TaskAlreadyAssignedError) as e:
+        interface.create_assignment(worker_id, tasks[0])
+    assert e.value.task_id == tasks[0].id
+    interface.abandon_assignment(assignment)
+    with pytest.raises(AssignmentNotFoundError):
+        interface.complete_assignment(assignment)
+    assignment = interface.create_assignment(worker_id, tasks[0])
+    renewed = interface.heartbeat(assignment)
+    assert renewed.id == assignment.id and renewed.expires_at is not None
+    interface.complete_assignment(renewed)
+    with pytest.raises(AssignmentNotFoundError):
+        interface.heartbeat(renewed)
+    assert interface.pickup_task([]) == tasks[1]
+
+    interface.fail_assignment(interface.create_assignment(worker_id, tasks[1]), "boom")
+    assert interface.pickup_task([]) == tasks[2]
+    assert interface.get_task(tasks[1].id).attempts == 1
+    assert interface.get_dead_tasks() == []
+
+
+def test_capabilities(interface: RemoteInterface) -> None:
+    task = GpuTask()
+    interface.add_task(task)
+    with pytest.raises(NoCapableTaskError):
+        interface.pickup_task([])
+    with pytest.raises(NoCapableTaskError):
+        interface.wait_for_task([], timeout=0.05)
+    assert interface.wait_for_task([GpuCapability()], timeout=1.0) == task
+
+
+def test_blobs(interface: RemoteInterface) -> None:
+    blob = Blob(blob=Bytes(bytes(range(256)) * 10))
+    interface.save_blob(blob)
+    assert interface.get_blob(blob.id) == blob
+    assert interface.get_blobs([blob.id]) == [blob]
+    assert interface.blob_size(blob.id) == 2560
+    assert interface.read_blob_range(blob.id, 10, 5) == blob.blob[10:15]
+    assert b"".join(interface.open_blob_stream(blob.id, chunk_size=1000)) == blob.blob
+    blob_id = interface.save_blob_stream([b"ab", b"cd"])
+    assert bytes(interface.view_blob(blob_id)) == b"abcd"
+    missing = BlobId.generate()
+    with pytest.raises(BlobNotFoundError) as e:
+        interface.get_blob(missing)
+    assert e.value.blob_id == missing
+
+
+def test_pipeline(interface: RemoteInterface) -> None:
+    tasks = [CpuTask() for _ in range(3)]
+    results = interface.pipeline([("add_tasks", (tasks,)), ("pickup_tasks", ([], 10)), ("get_task", (tasks[1].id,))])
+    assert results == [None, tasks, tasks[1]]
+    with pytest.raises(BlobNotFoundError):
+        interface.pipeline([("get_task", (tasks[0].id,)), ("blob_size", (BlobId.generate(),))])
+    # the connection stays usable after an error in a pipeline
+    assert interface.get_task(tasks[0].id) == tasks[0]
+
+
+def test_unknown_method_is_rejected(interface: RemoteInterface) -> None:
+    with pytest.raises(RemoteInterfaceError):
+        interface.pipeline([("__init__", ())])
+
+
+def test_connection_errors(tmp_path: Path) -> None:
+    interface = RemoteInterface(address=f"unix:{tmp_path / 'missing.sock'}", logger=BasicLogger("test"))
+    with pytest.raises(RemoteInterfaceError):
+        interface.get_task(TaskId.generate())
+
+
+def test_concurrent_threads_share_the_pool(interface: RemoteInterface) -> None:
+    tasks = [CpuTask() for _ in range(200)]
+    interface.add_tasks(tasks)
+    claimed: list[TaskId] = []
+    lock = threading.Lock()
+
+    def work() -> None:
+        worker_id = WorkerId.generate()
+        while candidates := interface.pickup_tasks([], 2):
+            for task in candidates:
+                try:
+                    assignment = interface.create_assignment(worker_id, task)
+                except TaskAlreadyAssignedError:
+                    continue
+                with lock:
+                    claimed.append(task.id)
+                interface.complete_assignment(assignment)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(t.id for t in tasks)
+
+
+def claim_all(address: str, claimed: "multiprocessing.Queue[bytes]") -> None:
+    interface = RemoteInterface(address=address, logger=BasicLogger("test"), timeout=5.0)
+    worker_id = WorkerId.generate()
+    while True:
+        try:
+            task = interface.wait_for_task([], timeout=0.1)
+        except NoCapableTaskError:
+            return
+        try:
+            assignment = interface.create_assignment(worker_id, task)
+        except TaskAlreadyAssignedError:
+            continue
+        claimed.put(task.id.bytes)
+        interface.complete_assignment(assignment)
+
+
+def test_processes_share_one_queue(server: InterfaceServer) -> None:
+    tasks = [CpuTask() for _ in range(200)]
+    server.interface.add_tasks(tasks)
+    context = multiprocessing.get_context("fork")
+    claimed: "multiprocessing.Queue[bytes]" = context.Queue()
+    processes = [context.Process(target=claim_all, args=(server.address, claimed)) for _ in range(4)]
+    for p in processes:
+        p.start()
+    ids = [claimed.get(timeout=30.0) for _ in tasks]
+    for p in processes:
+        p.join(timeout=30.0)
+        assert p.exitcode == 0
+    assert len(set(ids)) == len(tasks)
+
+
+def test_interface_factory() -> None:
+    settings = GlobalSettings(
+        interface_type=InterfaceType.REMOTE, interface_settings={"address": "tcp:127.0.0.1:7000", "pool_size": 2}
+    )
+    interface = InterfaceFactory(logger=BasicLogger("test")).create(settings)
+    assert isinstance(interface, RemoteInterface)
+    assert interface.address == "tcp:127.0.0.1:7000"
+
+
+def test_compressed_messages(tmp_path: Path) -> None:
+    backend = InMemoryInterface(logger=BasicLogger("test"), name=None)
+    address = f"unix:{tmp_path / 's.sock'}"
+    server = InterfaceServer(interface=backend, address=address, logger=BasicLogger("test"), compression=Codec.BZ2)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    interface = RemoteInterface(address=address, logger=BasicLogger("test"), compression=Codec.ZLIB)
+    try:
+        blob = Blob(blob=Bytes(b"compressible text " * 1000))
+        interface.save_blob(blob)
+        assert backend.get_blob(blob.id) == blob
+        assert interface.get_blob(blob.id) == blob
+        assert interface.read_blob_range(blob.id, 18, 4) == b"comp"
+    finally:
+        interface.close()
+        server.stop()
+        thread.join(timeout=5.0)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"I\xff" + bytes(16),  # unknown id class
+        b"I\x00" + bytes(3),  # truncated id
+        b"i\x00\x01",  # truncated int
+        b"b\x00\x00\x01\x00xx",  # bytes overrunning the body
+        b"s\x00\x00\x00\x01\xff",  # invalid utf-8
+        b"l\x00\x00\x00\x01" * 10_000 + b"N",  # lists nested too deep
+        b"e\x00\x00\x00\x04\x00\x00\x00\x00",  # entity of an empty class path
+    ],
+)
+def test_malformed_values_are_rejected(body: bytes) -> None:
+    with pytest.raises(ProtocolError):
+        decode_value(body)
+
+
+def test_server_fails_requests_with_malformed_bodies(interface: RemoteInterface, server: InterfaceServer) -> None:
+    family, sockaddr = parse_address(server.address)
+    with socket.socket(family, socket.SOCK_STREAM) as s:
+        s.connect(sockaddr)
+        s.sendall(
+            HEADER.pack(18, 0)
+            + b"I\xff"
+            + bytes(16)
+            + HEADER.pack(9, 1)
+            + b"e\x00\x00\x00\x04\x00\x00\x00\x00"
+            + encode_frame(2, ["get_dead_tasks", []])
+        )
+        with s.makefile("rb") as stream:
+            first, second, third = (read_frame(stream) for _ in range(3))
+    assert first is not None and first[0] == 0 and first[1][0] == ERROR
+    assert first[1][1][0] == "ProtocolError"
+    assert second is not None and second[0] == 1 and second[1][0] == ERROR
+    assert third == (2, [OK, []])
+
+
+def test_server_drops_connections_sending_malformed_frames(interface: RemoteInterface, server: InterfaceServer) -> None:
+    family, sockaddr = parse_address(server.address)
+    with socket.socket(family, socket.SOCK_STREAM) as s:
+        s.connect(sockaddr)
+        s.sendall(HEADER.pack(MAX_FRAME_SIZE + 1, 0))
+        assert s.recv(1) == b""
+    assert interface.get_dead_tasks() == []
+
+
+def test_frames_are_bounded(tmp_path: Path) -> None:
+    backend = InMemoryInterface(logger=BasicLogger("test"), name=None)
+    address = f"unix:{tmp_path / 's.sock'}"
+    server = InterfaceServer(interface=backend, address=address, logger=BasicLogger("test"), max_frame_size=1 << 16)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    interface = RemoteInterface(address=address, logger=BasicLogger("test"), max_frame_size=1 << 16)
+    try:
+        with pytest.raises(RemoteInterfaceError):
+            interface.save_blob(Blob(blob=Bytes(bytes(1 << 17))))
+        blob_id = backend.save_blob_stream([bytes(1 << 15)] * 4)
+        with pytest.raises(RemoteInterfaceError):
+            interface.get_blob(blob_id)
+        assert b"".join(interface.open_blob_stream(blob_id, chunk_size=1 << 15)) == bytes(1 << 17)
+    finally:
+        interface.close()
+        server.stop()
+        thread.join(timeout=5.0)
+
+
+def test_server_only_replaces_sockets(tmp_path: Path) -> None:
+    backend = InMemoryInterface(logger=BasicLogger("test"), name=None)
+    path = tmp_path / "not-a-socket"
+    path.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        InterfaceServer(interface=backend, address=f"unix:{path}", logger=BasicLogger("test"))
+    assert path.read_text() == "keep me"
+
+
+def compressed_body(codec: int, packed: bytes) -> bytes:
+    return b"z" + bytes([codec]) + len(packed).to_bytes(4, "big") + packed
+
+
+def test_compressed_bodies_are_bounded() -> None:
+    bomb = zlib.compress(b"b" + (1 << 20).to_bytes(4, "big") + bytes(1 << 20))
+    with pytest.raises(ProtocolError, match="expands beyond"):
+        decode_value(compressed_body(1, bomb), max_size=1 << 16)
+    assert decode_value(compressed_body(1, bomb)) == bytes(1 << 20)
+    # compressed values are only allowed as a whole body
+    nested = compressed_body(1, zlib.compress(compressed_body(1, zlib.compress(b"N"))))
+    with pytest.raises(ProtocolError):
+        decode_value(nested)
+    with pytest.raises(ProtocolError):
+        decode_value(b"l\x00\x00\x00\x01" + compressed_body(1, zlib.compress(b"N")))
+    with pytest.raises(ProtocolError, match="unknown codec"):
+        decode_value(compressed_body(9, b"x"))
+    with pytest.raises(ProtocolError):
+        decode_value(compressed_body(1, zlib.compress(b"N")[:-2]))
@@ -0,0 +1,274 @@
+import multiprocessing
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+import pytest
+
+from shikijin.fields import Bytes, TaskId, TaskName, Timestamp, WorkerId
+from shikijin.interfaces.exceptions import (
+    AssignmentNotFoundError,
+    NoCapableTaskError,
+    TaskAlreadyAssignedError,
+    TaskNotFoundError,
+)
+from shikijin.interfaces.factory import InterfaceFactory
+from shikijin.interfaces.sqlite_interface.core import SqliteInterface
+from shikijin.loggers.basic_logger.core import BasicLogger
+from shikijin.settings import GlobalSettings, InterfaceType, StorageType
+from shikijin.storages.in_memory_storage.core import InMemoryStorage
+from shikijin.storages.sqlite_storage.core import SqliteStorage
+from shikijin.types import BaseCapability, BaseTask, Blob, RetryPolicy
+
+
+class GpuCapability(BaseCapability):
+    ...
+
+
+class CpuTask(BaseTask):
+    name: TaskName = TaskName("cpu")
+    inputs: tuple[TaskId, ...] = ()
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+class GpuTask(BaseTask):
+    required_capabilities = (GpuCapability,)
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def open_interface(path: Path) -> SqliteInterface:
+    return SqliteInterface(path=str(path), logger=BasicLogger("test"), synchronous="OFF", poll_interval=0.01)
+
+
+@pytest.fixture
+def interface(tmp_path: Path) -> SqliteInterface:
+    return open_interface(tmp_path / "shikijin.db")
+
+
+def test_pickup_task_respects_capabilities(interface: SqliteInterface) -> None:
+    gpu_task = GpuTask()
+    interface.add_task(gpu_task)
+    with pytest.raises(NoCapableTaskError):
+        interface.pickup_task([])
+    assert interface.pickup_task([GpuCapability()]) == gpu_task
+
+    cpu_task = CpuTask(inputs=(TaskId.generate(),))
+    interface.add_task(cpu_task)
+    assert interface.pickup_task([]) == cpu_task
+    assert interface.get_task(cpu_task.id) == cpu_task
+    with pytest.raises(TaskNotFoundError):
+        interface.get_task(TaskId.generate())
+
+
+def test_pickup_sees_signatures_registered_by_other_processes(tmp_path: Path) -> None:
+    worker, producer = open_interface(tmp_path / "shikijin.db"), open_interface(tmp_path / "shikijin.db")
+    assert worker.pickup_tasks([GpuCapability()], 10) == []
+    gpu_task = GpuTask()
+    producer.add_task(gpu_task)
+    assert worker.pickup_tasks([], 10) == []
+    assert worker.pickup_tasks([GpuCapability()], 10) == [gpu_task]
+
+
+def test_assignment_life_cycle(interface: SqliteInterface) -> None:
+    tasks = [CpuTask() for _ in range(3)]
+    interface.add_tasks(tasks)
+    worker_id = WorkerId.generate()
+    assignment = interface.create_assignment(worker_id, tasks[0])
+    with pytest.raises(TaskAlreadyAssignedError):
+        interface.create_assignment(worker_id, tasks[0])
+    assert interface.pickup_task([]) == tasks[1]
+
+    interface.abandon_assignment(assignment)
+    assert interface.pickup_tasks([], 10) == tasks
+    with pytest.raises(AssignmentNotFoundError):
+        interface.complete_assignment(assignment)
+
+    assignment = interface.create_assignment(worker_id, tasks[0])
+    interface.complete_assignment(assignment)
+    assert interface.pickup_tasks([], 10) == tasks[1:]
+    with pytest.raises(TaskAlreadyAssignedError):
+        interface.create_assignment(worker_id, tasks[0])
+    interface.add_task(tasks[0])
+    assert interface.pickup_tasks([], 10) == tasks[1:]
+
+
+def test_batch_task_apis(interface: SqliteInterface) -> None:
+    tasks = [CpuTask() for _ in range(5)] + [GpuTask()]
+    interface.add_tasks(tasks)
+    assert interface.get_tasks([t.id for t in reversed(tasks)]) == list(reversed(tasks))
+    assert interface.pickup_tasks([], 3) == tasks[:3]
+    assert interface.pickup_tasks([GpuCapability()], 10) == tasks
+    with pytest.raises(TaskNotFoundError):
+        interface.get_tasks([tasks[0].id, TaskId.generate()])
+
+
+def test_pickup_follows_priority_then_fifo(interface: SqliteInterface) -> None:
+    low = CpuTask(priority=-1)
+    normal = [CpuTask() for _ in range(2)]
+    urgent = [GpuTask(priority=5), CpuTask(priority=5)]
+    interface.add_tasks([low, normal[0], urgent[0], normal[1], urgent[1]])
+    assert interface.pickup_task([]) == urgent[1]
+    assert interface.pickup_task([GpuCapability()]) == urgent[0]
+    assert interface.pickup_tasks([GpuCapability()], 10) == urgent + normal + [low]
+
+    assignment = interface.create_assignment(WorkerId.generate(), normal[1])
+    assert interface.pickup_tasks([], 3) == [urgent[1], normal[0], low]
+    interface.abandon_assignment(assignment)
+    assert interface.pickup_tasks([], 3) == [urgent[1], normal[1], normal[0]]
+
+
+def test_state_survives_reopening(tmp_path: Path) -> None:
+    path = tmp_path / "shikijin.db"
+    interface = open_interface(path)
+    tasks = [CpuTask() for _ in range(3)]
+    interface.add_tasks(tasks)
+    assignment = interface.create_assignment(WorkerId.generate(), tasks[0])
+    blob = Blob(blob=Bytes(b"\x00payload"))
+    interface.save_blob(blob)
+
+    reopened = open_interface(path)
+    assert reopened.pickup_tasks([], 10) == tasks[1:]
+    assert reopened.get_blob(blob.id) == blob
+    reopened.complete_assignment(assignment)
+
+
+def test_expired_lease_is_reclaimed(tmp_path: Path) -> None:
+    interface = SqliteInterface(
+        path=str(tmp_path / "shikijin.db"), logger=BasicLogger("test"), synchronous="OFF", lease_duration=0.05
+    )
+    tasks = [CpuTask() for _ in range(2)]
+    interface.add_tasks(tasks)
+    assignment = interface.create_assignment(WorkerId.generate(), tasks[0])
+    renewed = interface.heartbeat(assignment)
+    assert renewed.expires_at is not None and assignment.expires_at is not None
+    assert renewed.expires_at >= assignment.expires_at
+    assert interface.pickup_tasks([], 10) == tasks[1:]
+
+    time.sleep(0.1)
+    assert interface.pickup_tasks([], 10) == tasks
+    with pytest.raises(AssignmentNotFoundError):
+        interface.heartbeat(renewed)
+    with pytest.raises(AssignmentNotFoundError):
+        interface.complete_assignment(renewed)
+
+
+class FlakyTask(BaseTask):
+    retry_policy = RetryPolicy(max_attempts=2, initial_delay=0.05)
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def test_delayed_and_failed_tasks(interface: SqliteInterface) -> None:
+    delayed = CpuTask(not_before=Timestamp(Timestamp.now() + 50_000))
+    task = FlakyTask()
+    interface.add_tasks([delayed, task])
+    assert interface.pickup_tasks([], 10) == [task]
+    worker_id = WorkerId.generate()
+    interface.fail_assignment(interface.create_assignment(worker_id, task), "boom")
+    assert interface.pickup_tasks([], 10) == []
+
+    time.sleep(0.1)
+    released, retry = interface.pickup_tasks([], 10)
+    assert released == delayed
+    assert retry.id == task.id and retry.attempts == 1
+    interface.fail_assignment(interface.create_assignment(worker_id, retry), "boom")
+    assert interface.get_dead_tasks() == [retry]
+    assert interface.pickup_tasks([], 10) == [delayed]
+
+    # adding a dead task again revives it
+    interface.add_task(retry)
+    assert interface.get_dead_tasks() == []
+    assert interface.pickup_tasks([], 10) == [delayed, retry]
+
+
+def test_wait_for_task_wakes_up_on_add_task(interface: SqliteInterface) -> None:
+    task = CpuTask()
+    timer = threading.Timer(0.05, interface.add_task, args=(task,))
+    timer.start()
+    try:
+        assert interface.wait_for_task([], timeout=5.0) == task
+    finally:
+        timer.join()
+    interface.create_assignment(WorkerId.generate(), task)
+    with pytest.raises(NoCapableTaskError):
+        interface.wait_for_task([], timeout=0.05)
+
+
+def claim_all(path: str, claimed: "multiprocessing.Queue[bytes]") -> None:
+    interface = open_interface(Path(path))
+    worker_id = WorkerId.generate()
+    while True:
+        try:
+            candidates = interface.pickup_tasks([], 4)
+        except NoCapableTaskError:
+            candidates = []
+        if not candidates:
+            return
+        for task in candidates:
+            try:
+                assignment = interface.create_assignment(worker_id, task)
+            except TaskAlreadyAssignedError:
+                continue
+            claimed.put(task.id.bytes)
+            interface.complete_assignment(assignment)
+
+
+def test_processes_never_claim_the_same_task(tmp_path: Path) -> None:
+    path = tmp_path / "shikijin.db"
+    interface = open_interface(path)
+    tasks = [CpuTask() for _ in range(300)]
+    interface.add_tasks(tasks)
+    context = multiprocessing.get_context("fork")
+    claimed: "multiprocessing.Queue[bytes]" = context.Queue()
+    processes = [context.Process(target=claim_all, args=(str(path), claimed)) for _ in range(4)]
+    for p in processes:
+        p.start()
+    ids = [claimed.get(timeout=30.0) for _ in tasks]
+    for p in processes:
+        p.join(timeout=30.0)
+        assert p.exitcode == 0
+    assert len(ids) == len(set(ids)) == len(tasks)
+    assert interface.pickup_tasks([], 10) == []
+
+
+def test_interface_factory(tmp_path: Path) -> None:
+    settings = GlobalSettings(interface_type=InterfaceType.SQLITE, interface_settings={"path": str(tmp_path / "a.db")})
+    interface = InterfaceFactory(logger=BasicLogger("test")).create(settings)
+    assert isinstance(interface, SqliteInterface)
+    assert isinstance(interface.storage, SqliteStorage)
+
+    settings = GlobalSettings(
+        interface_type=InterfaceType.SQLITE,
+        interface_settings={"path": str(tmp_path / "b.db")},
+        storage_type=StorageType.IN_MEMORY,
+    )
+    interface = InterfaceFactory(logger=BasicLogger("test")).create(settings)
+    assert isinstance(interface, SqliteInterface)
+    assert isinstance(interface.storage, InMemoryStorage)
+
+
+def test_task_waits_for_its_dependencies(interface: SqliteInterface) -> None:
+    worker_id = WorkerId.generate()
+    done = CpuTask()
+    interface.add_task(done)
+    interface.complete_assignment(interface.create_assignment(worker_id, done))
+    maps = [CpuTask() for _ in range(3)]
+    later = CpuTask(depends_on=[maps[0].id], not_before=Timestamp(Timestamp.now() + 50_000))
+    reduce = CpuTask(depends_on=[done.id] + [m.id for m in maps])
+    interface.add_tasks([reduce, later])
+    interface.add_tasks(maps)
+    assert interface.pickup_tasks([], 10) == maps
+    for m in maps[:2]:
+        interface.complete_assignment(interface.create_assignment(worker_id, m))
+    interface.add_task(reduce)
+    assert interface.pickup_tasks([], 10) == [maps[2]]
+    interface.complete_assignment(interface.create_assignment(worker_id, maps[2]))
+    assert interface.pickup_tasks([], 10) == [reduce]
+    time.sleep(0.1)
+    assert interface.pickup_tasks([], 10) == [reduce, later]
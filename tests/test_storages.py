@@ -0,0 +1,221 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from shikijin.compression import Codec
+from shikijin.fields import BlobId, Bytes
+from shikijin.interfaces.exceptions import BlobCorruptedError, BlobNotFoundError
+from shikijin.interfaces.factory import InterfaceFactory
+from shikijin.interfaces.in_memory_interface.core import InMemoryInterface
+from shikijin.loggers.basic_logger.core import BasicLogger
+from shikijin.settings import GlobalSettings, StorageType
+from shikijin.storages.base import BaseStorage
+from shikijin.storages.compressed_storage.core import CompressedStorage
+from shikijin.storages.in_memory_storage.core import InMemoryStorage
+from shikijin.storages.local_file_storage.core import LocalFileStorage
+from shikijin.storages.sqlite_storage.core import SqliteStorage
+from shikijin.types import Blob
+
+
+@pytest.fixture(params=["in_memory", "local_file", "sqlite", "compressed"])
+def storage(request: pytest.FixtureRequest, tmp_path: Path) -> BaseStorage:
+    if request.param == "in_memory":
+        return InMemoryStorage(logger=BasicLogger("test"))
+    if request.param == "compressed":
+        return CompressedStorage(InMemoryStorage(logger=BasicLogger("test")), Codec.ZLIB)
+    if request.param == "sqlite":
+        return SqliteStorage(path=str(tmp_path / "blobs.db"), logger=BasicLogger("test"), synchronous="OFF")
+    return LocalFileStorage(root_path=str(tmp_path), logger=BasicLogger("test"), fsync=False)
+
+
+def test_save_and_get_blob(storage: BaseStorage) -> None:
+    blobs = [Blob(blob=Bytes(b"hello")), Blob(blob=Bytes(b"")), Blob(blob=Bytes(os.urandom(100000)))]
+    for b in blobs:
+        storage.save_blob(b)
+    for b in blobs:
+        assert storage.get_blob(b.id) == b
+        assert bytes(storage.view_blob(b.id)) == b.blob
+    assert storage.get_blobs([b.id for b in blobs]) == blobs
+    with pytest.raises(BlobNotFoundError):
+        storage.get_blob(BlobId.generate())
+
+
+def test_local_file_storage_layout(tmp_path: Path) -> None:
+    storage = LocalFileStorage(root_path=str(tmp_path), logger=BasicLogger("test"), fsync=False)
+    blob = Blob(blob=Bytes(b"hello"))
+    storage.save_blob(blob)
+    storage.save_blob(blob)
+    path = Path(storage.path_of(blob.id))
+    assert path.relative_to(tmp_path).parts == (blob.id.hex[0:2], blob.id.hex[2:4], blob.id.hex)
+    assert os.listdir(path.parent) == [blob.id.hex]
+
+    view = storage.view_blob(blob.id)
+    assert view.readonly
+    assert view.obj is not None and not isinstance(view.obj, bytes)
+    assert view.tobytes() == b"hello"
+
+
+@pytest.mark.parametrize("content", [b"", b"SKJB\x01", b"JUNK" + bytes(100)])
+def test_local_file_storage_rejects_unknown_files(tmp_path: Path, content: bytes) -> None:
+    storage = LocalFileStorage(root_path=str(tmp_path), logger=BasicLogger("test"), fsync=False)
+    blob = Blob(blob=Bytes(b"hello"))
+    storage.save_blob(blob)
+    Path(storage.path_of(blob.id)).write_bytes(content)
+    with pytest.raises(ValueError, match="unknown file format"):
+        storage.get_blob(blob.id)
+    with pytest.raises(ValueError, match="unknown file format"):
+        storage.view_blob(blob.id)
+    if len(content) < 21:  # shorter than the header
+        with pytest.raises(ValueError, match="unknown file format"):
+            storage.blob_size(blob.id)
+
+
+def test_interface_factory_uses_storage_settings(tmp_path: Path) -> None:
+    assert GlobalSettings().storage_type == StorageType.LOCAL_FILE
+    settings = GlobalSettings(storage_settings={"root_path": str(tmp_path)})
+    interface = InterfaceFactory(logger=BasicLogger("test")).create(settings)
+    assert isinstance(interface, InMemoryInterface)
+    assert isinstance(interface.storage, LocalFileStorage)
+    blob = Blob(blob=Bytes(b"hello"))
+    interface.save_blob(blob)
+    assert interface.get_blob(blob.id) == blob
+
+
+def test_streamed_blob_round_trip(storage: BaseStorage) -> None:
+    payload = os.urandom(10000)
+    chunks = [payload[i : i + 999] for i in range(0, len(payload), 999)]
+    blob_id = storage.save_blob_stream(iter(chunks))
+    assert storage.blob_size(blob_id) == len(payload)
+    assert storage.get_blob(blob_id).blob == payload
+    assert b"".join(storage.open_blob_stream(blob_id, chunk_size=1024)) == payload
+    assert all(len(c) == 1024 for c in list(storage.open_blob_stream(blob_id, chunk_size=1024))[:-1])
+    assert storage.read_blob_range(blob_id, 995, 10) == payload[995:1005]
+    assert storage.read_blob_range(blob_id, 9995) == payload[9995:]
+    assert storage.read_blob_range(blob_id, 20000, 10) == b""
+    assert b"".join(storage.open_blob_stream(blob_id, chunk_size=7, offset=1990, length=30)) == payload[1990:2020]
+    with pytest.raises(ValueError):
+        storage.read_blob_range(blob_id, -1)
+    for chunk_size in (0, -1):
+        with pytest.raises(ValueError):
+            list(storage.open_blob_stream(blob_id, chunk_size=chunk_size))
+
+
+def test_range_reads_of_whole_blobs(storage: BaseStorage) -> None:
+    blob = Blob(blob=Bytes(b"0123456789"))
+    storage.save_blob(blob)
+    assert storage.read_blob_range(blob.id, 3, 4) == b"3456"
+    assert list(storage.open_blob_stream(blob.id, chunk_size=4, offset=1)) == [b"1234", b"5678", b"9"]
+
+
+def test_interface_streams_file_like_objects(tmp_path: Path) -> None:
+    interface = InMemoryInterface(logger=BasicLogger("test"), name=None)
+    source = tmp_path / "source"
+    source.write_bytes(os.urandom(5000))
+    with source.open("rb") as f:
+        blob_id = interface.save_blob_stream(f, chunk_size=1000)
+    assert interface.blob_size(blob_id) == 5000
+    assert b"".join(interface.open_blob_stream(blob_id, chunk_size=512)) == source.read_bytes()
+    assert interface.read_blob_range(blob_id, 100, 10) == source.read_bytes()[100:110]
+
+
+def test_delete_blob(storage: BaseStorage) -> None:
+    blob = Blob(blob=Bytes(b"hello"))
+    storage.save_blob(blob)
+    storage.delete_blob(blob.id)
+    with pytest.raises(BlobNotFoundError):
+        storage.get_blob(blob.id)
+    with pytest.raises(BlobNotFoundError):
+        storage.delete_blob(blob.id)
+
+
+def test_storages_must_delete_blobs() -> None:
+    class ReadOnlyStorage(BaseStorage):
+        def get_blob(self, blob_id: BlobId) -> Blob:
+            raise BlobNotFoundError(blob_id)
+
+        def save_blob(self, blob: Blob) -> None:
+            ...
+
+    with pytest.raises(TypeError, match="delete_blob"):
+        ReadOnlyStorage(logger=BasicLogger("test"))  # type: ignore[abstract]
+
+
+def test_in_memory_storage_keeps_identical_payloads_once() -> None:
+    storage = InMemoryStorage(logger=BasicLogger("test"))
+    payload = os.urandom(1000)
+    first, second = Blob(blob=Bytes(payload)), Blob(blob=Bytes(payload))
+    storage.save_blob(first)
+    storage.save_blob(second)
+    streamed = storage.save_blob_stream(iter([payload[:300], payload[300:]]))
+    assert storage.stored_bytes == 1000
+    assert storage.get_blob(second.id) == second
+    assert storage.read_blob_range(streamed, 250, 100) == payload[250:350]
+
+    storage.delete_blob(first.id)
+    storage.delete_blob(streamed)
+    assert storage.get_blob(second.id) == second and storage.stored_bytes == 1000
+    storage.delete_blob(second.id)
+    assert storage.stored_bytes == 0
+
+
+@pytest.mark.parametrize("codec", [Codec.ZLIB, Codec.LZMA, Codec.BZ2])
+def test_compressed_storage(codec: Codec, tmp_path: Path) -> None:
+    backend = LocalFileStorage(root_path=str(tmp_path), logger=BasicLogger("test"), fsync=False)
+    legacy = Blob(blob=Bytes(b"hello " * 1000))
+    backend.save_blob(legacy)
+    storage = CompressedStorage(backend, codec)
+    text = b"".join(b'{"id": %d, "name": "blob %d"}\n' % (i, i) for i in range(1000))
+    blobs = [Blob(blob=Bytes(text)), Blob(blob=Bytes(b"small")), Blob(blob=Bytes(b"\x89SKZ" + os.urandom(2000)))]
+    for blob in blobs:
+        storage.save_blob(blob)
+    assert backend.blob_size(blobs[0].id) < len(text) // 5
+    streamed = storage.save_blob_stream(text[i : i + 1000] for i in range(0, len(text), 1000))
+    assert backend.blob_size(streamed) < len(text) // 5
+
+    assert storage.get_blobs([blob.id for blob in blobs] + [legacy.id]) == blobs + [legacy]
+    expected: list[tuple[BlobId, bytes]] = [(blobs[0].id, text), (streamed, text), (blobs[2].id, blobs[2].blob)]
+    for blob_id, payload in expected:
+        assert storage.blob_size(blob_id) == len(payload)
+        assert bytes(storage.view_blob(blob_id)) == payload
+        assert storage.read_blob_range(blob_id, 1995, 10) == payload[1995:2005]
+        chunks = list(storage.open_blob_stream(blob_id, chunk_size=4096, offset=100))
+        assert b"".join(chunks) == payload[100:] and all(len(c) == 4096 for c in chunks[:-1])
+
+
+def test_compressed_storage_reads_inconsistent_headers_as_raw(tmp_path: Path) -> None:
+    backend = LocalFileStorage(root_path=str(tmp_path), logger=BasicLogger("test"), fsync=False)
+    legacy = [Blob(blob=Bytes(b"\x89SKZ" + bytes([code]) + os.urandom(100))) for code in (0, 1, 9)]
+    legacy.append(Blob(blob=Bytes(b"\x89SKZ\x00")))
+    for blob in legacy:
+        backend.save_blob(blob)
+    storage = CompressedStorage(backend, Codec.ZLIB)
+    for blob in legacy:
+        assert storage.get_blob(blob.id) == blob
+        assert storage.blob_size(blob.id) == len(blob.blob)
+        assert storage.read_blob_range(blob.id, 2, 5) == blob.blob[2:7]
+
+
+def test_compressed_storage_detects_corrupted_payloads() -> None:
+    backend = InMemoryStorage(logger=BasicLogger("test"))
+    storage = CompressedStorage(backend, Codec.ZLIB)
+    blob = Blob(blob=Bytes(b"hello " * 1000))
+    storage.save_blob(blob)
+    stored = bytearray(backend.get_blob(blob.id).blob)
+    stored[10:20] = bytes(10)
+    backend.save_blob(Blob(id=blob.id, blob=Bytes(stored)))
+    with pytest.raises(BlobCorruptedError) as e:
+        storage.get_blob(blob.id)
+    assert e.value.blob_id == blob.id
+    with pytest.raises(BlobCorruptedError):
+        b"".join(storage.open_blob_stream(blob.id))
+
+
+def test_storage_factory_enables_compression() -> None:
+    settings = GlobalSettings(
+        storage_type=StorageType.IN_MEMORY, storage_settings={"compression": "lzma", "compression_min_size": 100}
+    )
+    interface = InterfaceFactory(logger=BasicLogger("test")).create(settings)
+    assert isinstance(interface, InMemoryInterface)
+    assert isinstance(interface.storage, CompressedStorage)
+    assert isinstance(interface.storage.storage, InMemoryStorage)
@@ -0,0 +1,126 @@
+import json
+from collections.abc import Iterable
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from shikijin.fields import BlobId, Bytes, TaskId, UserId
+from shikijin.types import AsyncBaseTask, BaseTask, BaseType, Blob
+
+
+class Inner(BaseType):
+    task_ids: list[TaskId]
+    note: Optional[str] = None
+
+
+class Outer(BaseType):
+    inner: Inner
+    inners: list[Inner] = []
+    inputs: tuple[BlobId, ...] = ()
+    owner: Optional[UserId] = None
+    mapping: dict[str, TaskId] = {}
+    retries: int = 0
+
+
+class PayloadTask(BaseTask):
+    inputs: tuple[BlobId, ...] = ()
+    retries: int = 0
+
+    def run(self) -> Iterable[BaseTask]:
+        return ()
+
+
+def legacy_dict(model: BaseModel, **kwargs: object) -> object:
+    """The plain form produced through pydantic, serialized with the JSON encoder of shikijin types."""
+    kwargs.setdefault("by_alias", True)
+    return json.loads(BaseModel.json(model, **kwargs))  # type: ignore[arg-type]
+
+
+def make_outer() -> Outer:
+    task_id = TaskId.generate()
+    return Outer(
+        inner=Inner(task_ids=[task_id, TaskId.generate()]),
+        inners=[Inner(task_ids=[], note="empty")],
+        inputs=(BlobId.generate(),),
+        mapping={"first": task_id},
+    )
+
+
+def test_dict_serializes_nested_values() -> None:
+    outer = make_outer()
+    data = outer.dict()
+    assert data["inner"]["taskIds"] == [v.serialize() for v in outer.inner.task_ids]
+    assert data["inners"] == [{"taskIds": [], "note": "empty"}]
+    assert data["inputs"] == (outer.inputs[0].serialize(),)
+    assert data["mapping"] == {"first": outer.inner.task_ids[0].serialize()}
+    assert Outer.parse_obj(data) == outer
+
+
+def test_dict_matches_pydantic() -> None:
+    outer = make_outer()
+    for kwargs in (
+        {},
+        {"by_alias": False},
+        {"exclude_unset": True},
+        {"exclude_defaults": True},
+        {"exclude_none": True},
+        {"include": {"inner", "retries"}},
+        {"exclude": {"inner"}},
+        {"exclude": {"inner": {"note"}}},
+    ):
+        assert json.loads(json.dumps(outer.dict(**kwargs))) == legacy_dict(outer, **kwargs), kwargs
+
+
+def test_dict_of_task() -> None:
+    task = PayloadTask(inputs=(BlobId.generate(),))
+    assert PayloadTask.parse_obj(task.dict()) == task
+    assert json.loads(task.json()) == legacy_dict(task)
+
+
+def test_blob_json() -> None:
+    blob = Blob(blob=Bytes(b"\xff\x00binary"))
+    data = json.loads(blob.json())
+    assert data["blob"] == blob.blob.serialize()
+    assert Blob.parse_raw(blob.json()) == blob
+
+
+def test_construct_trusted_matches_validated_construction() -> None:
+    inner = Inner(task_ids=[TaskId.generate()])
+    trusted = Outer.construct_trusted(inner=inner, retries=2)
+    validated = Outer(inner=inner, retries=2)
+    assert trusted == validated
+    assert trusted.__fields_set__ == validated.__fields_set__ == {"inner", "retries"}
+    assert trusted.dict(exclude_unset=True) == validated.dict(exclude_unset=True)
+
+
+def test_construct_trusted_fills_defaults() -> None:
+    first = PayloadTask.construct_trusted()
+    second = PayloadTask.construct_trusted()
+    assert first.inputs == () and first.retries == 0
+    assert first.id != second.id
+    assert (
+        Outer.construct_trusted(inner=Inner(task_ids=[])).mapping
+        is not Outer.construct_trusted(inner=Inner(task_ids=[])).mapping
+    )
+
+
+def test_construct_trusted_skips_validation() -> None:
+    blob = Blob.construct_trusted(blob=b"raw")
+    assert type(blob.blob) is bytes
+    assert type(Blob(blob=b"raw").blob) is Bytes  # type: ignore[arg-type]
+
+
+def test_tasks_must_implement_run() -> None:
+    class IdleTask(BaseTask):
+        ...
+
+    class IdleAsyncTask(AsyncBaseTask):
+        ...
+
+    for cls in (BaseTask, AsyncBaseTask, IdleTask, IdleAsyncTask):
+        with pytest.raises(TypeError, match="run"):
+            cls()  # type: ignore[abstract]
+        with pytest.raises(TypeError, match="run"):
+            cls.construct_trusted()
+    assert PayloadTask().run() == ()
@@ -0,0 +1,284 @@
+import asyncio
+import os
+import threading
+import time
+from collections.abc import AsyncIterator, Iterable
+from pathlib import Path
+from typing import ClassVar, Union
+
+import pytest
+
+from shikijin.interfaces.async_adapter.core import AsyncInterfaceAdapter
+from shikijin.interfaces.exceptions import NoCapableTaskError
+from shikijin.interfaces.in_memory_interface.core import InMemoryInterface
+from shikijin.interfaces.sqlite_interface.core import SqliteInterface
+from shikijin.loggers.basic_logger.core import BasicLogger
+from shikijin.settings import GlobalSettings, StorageType, WorkerType
+from shikijin.types import AsyncBaseTask, BaseTask, RetryPolicy
+from shikijin.workers.async_worker.core import AsyncWorker
+from shikijin.workers.base import AsyncBaseWorker, BaseWorker
+from shikijin.workers.basic_worker.core import BasicWorker
+from shikijin.workers.factory import WorkerFactory
+from shikijin.workers.process_pool_worker.core import ProcessPoolWorker
+from shikijin.workers.thread_pool_worker.core import ThreadPoolWorker
+
+
+class RecordingTask(BaseTask):
+    finished: ClassVar[list["RecordingTask"]] = []
+    children: int = 0
+    duration: float = 0.0
+
+    def run(self) -> Iterable[BaseTask]:
+        time.sleep(self.duration)
+        for _ in range(self.children):
+            yield RecordingTask()
+        RecordingTask.finished.append(self)
+
+
+class FailingTask(BaseTask):
+    def run(self) -> Iterable[BaseTask]:
+        raise RuntimeError("boom")
+
+
+@pytest.fixture(autouse=True)
+def clear_finished() -> None:
+    RecordingTask.finished.clear()
+
+
+@pytest.fixture
+def interface() -> InMemoryInterface:
+    return InMemoryInterface(logger=BasicLogger("test"), name=None)
+
+
+def run_until(worker: Union[BaseWorker, AsyncBaseWorker], condition_timeout: float, expected: int) -> None:
+    thread = threading.Thread(target=worker.main)
+    thread.start()
+    deadline = time.monotonic() + condition_timeout
+    while len(RecordingTask.finished) < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    worker.stop()
+    thread.join(timeout=5.0)
+    assert not thread.is_alive()
+
+
+def test_basic_worker_runs_tasks_and_children(interface: InMemoryInterface) -> None:
+    interface.add_tasks([RecordingTask(children=2), RecordingTask()])
+    worker = BasicWorker(capabilities=[], interface=interface, logger=BasicLogger("test"), pickup_timeout=0.05)
+    run_until(worker, 5.0, 4)
+    assert len(RecordingTask.finished) == 4
+    with pytest.raises(NoCapableTaskError):
+        interface.pickup_task([])
+
+
+def test_failed_task_is_retried_after_backoff(interface: InMemoryInterface) -> None:
+    task = FailingTask()
+    interface.add_task(task)
+    worker = BasicWorker(capabilities=[], interface=interface, logger=BasicLogger("test"), pickup_timeout=0.05)
+    worker.execute(task, interface.create_assignment(worker.id, task))
+    with pytest.raises(NoCapableTaskError):
+        interface.pickup_task([])
+    retry = interface.get_task(task.id)
+    assert retry.attempts == 1
+    assert retry.not_before is not None and retry.not_before - retry.updated_at == 1_000_000
+
+
+class PoisonTask(BaseTask):
+    retry_policy = RetryPolicy(max_attempts=3, initial_delay=0.01)
+
+    def run(self) -> Iterable[BaseTask]:
+        RecordingTask.finished.append(RecordingTask())
+        raise RuntimeError("poison")
+
+
+def test_poison_task_is_dead_lettered(interface: InMemoryInterface) -> None:
+    task = PoisonTask()
+    other = RecordingTask()
+    interface.add_tasks([task, other])
+    worker = BasicWorker(capabilities=[], interface=interface, logger=BasicLogger("test"), pickup_timeout=0.05)
+    run_until(worker, 5.0, 4)
+    time.sleep(0.1)
+    assert len(RecordingTask.finished) == 4
+    assert [t.id for t in interface.get_dead_tasks()] == [task.id]
+    assert interface.get_dead_tasks()[0].attempts == 2
+
+    # adding a dead task again revives it
+    interface.add_task(task)
+    assert interface.get_dead_tasks() == []
+    assert interface.pickup_task([]) == task
+
+
+def test_thread_pool_worker_runs_tasks_concurrently(interface: InMemoryInterface) -> None:
+    interface.add_tasks([RecordingTask(duration=0.2) for _ in range(8)])
+    worker = ThreadPoolWorker(
+        capabilities=[], interface=interface, logger=BasicLogger("test"), pickup_timeout=0.05, concurrency=8
+    )
+    started = time.monotonic()
+    run_until(worker, 5.0, 8)
+    assert len(RecordingTask.finished) == 8
+    assert time.monotonic() - started < 1.0
+
+
+def test_thread_pool_worker_finishes_running_tasks_on_stop(interface: InMemoryInterface) -> None:
+    interface.add_tasks([RecordingTask(duration=0.2) for _ in range(2)])
+    worker = ThreadPoolWorker(
+        capabilities=[], interface=interface, logger=BasicLogger("test"), pickup_timeout=0.05, concurrency=2
+    )
+    thread = threading.Thread(target=worker.main)
+    thread.start()
+    time.sleep(0.1)
+    worker.stop()
+    thread.join(timeout=5.0)
+    assert len(RecordingTask.finished) == 2
+
+
+def test_thread_pool_worker_on_sqlite_interface(tmp_path: Path) -> None:
+    interface = SqliteInterface(path=str(tmp_path / "shikijin.db"), logger=BasicLogger("test"), synchronous="OFF")
+    interface.add_tasks([RecordingTask(children=1) for _ in range(8)])
+    worker = ThreadPoolWorker(
+        capabilities=[], interface=interface, logger=BasicLogger("test"), pickup_timeout=0.05, concurrency=4
+    )
+    run_until(worker, 5.0, 16)
+    assert len(RecordingTask.finished) == 16
+    assert interface.pickup_tasks([], 1) == []
+
+
+def test_leases_of_long_tasks_are_renewed() -> None:
+    interface = InMemoryInterface(logger=BasicLogger("test"), name=None, lease_duration=0.1)
+    tasks = [RecordingTask(duration=0.35) for _ in range(3)]
+    interface.add_tasks(tasks)
+    worker = ThreadPoolWorker(
+        capabilities=[], interface=interface, logger=BasicLogger("test"), pickup_timeout=0.05, concurrency=6
+    )
+    run_until(worker, 5.0, 3)
+    time.sleep(0.2)
+    # a lease that expired would have let a free thread run the task a second time
+    assert sorted(t.id for t in RecordingTask.finished) == sorted(t.id for t in tasks)
+    assert interface.pickup_tasks([], 10) == []
+
+
+def test_worker_factory_creates_thread_pool_worker() -> None:
+    settings = GlobalSettings(
+        worker_type=WorkerType.THREAD_POOL, worker_settings={"concurrency": 3}, storage_type=StorageType.IN_MEMORY
+    )
+    worker = WorkerFactory(logger=BasicLogger("test")).create(settings)
+    assert isinstance(worker, ThreadPoolWorker)
+    assert worker.concurrency == 3
+
+
+def test_worker_settings_ignore_keys_of_other_worker_types() -> None:
+    settings = GlobalSettings(
+        worker_type=WorkerType.BASIC,
+        worker_settings={"concurrency": 3, "blob_cache_size": 0},
+        storage_type=StorageType.IN_MEMORY,
+    )
+    assert isinstance(WorkerFactory(logger=BasicLogger("test")).create(settings), BasicWorker)
+
+
+class FileTask(BaseTask):
+    retry_policy = RetryPolicy(initial_delay=0.0)
+
+    path: str
+    crash_once: bool = False
+    children: int = 0
+
+    def run(self) -> Iterable[BaseTask]:
+        if self.crash_once and not os.path.exists(self.path + ".crashed"):
+            open(self.path + ".crashed", "w").close()
+            os._exit(1)
+        for i in range(self.children):
+            yield FileTask(path=f"{self.path}.{i}")
+        with open(self.path, "w") as f:
+            f.write(str(os.getpid()))
+
+
+def run_process_pool(interface: InMemoryInterface, paths: list[str], concurrency: int) -> None:
+    worker = ProcessPoolWorker(
+        capabilities=[], interface=interface, logger=BasicLogger("test"), pickup_timeout=0.05, concurrency=concurrency
+    )
+    thread = threading.Thread(target=worker.main)
+    thread.start()
+    deadline = time.monotonic() + 10.0
+    while not all(os.path.exists(p) for p in paths) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    worker.stop()
+    thread.join(timeout=10.0)
+    assert not thread.is_alive()
+
+
+def test_process_pool_worker_runs_tasks_in_child_processes(interface: InMemoryInterface, tmp_path: Path) -> None:
+    root = str(tmp_path / "root")
+    interface.add_task(FileTask(path=root, children=3))
+    paths = [root] + [f"{root}.{i}" for i in range(3)]
+    run_process_pool(interface, paths, concurrency=2)
+    pids = {Path(p).read_text() for p in paths}
+    assert str(os.getpid()) not in pids
+    with pytest.raises(NoCapableTaskError):
+        interface.pickup_task([])
+
+
+def test_process_pool_worker_abandons_task_of_crashed_child(interface: InMemoryInterface, tmp_path: Path) -> None:
+    path = str(tmp_path / "task")
+    interface.add_task(FileTask(path=path, crash_once=True))
+    run_process_pool(interface, [path], concurrency=1)
+    assert os.path.exists(path + ".crashed")
+    assert os.path.exists(path)
+    with pytest.raises(NoCapableTaskError):
+        interface.pickup_task([])
+
+
+class AsyncSleepTask(AsyncBaseTask):
+    children: int = 0
+
+    async def run(self) -> AsyncIterator[BaseTask]:
+        await asyncio.sleep(0.2)
+        for _ in range(self.children):
+            yield AsyncSleepTask()
+        RecordingTask.finished.append(RecordingTask())
+
+
+def test_async_worker_runs_async_and_sync_tasks_concurrently(interface: InMemoryInterface) -> None:
+    interface.add_tasks([AsyncSleepTask(children=1) for _ in range(50)] + [RecordingTask(duration=0.1)])
+    worker = AsyncWorker(
+        capabilities=[],
+        interface=AsyncInterfaceAdapter(interface),
+        logger=BasicLogger("test"),
+        pickup_timeout=0.05,
+        concurrency=200,
+    )
+    started = time.monotonic()
+    run_until(worker, 5.0, 101)
+    assert len(RecordingTask.finished) == 101
+    assert time.monotonic() - started < 2.0
+
+
+def test_sync_workers_drive_async_tasks(interface: InMemoryInterface) -> None:
+    task = AsyncSleepTask(children=2)
+    interface.add_task(task)
+    worker = BasicWorker(capabilities=[], interface=interface, logger=BasicLogger("test"), pickup_timeout=0.05)
+    worker.execute(task, interface.create_assignment(worker.id, task))
+    assert len(interface.pickup_tasks([], 10)) == 2
+
+
+def test_worker_factory_creates_async_worker() -> None:
+    settings = GlobalSettings(
+        worker_type=WorkerType.ASYNC, worker_settings={"concurrency": 10}, storage_type=StorageType.IN_MEMORY
+    )
+    worker = WorkerFactory(logger=BasicLogger("test")).create(settings)
+    assert isinstance(worker, AsyncWorker)
+    assert worker.concurrency == 10
+
+
+def test_async_worker_renews_leases() -> None:
+    interface = InMemoryInterface(logger=BasicLogger("test"), name=None, lease_duration=0.1)
+    interface.add_tasks([AsyncSleepTask() for _ in range(3)])
+    worker = AsyncWorker(
+        capabilities=[],
+        interface=AsyncInterfaceAdapter(interface),
+        logger=BasicLogger("test"),
+        pickup_timeout=0.05,
+        concurrency=6,
+    )
+    run_until(worker, 5.0, 3)
+    time.sleep(0.2)
+    assert len(RecordingTask.finished) == 3
+    assert interface.pickup_tasks([], 10) == []